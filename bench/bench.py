@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Grader benchmark suite
+======================
+Generates synthetic submission trees and measures how long the grader
+takes on them, end to end and per check, with the Docker layer stubbed out
+so results are stable and need no daemon.
+
+Usage:
+    python bench/bench.py                          # All scenarios, table output
+    python bench/bench.py --scenario huge-compose  # One scenario
+    python bench/bench.py --out results.json       # Also write machine-readable results
+    python bench/bench.py --compare base.json      # Flag regressions against an earlier run
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from contextlib import contextmanager
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import run  # noqa: E402
+import grader.context  # noqa: E402
+from grader import compare, layers, loadtest  # noqa: E402
+from grader.build import BuildResult, image_tag  # noqa: E402
+from grader.context import GradeContext  # noqa: E402
+from grader.timing import percentile  # noqa: E402
+from synthetic import SCENARIOS  # noqa: E402
+
+PERCENTILES = (50, 90, 99)
+# Grading options for every run: no optional checks, which all need a daemon
+BENCH_OPTIONS = {}
+
+
+# ─── Docker Stub ───────────────────────────────────────────────────────────
+
+class StubInventory:
+    """Stands in for DockerInventory with fixed listings."""
+
+    def __init__(self, client=None):
+        pass
+
+    def image_tags(self):
+        return ["node:18-alpine", "alice/todo-app:v1"]
+
+    def volume_names(self):
+        return ["todo-db"]
+
+    def close(self):
+        pass
+
+
+def stub_build_image(context_dir, digest, existing_tags=(), cache_dir=None, timeout=None, dockerfile=None, lease=None,
+                     housekeeping=True):
+    return BuildResult(True, image_tag(digest), cache_hit_ratio=1.0, skipped=True)
+
+
+def stub_load_test_image(image, concurrency=None, duration=None):
+    raise loadtest.LoadTestError("Docker is stubbed out in the bench")
+
+
+def stub_analyze_image(image, instructions=None, dev_packages=(), timeout=None):
+    raise layers.LayerAnalysisError("Docker is stubbed out in the bench")
+
+
+def stub_compare_builds(context_dir, variant_list, inventory=None, cache_dir=None, dockerignore_text=None, lease=None):
+    raise FileNotFoundError("Docker is stubbed out in the bench")
+
+
+# (module, attribute, stand-in): everything through which a check reaches Docker
+STUBS = (
+    (grader.context, "DockerInventory", StubInventory),
+    (run, "build_image", stub_build_image),
+    (loadtest, "load_test_image", stub_load_test_image),
+    (layers, "analyze_image", stub_analyze_image),
+    (compare, "compare_builds", stub_compare_builds),
+)
+
+
+@contextmanager
+def stubbed_docker():
+    saved = [(module, name, getattr(module, name)) for module, name, _ in STUBS]
+    for module, name, stub in STUBS:
+        setattr(module, name, stub)
+    try:
+        yield
+    finally:
+        for module, name, original in saved:
+            setattr(module, name, original)
+
+
+# ─── Measurement ───────────────────────────────────────────────────────────
+
+def summarize(samples_ns):
+    ms = [s / 1e6 for s in samples_ns]
+    stats = {f"p{p}": round(percentile(ms, p), 4) for p in PERCENTILES}
+    stats["mean"] = round(sum(ms) / len(ms), 4)
+    stats["max"] = round(max(ms), 4)
+    return stats
+
+
+def bench_scenario(root, iterations, jobs):
+    """Time run_checks end to end and every check function on its own."""
+    checks = run.select_checks(options=BENCH_OPTIONS)
+    end_to_end = []
+    per_check = {c["name"]: [] for c in checks}
+
+    with open(os.devnull, "w") as devnull:
+        for _ in range(iterations):
+            start = time.perf_counter_ns()
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                run.run_checks(jobs=jobs, root_dir=root, options=BENCH_OPTIONS)
+            finally:
+                sys.stdout = stdout
+            end_to_end.append(time.perf_counter_ns() - start)
+
+    for _ in range(iterations):
+        for check in checks:
+            # A fresh context per call, so each sample includes the
+            # artifact reads and parsing the check triggers.
+            ctx = GradeContext(root, BENCH_OPTIONS)
+            start = time.perf_counter_ns()
+            run.run_check(check, ctx)
+            per_check[check["name"]].append(time.perf_counter_ns() - start)
+            ctx.close()
+
+    return {
+        "end_to_end_ms": summarize(end_to_end),
+        "checks": {name: summarize(samples) for name, samples in per_check.items()},
+    }
+
+
+def git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR,
+                                capture_output=True, text=True, timeout=10)
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+# ─── Reporting ─────────────────────────────────────────────────────────────
+
+def print_report(report):
+    for name, scenario in report["scenarios"].items():
+        e2e = scenario["end_to_end_ms"]
+        print(f"\n  {name}: end to end p50 {e2e['p50']:.2f} ms  p90 {e2e['p90']:.2f} ms  p99 {e2e['p99']:.2f} ms")
+        slowest = sorted(scenario["checks"].items(), key=lambda item: item[1]["p50"], reverse=True)[:5]
+        for check, stats in slowest:
+            print(f"    {check:<32} p50 {stats['p50']:>9.3f} ms  p99 {stats['p99']:>9.3f} ms")
+    print()
+
+
+def find_regressions(base, report, threshold):
+    """Print p50 changes against an earlier report; return the regressions."""
+    regressions = []
+    print(f"  Compared with {base['meta'].get('commit') or 'baseline'} (threshold {threshold:.0%}):")
+    for name, scenario in report["scenarios"].items():
+        old = base["scenarios"].get(name)
+        if old is None:
+            continue
+        rows = [("end to end", old["end_to_end_ms"], scenario["end_to_end_ms"])]
+        rows += [(check, old["checks"][check], stats)
+                 for check, stats in scenario["checks"].items() if check in old["checks"]]
+        for label, before, after in rows:
+            if before["p50"] <= 0:
+                continue
+            change = after["p50"] / before["p50"] - 1
+            if change > threshold:
+                regressions.append((name, label, change))
+                print(f"    REGRESSION {name} / {label}: p50 {before['p50']:.3f} -> {after['p50']:.3f} ms ({change:+.0%})")
+    if not regressions:
+        print("    no regressions")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the workshop grader on synthetic submissions")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario to run (repeatable; default: all)")
+    parser.add_argument("--iterations", type=int, default=20, help="Samples per measurement (default: 20)")
+    parser.add_argument("--scale", type=int, default=1, help="Size multiplier for the large scenarios")
+    parser.add_argument("--jobs", type=int, default=run.DEFAULT_JOBS, help="Executor threads for run_checks")
+    parser.add_argument("--out", help="Write results as JSON to this file")
+    parser.add_argument("--compare", metavar="BASE", help="Earlier --out file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative p50 slowdown reported as a regression (default: 0.10)")
+    args = parser.parse_args()
+
+    names = args.scenario or list(SCENARIOS)
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "scale": args.scale,
+            "jobs": args.jobs,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "scenarios": {},
+    }
+
+    workdir = tempfile.mkdtemp(prefix="grader-bench-")
+    try:
+        with stubbed_docker():
+            for name in names:
+                root = os.path.join(workdir, name)
+                os.makedirs(root)
+                SCENARIOS[name](root, args.scale)
+                print(f"  running {name} ...", file=sys.stderr)
+                report["scenarios"][name] = bench_scenario(root, args.iterations, args.jobs)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"  Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            base = json.load(f)
+        if find_regressions(base, report, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Synthetic submission trees for the grader benchmarks.
+
+Each scenario is a function that fills an empty directory with a workshop
+checkout. They start from this repository's own app/ and compose starter
+files and then swap in the artifacts being stressed.
+"""
+
+import os
+import shutil
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _copy_starter(dest):
+    shutil.copytree(os.path.join(REPO_DIR, "app"), os.path.join(dest, "app"))
+    shutil.copy(os.path.join(REPO_DIR, "docker-compose.yml"), dest)
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _copy_solutions(dest):
+    solutions = {
+        os.path.join("11-image-building-best-practices", "solutions", "Dockerfile.multistage"): os.path.join("app", "Dockerfile"),
+        os.path.join("11-image-building-best-practices", "solutions", ".dockerignore"): os.path.join("app", ".dockerignore"),
+        os.path.join("10-use-docker-compose", "solutions", "docker-compose.yml"): "docker-compose.yml",
+        os.path.join("05-update-application", "solutions", "index.html"): os.path.join("app", "src", "static", "index.html"),
+    }
+    for source, target in solutions.items():
+        shutil.copy(os.path.join(REPO_DIR, source), os.path.join(dest, target))
+
+
+def starter(dest, scale=1):
+    """The untouched starter template."""
+    _copy_starter(dest)
+
+
+def solution(dest, scale=1):
+    """A complete submission built from the reference solutions."""
+    _copy_starter(dest)
+    _copy_solutions(dest)
+
+
+def huge_multistage(dest, scale=1):
+    """A solution whose Dockerfile has hundreds of stages, comments and continuations."""
+    solution(dest)
+    lines = ["# syntax=docker/dockerfile:1", ""]
+    for stage in range(200 * scale):
+        lines += [
+            f"# Stage {stage}: build step with comments and continued RUN lines",
+            f"FROM node:18-alpine AS stage{stage}",
+            "WORKDIR /app",
+            "COPY package.json .",
+            "RUN apk add --no-cache git \\",
+            "    # keep the toolchain small",
+            "    && npm install \\",
+            "    && npm cache clean --force",
+            f"ENV STAGE={stage}",
+            "COPY . .",
+            "",
+        ]
+    lines += [
+        "FROM node:18-alpine",
+        "WORKDIR /app",
+        "COPY package.json .",
+        "RUN npm install --production",
+        "COPY . .",
+        "EXPOSE 3000",
+        'CMD ["node", "src/index.js"]',
+    ]
+    _write(os.path.join(dest, "app", "Dockerfile"), "\n".join(lines) + "\n")
+
+
+def huge_compose(dest, scale=1):
+    """A solution whose docker-compose.yml is about 10k lines long."""
+    solution(dest)
+    with open(os.path.join(REPO_DIR, "10-use-docker-compose", "solutions", "docker-compose.yml"), encoding="utf-8") as f:
+        base = f.read()
+    services, volumes = base.split("\nvolumes:\n")
+    extra = []
+    for i in range(500 * scale):
+        extra += [
+            f"  worker{i}:",
+            "    image: node:18-alpine",
+            "    # background worker",
+            "    environment:",
+            "      MYSQL_HOST: mysql",
+            f"      WORKER_ID: \"{i}\"",
+            "    volumes:",
+            f"      - worker{i}-data:/data",
+            "    depends_on:",
+            "      - mysql",
+            "",
+        ]
+        volumes += f"  worker{i}-data:\n"
+    text = services.rstrip("\n") + "\n\n" + "\n".join(extra) + "\nvolumes:\n" + volumes
+    _write(os.path.join(dest, "docker-compose.yml"), text)
+
+
+def _node_modules(app_dir, scale):
+    """A deep node_modules tree of many small files."""
+    root = os.path.join(app_dir, "node_modules")
+    payload = "module.exports = function () { return 42; };\n" * 20
+    for package in range(100 * scale):
+        pkg_dir = os.path.join(root, f"pkg{package}", "lib", "internal", "util", "deep")
+        os.makedirs(pkg_dir)
+        _write(os.path.join(root, f"pkg{package}", "package.json"), '{"name": "pkg%d"}\n' % package)
+        for n in range(20):
+            _write(os.path.join(pkg_dir, f"file{n}.js"), payload)
+
+
+def deep_tree_ignored(dest, scale=1):
+    """A solution with a large local node_modules that .dockerignore excludes."""
+    solution(dest)
+    _node_modules(os.path.join(dest, "app"), scale)
+
+
+def deep_tree_unignored(dest, scale=1):
+    """A solution with a large local node_modules and no .dockerignore."""
+    solution(dest)
+    os.remove(os.path.join(dest, "app", ".dockerignore"))
+    _node_modules(os.path.join(dest, "app"), scale)
+
+
+SCENARIOS = {
+    "starter": starter,
+    "solution": solution,
+    "huge-multistage": huge_multistage,
+    "huge-compose": huge_compose,
+    "deep-tree-ignored": deep_tree_ignored,
+    "deep-tree-unignored": deep_tree_unignored,
+}
@@ -0,0 +1,6 @@
+"""
+Support package for the workshop grader (run.py).
+
+run.py owns the check functions, the CHECKS registry and the command line;
+the modules in this package hold the machinery those checks run on.
+"""
@@ -0,0 +1,319 @@
+"""
+Host-wide admission control for Docker work.
+
+The executor's semaphores cap Docker work inside one grading process, but
+a host running ``--batch`` workers, ``serve`` and queue workers side by side
+would still start every process's builds at once, thrash the daemon and
+the disk, and push each build past its timeout. Operations that go through
+``admitted()`` take one of a fixed number of slots per operation type,
+shared by every grader process on the host:
+
+    build   docker build / buildx build
+    run     starting containers (docker run)
+    query   Docker CLI queries (docker image ls, docker version, ...)
+
+Slots are ``flock``-ed files under the admission directory, so a crashed
+process gives its slot back with its file descriptors. Waiters take a
+ticket and only the oldest live waiter may claim a free slot, so the queue
+is first come, first served across processes. Time spent waiting is added
+to the running check's ``queue_wait_ms`` rather than its execution time,
+and never counts against an operation's timeout. A waiter whose grade
+deadline (grader.deadline) ends leaves the line at once.
+
+Successful builds and container starts record their durations; timeouts
+for later ones grow with what the host has recently needed, so a loaded
+grading host does not fail every build at the same fixed limit.
+
+Configure with ``configure()`` (run.py ``--host-limit`` and
+``--admission-dir``); the settings travel to child processes through the
+environment. Run ``python -m grader.admission`` to see slot use.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import argparse
+import subprocess
+from contextlib import contextmanager
+
+from grader import timing
+
+try:
+    import fcntl
+except ImportError:  # Windows: no host-wide admission, the executor's limits still apply
+    fcntl = None
+
+HOST_LIMITS = {"build": 2, "run": 4, "query": 8}
+DIR_ENV = "GRADER_ADMISSION_DIR"
+LIMITS_ENV = "GRADER_HOST_LIMITS"
+
+POLL_INITIAL = 0.005
+POLL_MAX = 0.1
+RECENT_DURATIONS = 50       # samples behind an adaptive timeout
+MIN_SAMPLES = 5
+TIMEOUT_FACTOR = 3          # timeout = max(base, factor * p95 of recent durations)
+MAX_TIMEOUT_FACTOR = 5      # ... but never more than this many times the base
+
+
+class AdmissionTimeout(Exception):
+    """No slot was free within the wait limit."""
+
+
+def default_dir():
+    uid = os.getuid() if hasattr(os, "getuid") else "user"
+    return os.path.join(tempfile.gettempdir(), f"grader-admission-{uid}")
+
+
+def parse_limits(specs):
+    """``["build=2", "run=1"]`` -> ``{"build": 2, "run": 1}``; 0 turns admission off for that operation."""
+    limits = {}
+    for spec in specs:
+        name, sep, value = spec.partition("=")
+        if not sep or name not in HOST_LIMITS or not value.isdigit():
+            raise ValueError(f"expected OPERATION=N with OPERATION one of {', '.join(HOST_LIMITS)}: {spec}")
+        limits[name] = int(value)
+    return limits
+
+
+def configure(directory=None, limits=None):
+    """Set the admission directory and host limits for this process and its children."""
+    if directory:
+        os.environ[DIR_ENV] = os.path.abspath(directory)
+    if limits:
+        merged = dict(current_limits(), **limits)
+        os.environ[LIMITS_ENV] = ",".join(f"{name}={n}" for name, n in sorted(merged.items()))
+
+
+def current_dir():
+    return os.environ.get(DIR_ENV) or default_dir()
+
+
+def current_limits():
+    specs = [s for s in os.environ.get(LIMITS_ENV, "").split(",") if s]
+    try:
+        return dict(HOST_LIMITS, **parse_limits(specs))
+    except ValueError:
+        return dict(HOST_LIMITS)
+
+
+# ─── Slots ─────────────────────────────────────────────────────────────────
+
+def _try_lock(path, mode="a"):
+    """Open path and take a non-blocking exclusive flock; return the file or None."""
+    f = open(path, mode)
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        return None
+    return f
+
+
+class Admission:
+    """Slots and waiting line for each operation type under one directory."""
+
+    def __init__(self, directory=None, limits=None):
+        self.dir = directory or current_dir()
+        self.limits = dict(current_limits(), **(limits or {}))
+
+    def _paths(self, operation):
+        queue_dir = os.path.join(self.dir, f"{operation}.queue")
+        os.makedirs(queue_dir, exist_ok=True)
+        return queue_dir, os.path.join(self.dir, f"{operation}.ticket")
+
+    def _take_ticket(self, operation, queue_dir, ticket_path):
+        """Join the line: returns the waiter file (held locked) and its ticket."""
+        with open(ticket_path, "a+") as counter:
+            fcntl.flock(counter, fcntl.LOCK_EX)
+            counter.seek(0)
+            ticket = int(counter.read().strip() or 0) + 1
+            counter.seek(0)
+            counter.truncate()
+            counter.write(str(ticket))
+        # Lock before the name becomes visible, so no one mistakes us for a dead waiter
+        pending = os.path.join(queue_dir, f".{ticket}.{os.getpid()}")
+        waiter = open(pending, "w")
+        fcntl.flock(waiter, fcntl.LOCK_EX)
+        name = f"{ticket:020d}"
+        os.rename(pending, os.path.join(queue_dir, name))
+        return waiter, name
+
+    def _first_in_line(self, queue_dir, name):
+        """True when no live waiter holds an older ticket; clears out dead waiters."""
+        for other in sorted(os.listdir(queue_dir)):
+            if other >= name:
+                return True
+            if other.startswith("."):
+                continue
+            path = os.path.join(queue_dir, other)
+            try:
+                stale = _try_lock(path, "r")
+            except FileNotFoundError:
+                continue
+            if stale is None:
+                return False
+            # Its owner exited without leaving the line
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            stale.close()
+        return True
+
+    def _claim_slot(self, operation):
+        for n in range(self.limits[operation]):
+            slot = _try_lock(os.path.join(self.dir, f"{operation}.slot{n}"))
+            if slot is not None:
+                return slot
+        return None
+
+    def acquire(self, operation, wait_timeout=None, deadline=None):
+        """Wait for a slot; return ``(slot file or None, seconds waited)``.
+
+        Raises AdmissionTimeout if ``wait_timeout`` seconds pass first, and
+        subprocess.TimeoutExpired if ``deadline`` ends while waiting.
+        """
+        if fcntl is None or not self.limits.get(operation):
+            return None, 0.0
+        start = time.perf_counter()
+        queue_dir, ticket_path = self._paths(operation)
+        waiter, name = self._take_ticket(operation, queue_dir, ticket_path)
+        delay = POLL_INITIAL
+        try:
+            while True:
+                if self._first_in_line(queue_dir, name):
+                    slot = self._claim_slot(operation)
+                    if slot is not None:
+                        return slot, time.perf_counter() - start
+                if wait_timeout is not None and time.perf_counter() - start > wait_timeout:
+                    raise AdmissionTimeout(f"no {operation} slot free after {wait_timeout:g} seconds")
+                if deadline is not None and deadline.wait(delay):
+                    raise subprocess.TimeoutExpired(f"{operation} admission", deadline.seconds or 0)
+                if deadline is None:
+                    time.sleep(delay)
+                delay = min(delay * 2, POLL_MAX)
+        finally:
+            try:
+                os.unlink(os.path.join(queue_dir, name))
+            except FileNotFoundError:
+                pass
+            waiter.close()
+
+    # ─── Adaptive timeouts ─────────────────────────────────────────────────
+
+    def _durations_path(self, operation):
+        return os.path.join(self.dir, f"{operation}.durations")
+
+    def record(self, operation, seconds):
+        """Remember how long a successful operation took."""
+        if fcntl is None:
+            return
+        os.makedirs(self.dir, exist_ok=True)
+        with open(self._durations_path(operation), "a+", encoding="ascii") as f:
+            # Appends share the lock (one short O_APPEND write each); trimming
+            # takes it exclusively and rewrites the file in place, so no
+            # sample appended meanwhile is lost to a replaced file
+            fcntl.flock(f, fcntl.LOCK_SH)
+            f.write(f"{seconds:.3f}\n")
+            f.flush()
+            if f.tell() <= RECENT_DURATIONS * 64:
+                return
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            lines = f.read().split()
+            # Another process may have trimmed it while we waited
+            if len(lines) > RECENT_DURATIONS:
+                f.truncate(0)
+                f.write("".join(f"{line}\n" for line in lines[-RECENT_DURATIONS:]))
+
+    def recent(self, operation):
+        try:
+            with open(self._durations_path(operation), "r", encoding="ascii") as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_SH)
+                lines = f.read().split()
+        except FileNotFoundError:
+            return []
+        samples = []
+        for line in lines[-RECENT_DURATIONS:]:
+            try:
+                samples.append(float(line))
+            except ValueError:
+                pass
+        return samples
+
+    def timeout(self, operation, base):
+        """``base`` seconds, raised to cover recent durations on this host."""
+        samples = self.recent(operation)
+        if len(samples) < MIN_SAMPLES:
+            return base
+        adaptive = TIMEOUT_FACTOR * timing.percentile(samples, 95)
+        return round(min(max(base, adaptive), base * MAX_TIMEOUT_FACTOR), 1)
+
+    def status(self):
+        """Per operation: limit, slots in use, waiters and recent p50/p95 durations."""
+        report = {}
+        for operation, limit in sorted(self.limits.items()):
+            busy = 0
+            for n in range(limit):
+                path = os.path.join(self.dir, f"{operation}.slot{n}")
+                if not os.path.exists(path):
+                    continue
+                slot = _try_lock(path) if fcntl is not None else True
+                if slot is None:
+                    busy += 1
+                elif slot is not True:
+                    slot.close()
+            queue_dir = os.path.join(self.dir, f"{operation}.queue")
+            waiting = len([n for n in os.listdir(queue_dir) if not n.startswith(".")]) if os.path.isdir(queue_dir) else 0
+            samples = self.recent(operation)
+            report[operation] = {
+                "limit": limit,
+                "in_use": busy,
+                "waiting": waiting,
+                "p50_s": timing.percentile(samples, 50) if samples else None,
+                "p95_s": timing.percentile(samples, 95) if samples else None,
+            }
+        return report
+
+
+@contextmanager
+def admitted(operation, wait_timeout=None):
+    """Hold a host-wide slot for ``operation`` for the enclosed block.
+
+    The wait is charged to the current check's queue time, and ends early
+    if the current check's deadline does.
+    """
+    slot, waited = Admission().acquire(operation, wait_timeout, timing.current_deadline())
+    timing.add_queue_wait(waited)
+    try:
+        yield
+    finally:
+        if slot is not None:
+            slot.close()
+
+
+def timeout_for(operation, base):
+    return Admission().timeout(operation, base)
+
+
+def record(operation, seconds):
+    Admission().record(operation, seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show host-wide Docker admission slots")
+    parser.add_argument("--admission-dir", help=f"Admission directory (default: {default_dir()})")
+    args = parser.parse_args()
+    if fcntl is None:
+        sys.exit("host-wide admission needs fcntl (not available on this platform)")
+    admission = Admission(args.admission_dir)
+    print(f"  {admission.dir}")
+    for operation, s in admission.status().items():
+        recent = f"p50 {s['p50_s']:.1f}s, p95 {s['p95_s']:.1f}s" if s["p50_s"] is not None else "no samples"
+        print(f"  {operation:<6} {s['in_use']}/{s['limit']} in use, {s['waiting']} waiting, {recent}")
+
+
+if __name__ == "__main__":
+    main()
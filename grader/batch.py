@@ -0,0 +1,62 @@
+"""
+Batch grading.
+
+Grades many submission checkouts in one invocation across a process pool
+and streams one JSON object per line as each submission finishes, so
+callers do not pay interpreter startup per submission.
+"""
+
+import os
+import sys
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+
+def discover_submissions(path):
+    """Return the checkout directories named by ``path``.
+
+    ``path`` is either a directory whose immediate subdirectories are
+    checkouts, or a manifest file listing one checkout per line (blank
+    lines and ``#`` comments are ignored; relative paths are resolved
+    against the manifest's directory).
+    """
+    path = os.path.abspath(path)
+    if os.path.isdir(path):
+        with os.scandir(path) as entries:
+            return sorted(e.path for e in entries if e.is_dir() and not e.name.startswith("."))
+
+    base = os.path.dirname(path)
+    submissions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                submissions.append(os.path.normpath(os.path.join(base, line)))
+    return submissions
+
+
+def run_batch(submissions, grade, workers=DEFAULT_WORKERS, out=None):
+    """Grade each submission with ``grade(root_dir)`` and stream JSON lines.
+
+    ``grade`` must be picklable (a module-level function or a
+    functools.partial of one). Results are written in completion order;
+    each line carries the submission path. A submission that crashes its
+    worker is reported with an "error" key instead of aborting the batch.
+    Returns the number of submissions that could not be graded.
+    """
+    out = out or sys.stdout
+    failures = 0
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(grade, root): root for root in submissions}
+        for future in as_completed(futures):
+            root = futures[future]
+            try:
+                record = {"submission": root, **future.result()}
+            except Exception as e:
+                failures += 1
+                record = {"submission": root, "error": f"{type(e).__name__}: {e}"}
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+    return failures
@@ -0,0 +1,304 @@
+"""
+Image builds for the grader.
+
+Builds run with BuildKit and are tagged with a digest of the build context
+(``todo-app-test:<digest>``), so a context that was already built is
+recognised by its tag and not rebuilt. Test images are kept rather than
+removed straight after the build, which preserves the daemon's layer cache
+between grades; a detached garbage collector trims them to the most recent
+few once the grade has moved on.
+
+When a persistent cache directory is configured the build goes through
+``docker buildx`` and imports/exports its layer cache there, which lets
+throwaway builders (CI runners, fresh grading nodes) start warm.
+
+Builds take a host-wide "build" slot (grader.admission) before they start,
+and their timeout adapts to how long recent builds on the host took.
+
+A grade that builds or reuses a test image holds a lease on its tag (a
+shared ``flock`` on a file under the admission directory) until the grade
+ends. The collector skips leased tags and removes an image only while it
+holds that tag's lease exclusively, so concurrent grades (serve, worker,
+``--batch``) never lose an image they are about to run or save.
+
+Run ``python -m grader.build --gc`` to collect old test images by hand.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+from urllib.parse import quote
+
+try:
+    import fcntl
+except ImportError:  # Windows: no leases, the collector keeps the newest images only
+    fcntl = None
+
+from grader import timing, admission
+from grader.docker_api import DockerClient, DockerUnavailable, socket_path_from_env
+
+TEST_REPOSITORY = "todo-app-test"
+KEEP_IMAGES = 5
+BUILD_TIMEOUT = 120
+
+# BuildKit plain progress: "#6 [3/5] COPY ..." or "#9 [deps 2/4] RUN ..."
+BUILDKIT_STEP_RE = re.compile(r"^#(\d+) \[(?:[\w.-]+ )?\d+/\d+\]", re.MULTILINE)
+BUILDKIT_STEP_LINE_RE = re.compile(r"^#(\d+) \[(?:[\w.-]+ )?\d+/\d+\] (.*)$", re.MULTILINE)
+BUILDKIT_CACHED_RE = re.compile(r"^#(\d+) CACHED", re.MULTILINE)
+# Legacy builder: "Step 3/7 : ..." followed by " ---> Using cache"
+LEGACY_STEP_RE = re.compile(r"^Step \d+/\d+ :", re.MULTILINE)
+LEGACY_CACHED_RE = re.compile(r"^ ---> Using cache", re.MULTILINE)
+# A step installing the app's dependencies
+INSTALL_RE = re.compile(r"^RUN .*\b(?:npm|yarn|pnpm)\s+(?:install|ci)\b", re.IGNORECASE)
+
+
+class BuildResult:
+    """Outcome of building (or reusing) a test image."""
+
+    __slots__ = ("ok", "image", "seconds", "cache_hit_ratio", "skipped", "log")
+
+    def __init__(self, ok, image, seconds=0.0, cache_hit_ratio=None, skipped=False, log=""):
+        self.ok = ok
+        self.image = image
+        self.seconds = seconds
+        self.cache_hit_ratio = cache_hit_ratio
+        self.skipped = skipped
+        self.log = log
+
+    def details(self):
+        """Fields reported in the check result."""
+        return {
+            "image": self.image,
+            "build_seconds": round(self.seconds, 3),
+            "cache_hit_ratio": self.cache_hit_ratio,
+            "skipped": self.skipped,
+        }
+
+
+def cache_hit_ratio(log):
+    """Fraction of Dockerfile steps served from the layer cache, or None if unknown."""
+    steps = set(BUILDKIT_STEP_RE.findall(log))
+    if steps:
+        cached = steps & set(BUILDKIT_CACHED_RE.findall(log))
+        return round(len(cached) / len(steps), 3)
+    steps = len(LEGACY_STEP_RE.findall(log))
+    if steps:
+        return round(len(LEGACY_CACHED_RE.findall(log)) / steps, 3)
+    return None
+
+
+def install_cached(log):
+    """Whether every dependency-install step came from the layer cache, or None if the log shows none."""
+    steps = {n for n, line in BUILDKIT_STEP_LINE_RE.findall(log) if INSTALL_RE.match(line)}
+    if steps:
+        return steps <= set(BUILDKIT_CACHED_RE.findall(log))
+    # Legacy builder: each "Step n/m :" section ends before the next one
+    sections = LEGACY_STEP_RE.split(log)[1:]
+    installs = [s for s in sections if INSTALL_RE.match(s.strip())]
+    if installs:
+        return all(LEGACY_CACHED_RE.search(s) for s in installs)
+    return None
+
+
+def variant_digest(context_digest, dockerfile_path):
+    """Digest for building a context with a Dockerfile from outside it."""
+    h = hashlib.sha256(context_digest.encode("ascii"))
+    with open(dockerfile_path, "rb") as f:
+        h.update(b"\0" + f.read())
+    return h.hexdigest()
+
+
+def image_tag(digest):
+    return f"{TEST_REPOSITORY}:{digest[:16]}"
+
+
+# ─── Leases ────────────────────────────────────────────────────────────────
+
+def _lease_path(tag):
+    directory = os.path.join(admission.current_dir(), "image-leases")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, tag.replace("/", "_").replace(":", "_"))
+
+
+def lease_image(tag):
+    """Protect tag from the collector until the returned file is closed (None without fcntl)."""
+    if fcntl is None:
+        return None
+    path = _lease_path(tag)
+    while True:
+        f = open(path, "a")
+        fcntl.flock(f, fcntl.LOCK_SH)
+        # The collector unlinks a lease file once the image is gone; if it
+        # did so while we waited, lease the fresh file instead
+        try:
+            if os.path.samestat(os.fstat(f.fileno()), os.stat(path)):
+                return f
+        except FileNotFoundError:
+            pass
+        f.close()
+
+
+def _claim_unused(tag):
+    """Exclusive hold on tag's lease file, or None while a grade holds the tag."""
+    if fcntl is None:
+        return True
+    f = open(_lease_path(tag), "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        return None
+    return f
+
+
+def build_command(context_dir, tag, cache_dir=None, dockerfile=None):
+    """Return the docker command line for a BuildKit build of context_dir."""
+    file_args = ["-f", dockerfile] if dockerfile else []
+    if cache_dir:
+        return [
+            "docker", "buildx", "build", "--load", "--progress=plain",
+            "--cache-from", f"type=local,src={cache_dir}",
+            "--cache-to", f"type=local,dest={cache_dir},mode=max",
+            *file_args, "-t", tag, context_dir,
+        ]
+    return ["docker", "build", "--progress=plain", *file_args, "-t", tag, context_dir]
+
+
+def build_image(context_dir, digest, existing_tags=(), cache_dir=None, timeout=None, dockerfile=None, lease=None,
+                housekeeping=True):
+    """Build context_dir as a digest-tagged test image, reusing an existing one.
+
+    ``dockerfile`` builds from a Dockerfile other than the context's own;
+    the digest must then cover that file as well as the context. Without a
+    ``timeout`` the build gets BUILD_TIMEOUT, raised to cover recent builds
+    on this host. ``lease`` (for example GradeContext.lease_image) is called
+    with the tag before it is reused or built. A successful build records
+    its time for future timeouts and starts the image collector; measuring
+    builds that are not a grade's own pass ``housekeeping=False`` to skip both.
+
+    Raises FileNotFoundError if the docker CLI is missing and
+    subprocess.TimeoutExpired if the build overruns its timeout.
+    """
+    tag = image_tag(digest)
+    if lease is not None:
+        lease(tag)
+    if tag in existing_tags:
+        return BuildResult(True, tag, cache_hit_ratio=1.0, skipped=True)
+
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    env = dict(os.environ, DOCKER_BUILDKIT="1")
+    with admission.admitted("build"):
+        # Waiting for the slot does not count against the build's timeout
+        if timeout is None:
+            timeout = admission.timeout_for("build", BUILD_TIMEOUT)
+        start = time.perf_counter()
+        result = timing.run(build_command(context_dir, tag, cache_dir, dockerfile), timeout=timeout, env=env)
+        seconds = time.perf_counter() - start
+    # BuildKit writes progress to stderr, the legacy builder to stdout
+    log = result.stdout + result.stderr
+    if result.returncode != 0:
+        return BuildResult(False, tag, seconds, log=log)
+    if housekeeping:
+        admission.record("build", seconds)
+        collect_in_background(keep=tag)
+    return BuildResult(True, tag, seconds, cache_hit_ratio(log), log=log)
+
+
+def collect_in_background(keep=None):
+    """Start a detached process that removes old test images."""
+    package_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    args = [sys.executable, "-m", "grader.build", "--gc"]
+    if keep:
+        args += ["--keep-tag", keep]
+    try:
+        subprocess.Popen(
+            args, cwd=package_parent,
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    except OSError:
+        pass
+
+
+def _test_images():
+    """Return ``[(created, tag)]`` for every test image, newest first."""
+    path = socket_path_from_env()
+    if path and os.path.exists(path):
+        client = DockerClient(path)
+        try:
+            filters = json.dumps({"reference": [TEST_REPOSITORY]})
+            images = client.get("/images/json", {"filters": filters}) or []
+        finally:
+            client.close()
+        found = [(image.get("Created", 0), tag) for image in images for tag in image.get("RepoTags") or []]
+    else:
+        result = subprocess.run(
+            ["docker", "image", "ls", "--filter", f"reference={TEST_REPOSITORY}",
+             "--format", "{{.CreatedAt}}\t{{.Repository}}:{{.Tag}}"],
+            capture_output=True, text=True, timeout=30,
+        )
+        found = [tuple(line.split("\t", 1)) for line in result.stdout.splitlines() if "\t" in line]
+    return sorted(found, reverse=True)
+
+
+def remove_images(tags):
+    """Remove test images by tag, ignoring ones that are already gone."""
+    path = socket_path_from_env()
+    if path and os.path.exists(path):
+        client = DockerClient(path)
+        try:
+            for tag in tags:
+                try:
+                    client.request("DELETE", f"/images/{quote(tag, safe='')}")
+                except DockerUnavailable:
+                    pass
+        finally:
+            client.close()
+    elif tags:
+        subprocess.run(["docker", "rmi"] + list(tags), capture_output=True, timeout=120)
+
+
+def collect(keep=KEEP_IMAGES, keep_tag=None):
+    """Remove all but the ``keep`` newest test images (never ``keep_tag`` or a leased tag)."""
+    tags = [tag for _, tag in _test_images()]
+    removed = []
+    for tag in tags[keep:]:
+        if tag == keep_tag:
+            continue
+        claim = _claim_unused(tag)
+        if claim is None:
+            continue
+        try:
+            remove_images([tag])
+            removed.append(tag)
+            if claim is not True:
+                os.unlink(claim.name)
+        finally:
+            if claim is not True:
+                claim.close()
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grader image build helpers")
+    parser.add_argument("--gc", action="store_true", help="Remove old test images")
+    parser.add_argument("--keep", type=int, default=KEEP_IMAGES, help="Number of recent test images to keep")
+    parser.add_argument("--keep-tag", help="A test image tag that must not be removed")
+    args = parser.parse_args()
+    if args.gc:
+        try:
+            for tag in collect(args.keep, args.keep_tag):
+                print(f"removed {tag}")
+        except (OSError, subprocess.SubprocessError, DockerUnavailable) as e:
+            print(f"gc failed: {e}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Build-context analyzer.
+
+Works out what ``docker build app/`` actually ships to the daemon. The
+context directory is walked once with os.scandir and every path is run
+through the rules in ``.dockerignore``, using the same semantics as
+Docker's pattern matcher:
+
+- one pattern per line; blank lines and ``#`` comments are ignored
+- patterns are cleaned and a leading ``/`` is dropped, so they are
+  always relative to the context root
+- ``*`` and ``?`` never cross a ``/``, ``**`` matches any number of
+  directories (including none) and ``[...]`` classes are supported
+- a pattern that matches a directory excludes everything below it
+- ``!pattern`` re-includes paths, and the last matching line wins
+- the Dockerfile and .dockerignore are always sent
+
+Excluded directories are not descended into unless an exception pattern
+could re-include something inside them, so an ignored node_modules costs
+one directory entry rather than a full walk.
+
+Included files are hashed in a stable order as they are visited, giving a
+content digest of the effective context. The digest keys image builds and
+cached build results.
+"""
+
+import os
+import re
+import heapq
+import hashlib
+import posixpath
+
+LARGEST_COUNT = 5
+ALWAYS_INCLUDED = ("Dockerfile", ".dockerignore")
+
+
+class Pattern:
+    """One compiled .dockerignore line."""
+
+    __slots__ = ("text", "exclusion", "regex", "dirs")
+
+    def __init__(self, text):
+        self.exclusion = text.startswith("!")
+        if self.exclusion:
+            text = text[1:].strip()
+        text = posixpath.normpath(text.replace("\\", "/") if os.sep == "\\" else text)
+        text = text.lstrip("/") or "."
+        self.text = text
+        self.regex = re.compile(_translate(text))
+        self.dirs = text.split("/")
+
+    def matches(self, path):
+        """True if the pattern matches path or any of its parent directories."""
+        if self.regex.match(path):
+            return True
+        parent = path
+        while "/" in parent:
+            parent = parent.rsplit("/", 1)[0]
+            if self.regex.match(parent):
+                return True
+        return False
+
+
+def _translate(pattern):
+    """Translate a Docker ignore pattern into an anchored regular expression."""
+    out = ["^"]
+    i, n = 0, len(pattern)
+    while i < n:
+        ch = pattern[i]
+        if ch == "*":
+            if i + 1 < n and pattern[i + 1] == "*":
+                i += 1
+                if i + 1 < n and pattern[i + 1] == "/":
+                    i += 1
+                if i + 1 >= n:
+                    out.append(".*")
+                else:
+                    out.append("(.*/)?")
+            else:
+                out.append("[^/]*")
+        elif ch == "?":
+            out.append("[^/]")
+        elif ch == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(ch))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("^") or body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end
+        elif ch == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(ch))
+        i += 1
+    out.append("$")
+    return "".join(out)
+
+
+def load_patterns(text):
+    """Parse .dockerignore text into a list of Pattern objects."""
+    patterns = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line == "!":
+            continue
+        patterns.append(Pattern(line))
+    return patterns
+
+
+def is_excluded(path, patterns):
+    """Apply patterns in order; the last match decides."""
+    excluded = False
+    for pattern in patterns:
+        if pattern.exclusion == excluded and pattern.matches(path):
+            excluded = not pattern.exclusion
+    return excluded
+
+
+def _may_reinclude(directory, patterns):
+    """Could an exception pattern re-include something below directory?"""
+    depth = directory.count("/") + 1
+    parts = directory.split("/")
+    for pattern in patterns:
+        if not pattern.exclusion:
+            continue
+        # Compare the pattern's leading components with the directory's;
+        # anything containing ** could match at any depth.
+        if "**" in pattern.text:
+            return True
+        prefix = "/".join(pattern.dirs[:depth])
+        if len(pattern.dirs) > depth and re.match(_translate(prefix), "/".join(parts)):
+            return True
+    return False
+
+
+class BuildContext:
+    """Summary of an effective build context."""
+
+    __slots__ = ("root", "files", "total_bytes", "digest", "largest", "top_level", "excluded")
+
+    def __init__(self, root):
+        self.root = root
+        self.files = 0
+        self.total_bytes = 0
+        self.digest = None
+        self.largest = []       # [(size, path)] biggest individual files
+        self.top_level = {}     # top-level entry -> bytes below it
+        self.excluded = 0       # paths (files or pruned dirs) left out
+
+    def heaviest_entries(self, count=LARGEST_COUNT):
+        """Top-level files/directories by bytes sent, largest first."""
+        return sorted(self.top_level.items(), key=lambda item: (-item[1], item[0]))[:count]
+
+    def details(self):
+        return {
+            "files": self.files,
+            "bytes": self.total_bytes,
+            "digest": self.digest,
+            "excluded": self.excluded,
+            "largest_files": [[path, size] for size, path in sorted(self.largest, reverse=True)],
+            "largest_entries": [[path, size] for path, size in self.heaviest_entries()],
+        }
+
+
+def _hash_file(h, path):
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+    except OSError:
+        h.update(b"\0unreadable")
+
+
+def walk(context_dir, dockerignore_text=None, context=None):
+    """Yield ``(relative path, os.DirEntry)`` for every file the context sends, in digest order.
+
+    Paths left out are counted in ``context.excluded`` when a BuildContext
+    is given. dockerignore_text is handled as in analyze().
+    """
+    if dockerignore_text is None:
+        try:
+            with open(os.path.join(context_dir, ".dockerignore"), "r", encoding="utf-8") as f:
+                dockerignore_text = f.read()
+        except OSError:
+            dockerignore_text = ""
+    patterns = load_patterns(dockerignore_text)
+    has_exceptions = any(p.exclusion for p in patterns)
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            with os.scandir(os.path.join(context_dir, rel_dir)) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            excluded = rel not in ALWAYS_INCLUDED and is_excluded(rel, patterns)
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                if excluded and not (has_exceptions and _may_reinclude(rel, patterns)):
+                    if context is not None:
+                        context.excluded += 1
+                    continue
+                subdirs.append(rel)
+                continue
+            if excluded:
+                if context is not None:
+                    context.excluded += 1
+                continue
+            yield rel, entry
+        # Reverse so the stack pops subdirectories in name order
+        stack.extend(reversed(subdirs))
+
+
+def analyze(context_dir, dockerignore_text=None, largest=LARGEST_COUNT):
+    """Walk context_dir once and return its BuildContext summary.
+
+    If dockerignore_text is None it is read from context_dir/.dockerignore.
+    A missing context directory yields an empty context.
+    """
+    context = BuildContext(context_dir)
+    h = hashlib.sha256()
+    for rel, entry in walk(context_dir, dockerignore_text, context):
+        try:
+            size = entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            continue
+        context.files += 1
+        context.total_bytes += size
+        top = rel.split("/", 1)[0]
+        context.top_level[top] = context.top_level.get(top, 0) + size
+        if len(context.largest) < largest:
+            heapq.heappush(context.largest, (size, rel))
+        elif size > context.largest[0][0]:
+            heapq.heapreplace(context.largest, (size, rel))
+
+        h.update(rel.encode("utf-8") + b"\0")
+        if entry.is_symlink():
+            h.update(b"->" + os.readlink(entry.path).encode("utf-8", "surrogateescape"))
+        else:
+            _hash_file(h, entry.path)
+        h.update(b"\0")
+
+    context.digest = h.hexdigest()
+    return context
+
+
+def format_size(size):
+    """Human-readable byte count, e.g. "12.3 MB"."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
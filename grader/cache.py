@@ -0,0 +1,147 @@
+"""
+Content-addressed check result cache.
+
+Results are stored in SQLite under ``.grader-cache/`` and keyed by a hash
+of the grader's own source, the check name and the content of every input
+the check declares under "needs" in the CHECKS registry, plus the values of
+the grading options it lists under "options" (a limit such as
+``--max-context-mb`` changes the verdict without changing any file). Re-grading a
+checkout where nothing relevant changed serves those results without
+running the checks again.
+
+Checks that need a resource whose state lives outside the checkout (the
+"docker" daemon's image and volume lists) are never cached. Registry
+entries marked ``"cache": "pass"`` are keyed on their content inputs only
+and cached only when they pass, so environment failures such as a missing
+Docker daemon or a build timeout are retried on the next run.
+
+The cache is size-bounded: once it holds more than ``max_entries`` rows the
+least recently used ones are evicted.
+"""
+
+import os
+import json
+import glob
+import time
+import sqlite3
+import hashlib
+import threading
+
+from grader.context import ARTIFACTS
+
+CACHE_DIRNAME = ".grader-cache"
+DEFAULT_MAX_ENTRIES = 20000
+SCHEMA_VERSION = 2
+
+# Resources whose content can be hashed from the checkout
+CONTENT_RESOURCES = frozenset(ARTIFACTS) | {"context"}
+
+_fingerprint = None
+
+
+def grader_fingerprint():
+    """Hash of the grader's source files and rules, so edits to the grader invalidate the cache."""
+    global _fingerprint
+    if _fingerprint is None:
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        root_dir = os.path.dirname(package_dir)
+        h = hashlib.sha256()
+        paths = ([os.path.join(root_dir, "run.py"), os.path.join(root_dir, "rules.json")]
+                 + sorted(glob.glob(os.path.join(package_dir, "*.py"))))
+        for path in paths:
+            try:
+                with open(path, "rb") as f:
+                    h.update(f.read())
+            except OSError:
+                pass
+        _fingerprint = h.hexdigest()
+    return _fingerprint
+
+
+def cache_inputs(check):
+    """Return the content resources that key a check, or None if it is uncacheable."""
+    needs = check.get("needs", ())
+    inputs = [n for n in needs if n in CONTENT_RESOURCES]
+    if check.get("cache") == "pass":
+        return inputs
+    if len(inputs) != len(needs):
+        return None
+    return inputs
+
+
+class ResultCache:
+    """SQLite-backed store of ``(passed, message, details)`` results keyed by input hashes."""
+
+    def __init__(self, cache_dir, max_entries=DEFAULT_MAX_ENTRIES):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "results.sqlite3")
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # One connection shared by the executor's threads, guarded by
+        # _lock; the timeout covers other processes writing concurrently.
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            (version,) = self._db.execute("PRAGMA user_version").fetchone()
+            if version != SCHEMA_VERSION:
+                self._db.execute("DROP TABLE IF EXISTS results")
+                self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY,"
+                " passed INTEGER NOT NULL,"
+                " message TEXT NOT NULL,"
+                " details TEXT NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+
+    def key(self, check, ctx):
+        """Cache key for running ``check`` against ``ctx``, or None if uncacheable."""
+        inputs = cache_inputs(check)
+        if inputs is None:
+            return None
+        h = hashlib.sha256()
+        h.update(grader_fingerprint().encode("ascii"))
+        h.update(check["name"].encode("utf-8") + b"\0")
+        for resource in sorted(inputs):
+            h.update(resource.encode("ascii") + b"=" + ctx.digest(resource).encode("ascii") + b"\0")
+        for option in sorted(check.get("options", ())):
+            value = json.dumps(ctx.options.get(option), sort_keys=True)
+            h.update(option.encode("ascii") + b":" + value.encode("utf-8") + b"\0")
+        return h.hexdigest()
+
+    def get(self, key):
+        """Return the cached ``(passed, message, details)`` for key, or None."""
+        with self._lock, self._db:
+            row = self._db.execute("SELECT passed, message, details FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        return bool(row[0]), row[1], json.loads(row[2])
+
+    def put(self, key, check, outcome):
+        """Store a check outcome, honouring the check's cache policy."""
+        passed, message, details = outcome
+        if check.get("cache") == "pass" and not passed:
+            return
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, passed, message, details, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, int(passed), message, json.dumps(details), time.time()),
+            )
+            self._evict()
+
+    def _evict(self):
+        (count,) = self._db.execute("SELECT COUNT(*) FROM results").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM results WHERE key IN"
+                " (SELECT key FROM results ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,88 @@
+"""
+GitHub Actions reporting for ``run.py --ci``.
+
+Writes the grade where a workflow step can pick it up, so a job needs one
+step running the same checks as local grading:
+
+- ``$GITHUB_OUTPUT``: ``score``, ``total``, ``passed``, ``provisional``
+  and one ``check_<name>=true|false|skipped`` line per registry entry
+- ``$GITHUB_STEP_SUMMARY``: a Markdown table per module and the final score
+
+Checks that were skipped (Docker checks on a runner without a daemon) are
+listed in both but count towards neither the score nor the total. The
+pass mark is not scaled down for them, so a grade with skipped checks is
+marked provisional: the points it could not grade might change the verdict.
+"""
+
+import re
+
+SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+
+def slug(name):
+    """Output key for a check name, e.g. "Dockerfile exists" -> "dockerfile_exists"."""
+    return SLUG_RE.sub("_", name.lower()).strip("_")
+
+
+def _cell(text):
+    return str(text).replace("|", "\\|").replace("\n", " ")
+
+
+def write_outputs(path, report):
+    """Append step outputs for a grade report to the $GITHUB_OUTPUT file."""
+    lines = [
+        f"score={report['earned_points']}",
+        f"total={report['total_points']}",
+        f"passed={'true' if report['passed'] else 'false'}",
+        f"provisional={'true' if report.get('provisional') else 'false'}",
+    ]
+    for result in report["checks"]:
+        lines.append(f"check_{slug(result['name'])}={'true' if result['passed'] else 'false'}")
+    for check in report.get("skipped", ()):
+        lines.append(f"check_{slug(check['name'])}=skipped")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def format_summary(report, module_names):
+    """Markdown job summary for a grade report."""
+    rows = {}
+    for result in report["checks"]:
+        icon = "✅" if result["passed"] else "❌"
+        rows.setdefault(result["module"], []).append(
+            f"| {icon} | {_cell(result['name'])} | {result['earned']}/{result['points']} | {_cell(result['message'])} |")
+    for check in report.get("skipped", ()):
+        rows.setdefault(check["module"], []).append(
+            f"| ⏭️ | {_cell(check['name'])} | –/{check['points']} | Skipped: no Docker daemon on this runner |")
+
+    lines = ["## Docker Workshop Grade", ""]
+    for module in sorted(rows):
+        name = module_names.get(module)
+        lines += [
+            f"### Module {module:02d}: {name}" if name else f"### Module {module:02d}",
+            "",
+            "| | Check | Points | Details |",
+            "|---|---|---|---|",
+            *rows[module],
+            "",
+        ]
+
+    provisional = " (provisional)" if report.get("provisional") else ""
+    lines += ["---", "", f"## Final Score{provisional}: {report['earned_points']} / {report['total_points']}", ""]
+    if report["passed"]:
+        lines.append(f"✅ **Passed** (pass mark {report['passing_score']})")
+    else:
+        lines.append(f"⚠️ **Keep going!** You need {report['passing_score']} points to pass.")
+    skipped = report.get("skipped")
+    if skipped:
+        points = sum(check["points"] for check in skipped)
+        lines += ["", f"💡 *{len(skipped)} checks ({points} pts) need a Docker daemon and were skipped, "
+                      f"so this result is provisional: the pass mark of {report['passing_score']} applies to the "
+                      "full score. Run `python run.py` locally for full scoring.*"]
+    return "\n".join(lines) + "\n"
+
+
+def write_summary(path, report, module_names):
+    """Append the Markdown job summary to the $GITHUB_STEP_SUMMARY file."""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(format_summary(report, module_names))
@@ -0,0 +1,263 @@
+"""
+Reference-solution build comparison.
+
+Builds the submission's own ``app/Dockerfile`` and the workshop's reference
+solutions (Module 04's Dockerfile, Module 11's multi-stage one) side by
+side, against the same ``app/`` context and on the same daemon, so the
+builds share one layer cache. Each variant is then rebuilt after a
+source-only change: a copy of the context in which one source file (by
+default ``src/index.js``) gains a unique comment line while package.json
+stays as it was. That is the rebuild the Module 04 "COPY package.json
+first" advice is about: a Dockerfile that installs dependencies before
+copying the source reuses the install layer, one that copies everything
+first runs ``npm install`` again.
+
+Per variant the report carries the build time (None when an image for the
+same context and Dockerfile already existed), image size and layer count,
+and the rebuild's time, share of steps served from the cache and whether
+the dependency install came from the cache; deltas are given against each
+reference. Builds still go through the host-wide build slots
+(grader.admission), so on a busy host they overlap as far as the slots
+allow, but they are not grading builds: their times are not recorded for
+build timeouts and they do not start the image collector. Rebuilt images
+are removed once measured.
+
+``run.py --compare-references`` runs this as an optional, unscored check;
+``python -m grader.compare [ROOT]`` prints the comparison for a checkout.
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from grader import build, buildcontext, timing
+from grader.docker_api import DockerInventory, DockerUnavailable
+
+STUDENT = "Your Dockerfile"
+REFERENCES = (
+    ("Module 04 reference", os.path.join("04-containerize-application", "solutions", "Dockerfile")),
+    ("Module 11 reference", os.path.join("11-image-building-best-practices", "solutions", "Dockerfile.multistage")),
+)
+SOURCE_FILE = "src/index.js"
+# Files whose change is not a source-only change
+NOT_SOURCE = ("Dockerfile", ".dockerignore", "package.json", "package-lock.json", "yarn.lock", "npm-shrinkwrap.json")
+
+
+class VariantReport:
+    """Build measurements for one Dockerfile."""
+
+    __slots__ = ("name", "dockerfile", "build", "size", "layer_count", "rebuild", "error")
+
+    def __init__(self, name, dockerfile):
+        self.name = name
+        self.dockerfile = dockerfile
+        self.build = None
+        self.size = None
+        self.layer_count = None
+        self.rebuild = None
+        self.error = None
+
+    @property
+    def build_seconds(self):
+        if self.build is None or not self.build.ok or self.build.skipped:
+            return None
+        return round(self.build.seconds, 3)
+
+    @property
+    def rebuild_seconds(self):
+        return round(self.rebuild.seconds, 3) if self.rebuild is not None and self.rebuild.ok else None
+
+    @property
+    def cache_hit_ratio(self):
+        return self.rebuild.cache_hit_ratio if self.rebuild is not None and self.rebuild.ok else None
+
+    @property
+    def install_cached(self):
+        return build.install_cached(self.rebuild.log) if self.rebuild is not None and self.rebuild.ok else None
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "dockerfile": self.dockerfile,
+            "image": self.build.image if self.build is not None else None,
+            "build_seconds": self.build_seconds,
+            "size": self.size,
+            "layer_count": self.layer_count,
+            "rebuild_seconds": self.rebuild_seconds,
+            "cache_hit_ratio": self.cache_hit_ratio,
+            "install_cached": self.install_cached,
+            "error": self.error,
+        }
+
+
+def variants(root_dir):
+    """``[(name, Dockerfile path or None)]``: the submission's own Dockerfile, then each reference present."""
+    found = [(STUDENT, None)]
+    for name, rel in REFERENCES:
+        path = os.path.join(root_dir, rel)
+        if os.path.isfile(path):
+            found.append((name, path))
+    return found
+
+
+def _source_file(paths):
+    if SOURCE_FILE in paths:
+        return SOURCE_FILE
+    return next((p for p in paths if os.path.basename(p) not in NOT_SOURCE), None)
+
+
+def copy_with_source_change(context_dir, dest, dockerignore_text=None):
+    """Copy what the build context sends into dest and change one source file.
+
+    The change is a unique comment line, so every call yields a context no
+    build has seen. Returns the changed file's path relative to the
+    context, or None if the context has no source file to change.
+    """
+    paths = []
+    for rel, entry in buildcontext.walk(context_dir, dockerignore_text):
+        target = os.path.join(dest, rel)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if entry.is_symlink():
+            os.symlink(os.readlink(entry.path), target)
+        else:
+            # copy2 keeps the mode, which is part of a COPY layer's cache key
+            shutil.copy2(entry.path, target)
+            paths.append(rel)
+    changed = _source_file(paths)
+    if changed is not None:
+        with open(os.path.join(dest, changed), "a", encoding="utf-8") as f:
+            f.write(f"\n// source-only change {os.urandom(8).hex()}\n")
+    return changed
+
+
+def _measure(variant, source, changed, inventory, existing, cache_dir, lease):
+    name, path = variant
+    report = VariantReport(name, path)
+    dockerfile = path or os.path.join(source.root, "Dockerfile")
+    digest = source.digest if path is None else build.variant_digest(source.digest, path)
+    try:
+        report.build = build.build_image(source.root, digest, existing, cache_dir=cache_dir, dockerfile=path,
+                                         lease=lease, housekeeping=False)
+        if not report.build.ok:
+            report.error = f"build failed: {report.build.log.strip()[-200:]}"
+            return report
+        try:
+            report.size, report.layer_count = inventory.image_summary(report.build.image)
+        except DockerUnavailable:
+            pass
+        if changed is not None:
+            # Built from outside the copied context, like the references,
+            # in case .dockerignore leaves the Dockerfile out of the context
+            report.rebuild = build.build_image(changed.root, build.variant_digest(changed.digest, dockerfile),
+                                               cache_dir=cache_dir, dockerfile=dockerfile, housekeeping=False)
+            if not report.rebuild.ok:
+                report.error = f"rebuild failed: {report.rebuild.log.strip()[-200:]}"
+    except subprocess.TimeoutExpired as e:
+        report.error = f"build timed out (>{e.timeout:g} seconds)"
+    return report
+
+
+def _delta(value, reference):
+    if value is None or reference is None:
+        return None
+    return round(value - reference, 3)
+
+
+def versus(report, reference):
+    """Differences between two variants' measurements (positive = report's is larger)."""
+    return {
+        "build_seconds": _delta(report.build_seconds, reference.build_seconds),
+        "size": _delta(report.size, reference.size),
+        "layer_count": _delta(report.layer_count, reference.layer_count),
+        "rebuild_seconds": _delta(report.rebuild_seconds, reference.rebuild_seconds),
+        "cache_hit_ratio": _delta(report.cache_hit_ratio, reference.cache_hit_ratio),
+    }
+
+
+def compare_builds(context_dir, variant_list, inventory=None, cache_dir=None, dockerignore_text=None, lease=None):
+    """Build every variant concurrently, rebuild after a source-only change; return the report dict.
+
+    ``variant_list`` is as returned by variants(), the submission's own
+    Dockerfile first; ``lease`` is passed on to build_image for the
+    variants' images. Raises FileNotFoundError if the docker CLI is missing.
+    """
+    inventory = inventory or DockerInventory()
+    try:
+        existing = inventory.image_tags()
+    except DockerUnavailable:
+        existing = ()
+    source = buildcontext.analyze(context_dir, dockerignore_text)
+    with tempfile.TemporaryDirectory(prefix="grader-compare-") as scratch:
+        changed_dir = os.path.join(scratch, "context")
+        os.makedirs(changed_dir)
+        changed_file = copy_with_source_change(context_dir, changed_dir, dockerignore_text)
+        changed = buildcontext.analyze(changed_dir, dockerignore_text) if changed_file else None
+        measure = timing.bound(lambda variant: _measure(variant, source, changed, inventory, existing, cache_dir, lease))
+        with ThreadPoolExecutor(max_workers=len(variant_list), thread_name_prefix="compare") as pool:
+            reports = list(pool.map(measure, variant_list))
+
+    # Identical Dockerfiles share a tag
+    rebuilt = sorted({r.rebuild.image for r in reports if r.rebuild is not None and r.rebuild.ok})
+    try:
+        build.remove_images(rebuilt)
+    except (OSError, subprocess.SubprocessError, DockerUnavailable):
+        pass
+    student, references = reports[0], reports[1:]
+    return {
+        "changed_file": changed_file,
+        "variants": [r.as_dict() for r in reports],
+        "versus": {r.name: versus(student, r) for r in references if r.error is None},
+    }
+
+
+def _seconds(value):
+    return "reused" if value is None else f"{value:.1f}s"
+
+
+def format_report(report, out):
+    changed = report["changed_file"] or "(no source file to change)"
+    out.write(f"  source-only change: {changed}\n")
+    out.write(f"  {'':<22} {'build':>8} {'rebuild':>8} {'cached':>7} {'deps':>7} {'size':>10} {'layers':>7}\n")
+    for v in report["variants"]:
+        if v["error"]:
+            out.write(f"  {v['name']:<22} {v['error']}\n")
+            continue
+        cached = f"{v['cache_hit_ratio']:.0%}" if v["cache_hit_ratio"] is not None else "-"
+        rebuild = f"{v['rebuild_seconds']:.1f}s" if v["rebuild_seconds"] is not None else "-"
+        size = buildcontext.format_size(v["size"]) if v["size"] is not None else "-"
+        layers = v["layer_count"] if v["layer_count"] is not None else "-"
+        deps = {True: "cached", False: "rerun", None: "-"}[v["install_cached"]]
+        out.write(f"  {v['name']:<22} {_seconds(v['build_seconds']):>8} {rebuild:>8} {cached:>7} {deps:>7} "
+                  f"{size:>10} {layers:>7}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build app/ with its Dockerfile and the reference solutions and compare them")
+    parser.add_argument("root", nargs="?", default=".", help="Workshop checkout (default: current directory)")
+    parser.add_argument("--build-cache", metavar="DIR", help="Persistent BuildKit layer cache directory (uses docker buildx)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+    context_dir = os.path.join(args.root, "app")
+    if not os.path.isfile(os.path.join(context_dir, "Dockerfile")):
+        sys.exit(f"no Dockerfile in {context_dir}")
+    inventory = DockerInventory()
+    try:
+        report = compare_builds(context_dir, variants(args.root), inventory, cache_dir=args.build_cache)
+    except FileNotFoundError:
+        sys.exit("docker is not installed or not in PATH")
+    finally:
+        inventory.close()
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return
+    format_report(report, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
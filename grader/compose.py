@@ -0,0 +1,458 @@
+"""
+Docker Compose model for the grader.
+
+Parses docker-compose.yml once per grade into a ComposeModel: services by
+name with their build, image, ports, environment, volumes, depends_on and
+networks normalized from every syntax Compose accepts, plus the top-level
+volumes and networks. Checks then answer questions such as "which service
+sets MYSQL_HOST?" from indexes instead of scanning the raw text, and
+commented-out configuration no longer counts.
+
+Loading follows Compose's own rules:
+
+* several files merge in order, later ones overriding earlier ones
+  (``docker compose -f docker-compose.yml -f override.yml``), and a
+  ``docker-compose.override.yml`` next to the main file is picked up the
+  way ``docker compose`` does
+* ``extends`` pulls in another service from the same or another file
+* YAML anchors, aliases and ``<<`` merge keys resolve while parsing
+* ``!reset`` and ``!override`` tags in override files clear or replace a
+  value instead of merging into it
+
+Run ``python -m grader.compose FILE [FILE...]`` to print the merged model.
+"""
+
+import os
+import sys
+import copy
+import json
+import argparse
+
+from grader import miniyaml
+from grader.files import read_file, FileRejected
+
+OVERRIDE_FILENAME = "docker-compose.override.yml"
+
+# Service keys whose sequences are appended to (not replaced) when merging
+_APPENDED_KEYS = ("ports", "expose", "external_links", "dns", "dns_search", "tmpfs", "cap_add", "cap_drop",
+                  "devices", "env_file", "security_opt", "configs", "secrets")
+
+
+class ComposeError(ValueError):
+    """A compose file is invalid or cannot be loaded."""
+
+
+class Port:
+    """A published port: ``[host_ip:]published:target[/protocol]`` or the long syntax."""
+
+    __slots__ = ("target", "published", "host_ip", "protocol")
+
+    def __init__(self, target, published=None, host_ip=None, protocol="tcp"):
+        self.target = target
+        self.published = published
+        self.host_ip = host_ip
+        self.protocol = protocol
+
+    @classmethod
+    def parse(cls, entry):
+        if isinstance(entry, dict):
+            published = entry.get("published")
+            return cls(_str(entry.get("target")), _str(published) if published is not None else None,
+                       entry.get("host_ip"), entry.get("protocol") or "tcp")
+        text = str(entry)
+        protocol = "tcp"
+        if "/" in text:
+            text, protocol = text.rsplit("/", 1)
+        parts = text.rsplit(":", 2)
+        if len(parts) == 1:
+            return cls(parts[0], protocol=protocol)
+        if len(parts) == 2:
+            return cls(parts[1], parts[0] or None, protocol=protocol)
+        return cls(parts[2], parts[1] or None, parts[0].strip("[]") or None, protocol)
+
+    def mapping(self):
+        """``published:target`` (or just the target when unpublished)."""
+        return f"{self.published}:{self.target}" if self.published else self.target
+
+    def as_dict(self):
+        return {"target": self.target, "published": self.published, "host_ip": self.host_ip, "protocol": self.protocol}
+
+
+class Mount:
+    """A service volume: a named volume, a bind mount or a tmpfs."""
+
+    __slots__ = ("type", "source", "target", "read_only")
+
+    def __init__(self, type, source, target, read_only=False):
+        self.type = type
+        self.source = source
+        self.target = target
+        self.read_only = read_only
+
+    @classmethod
+    def parse(cls, entry):
+        if isinstance(entry, dict):
+            return cls(entry.get("type") or "volume", entry.get("source"), entry.get("target"),
+                       bool(entry.get("read_only")))
+        parts = str(entry).split(":")
+        if len(parts) == 1:
+            return cls("volume", None, parts[0])  # anonymous volume
+        mode = parts[2] if len(parts) > 2 else ""
+        source, target = parts[0], parts[1]
+        kind = "bind" if source.startswith((".", "/", "~")) else "volume"
+        return cls(kind, source, target, "ro" in mode.split(","))
+
+    def as_dict(self):
+        return {"type": self.type, "source": self.source, "target": self.target, "read_only": self.read_only}
+
+
+class Service:
+    """One service, with its settings normalized to a single shape each."""
+
+    __slots__ = ("name", "image", "build", "ports", "environment", "volumes", "depends_on", "networks", "config")
+
+    def __init__(self, name, config):
+        self.name = name
+        self.config = config
+        self.image = config.get("image")
+        self.build = config.get("build")
+        self.ports = [Port.parse(p) for p in config.get("ports") or ()]
+        self.environment = config.get("environment") or {}
+        self.volumes = [Mount.parse(v) for v in config.get("volumes") or ()]
+        self.depends_on = list(config.get("depends_on") or ())
+        self.networks = list(config.get("networks") or ()) or ["default"]
+
+    @property
+    def build_context(self):
+        """The build context path, or None for image-only services."""
+        return (self.build or {}).get("context")
+
+    def as_dict(self):
+        return {
+            "image": self.image,
+            "build": self.build,
+            "ports": [p.as_dict() for p in self.ports],
+            "environment": self.environment,
+            "volumes": [m.as_dict() for m in self.volumes],
+            "depends_on": self.depends_on,
+            "networks": self.networks,
+        }
+
+
+class ComposeModel:
+    """A merged compose project, indexed for the grader's lookups."""
+
+    def __init__(self, document, files=(), sources=()):
+        self.files = list(files)
+        self.sources = list(sources or files)
+        self.document = document
+        self.has_services_key = "services" in document
+        self.services = {name: Service(name, config) for name, config in (document.get("services") or {}).items()}
+        self.volumes = document.get("volumes")
+        self.networks = document.get("networks")
+
+        # Indexes: environment variable / port mapping -> service names,
+        # mount path -> (service name, Mount), plus every named volume
+        self.env_index = {}
+        self.port_index = {}
+        self.mount_index = {}
+        self.named_volumes = dict.fromkeys(self.volumes or ())
+        for service in self.services.values():
+            for variable in service.environment:
+                self.env_index.setdefault(variable, []).append(service.name)
+            for port in service.ports:
+                # Once per service, however many protocols publish the mapping
+                publishing = self.port_index.setdefault(port.mapping(), [])
+                if service.name not in publishing:
+                    publishing.append(service.name)
+            for mount in service.volumes:
+                # Indexed under the target and each parent directory, so
+                # "what is mounted at or below /app" is one lookup
+                path = _normpath(mount.target)
+                while path:
+                    self.mount_index.setdefault(path, []).append((service.name, mount))
+                    path = path.rsplit("/", 1)[0] if path.count("/") > 1 else ""
+                if mount.type == "volume" and mount.source:
+                    self.named_volumes[mount.source] = None
+
+    def service(self, *names):
+        """The first of ``names`` defined as a service, or None."""
+        for name in names:
+            if name in self.services:
+                return self.services[name]
+        return None
+
+    def services_with_env(self, variable):
+        return self.env_index.get(variable, [])
+
+    def services_publishing(self, mapping):
+        """Services publishing ``published:target`` (e.g. "3000:3000")."""
+        return self.port_index.get(mapping, [])
+
+    def mounts_under(self, target):
+        """``(service name, Mount)`` for every volume mounted at ``target`` or below it."""
+        return self.mount_index.get(_normpath(target), [])
+
+    def as_dict(self):
+        return {
+            "files": self.files,
+            "services": {name: s.as_dict() for name, s in self.services.items()},
+            "volumes": self.volumes,
+            "networks": self.networks,
+        }
+
+
+def _str(value):
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _normpath(path):
+    if not path:
+        return ""
+    return path.rstrip("/") or "/"
+
+
+# ─── Normalization ─────────────────────────────────────────────────────────
+
+def _mapping_from_list(entries, separator="="):
+    result = {}
+    for entry in entries:
+        entry = str(entry)
+        key, sep, value = entry.partition(separator)
+        result[key.strip()] = value if sep else None
+    return result
+
+
+def normalize_service(name, config):
+    """Rewrite list/short forms in a raw service so every key has one shape."""
+    if config is None:
+        config = {}
+    if not isinstance(config, dict):
+        raise ComposeError(f"service {name!r} must be a mapping")
+    config = dict(config)
+
+    environment = config.get("environment")
+    if isinstance(environment, list):
+        config["environment"] = _mapping_from_list(environment)
+    elif isinstance(environment, dict):
+        config["environment"] = {str(k): _str(v) for k, v in environment.items()}
+
+    labels = config.get("labels")
+    if isinstance(labels, list):
+        config["labels"] = _mapping_from_list(labels)
+
+    build = config.get("build")
+    if isinstance(build, str):
+        config["build"] = {"context": build}
+
+    depends_on = config.get("depends_on")
+    if isinstance(depends_on, list):
+        config["depends_on"] = {str(dep): {"condition": "service_started"} for dep in depends_on}
+
+    networks = config.get("networks")
+    if isinstance(networks, list):
+        config["networks"] = dict.fromkeys(str(n) for n in networks)
+
+    extends = config.get("extends")
+    if isinstance(extends, str):
+        config["extends"] = {"service": extends}
+    return config
+
+
+# ─── Merging ───────────────────────────────────────────────────────────────
+
+def _is_tag(value, tag):
+    return isinstance(value, miniyaml.Tagged) and value.tag == tag
+
+
+def _untag(value):
+    """Strip !reset/!override wrappers that no longer have anything to apply to."""
+    if isinstance(value, miniyaml.Tagged):
+        return None if value.tag == "!reset" else _untag(value.value)
+    if isinstance(value, dict):
+        return {k: _untag(v) for k, v in value.items() if not _is_tag(v, "!reset")}
+    if isinstance(value, list):
+        return [_untag(v) for v in value]
+    return value
+
+
+def _merge_mappings(base, override):
+    result = dict(base)
+    for key, value in override.items():
+        if _is_tag(value, "!reset"):
+            result.pop(key, None)
+        elif _is_tag(value, "!override"):
+            result[key] = _untag(value.value)
+        elif isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = _merge_mappings(result[key], value)
+        else:
+            result[key] = _untag(value)
+    return result
+
+
+def merge_service(base, override):
+    """Merge two normalized service definitions the way Compose does."""
+    result = dict(base)
+    for key, value in override.items():
+        current = result.get(key)
+        if _is_tag(value, "!reset"):
+            result.pop(key, None)
+        elif _is_tag(value, "!override"):
+            result[key] = _untag(value.value)
+        elif key in _APPENDED_KEYS and isinstance(value, list) and isinstance(current, list):
+            result[key] = current + [v for v in value if v not in current]
+        elif key == "volumes" and isinstance(value, list) and isinstance(current, list):
+            # Volumes merge by mount target: an override replaces the mount at the same path
+            merged = {Mount.parse(v).target: v for v in current}
+            merged.update((Mount.parse(v).target, v) for v in value)
+            result[key] = list(merged.values())
+        elif isinstance(value, dict) and isinstance(current, dict):
+            result[key] = _merge_mappings(current, value)
+        else:
+            result[key] = _untag(value)
+    return result
+
+
+def merge_documents(base, override):
+    """Merge two compose documents with normalized services."""
+    result = dict(base)
+    for key, value in override.items():
+        if key == "services" and isinstance(value, dict):
+            services = dict(result.get("services") or {})
+            for name, config in value.items():
+                if _is_tag(config, "!reset"):
+                    services.pop(name, None)
+                elif name in services:
+                    services[name] = merge_service(services[name], config)
+                else:
+                    services[name] = _untag(config)
+            result["services"] = services
+        elif _is_tag(value, "!reset"):
+            result.pop(key, None)
+        elif isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = _merge_mappings(result[key], value)
+        elif value is None and key in result:
+            continue  # "volumes:" with nothing under it adds nothing
+        else:
+            result[key] = _untag(value)
+    return result
+
+
+# ─── Loading ───────────────────────────────────────────────────────────────
+
+class ComposeLoader:
+    """Reads compose files, resolving ``extends`` across files, with each file parsed once."""
+
+    def __init__(self, read=read_file):
+        self.read = read
+        self._documents = {}
+
+    def document(self, path, text=None):
+        """Parsed document for path, with services normalized (``extends`` not yet resolved)."""
+        path = os.path.abspath(path)
+        if path not in self._documents:
+            if text is None:
+                if not os.path.isfile(path):
+                    raise ComposeError(f"{path}: file not found")
+                try:
+                    text = self.read(path)
+                except FileRejected as e:
+                    raise ComposeError(str(e)) from e
+            try:
+                document = miniyaml.loads(text)
+            except miniyaml.YAMLError as e:
+                raise ComposeError(f"{os.path.basename(path)}, {e}") from e
+            if document is None:
+                document = {}
+            if not isinstance(document, dict):
+                raise ComposeError(f"{os.path.basename(path)}: top level must be a mapping")
+            services = document.get("services")
+            if services is not None and not isinstance(services, dict):
+                raise ComposeError(f"{os.path.basename(path)}: 'services' must be a mapping")
+            if services:
+                document = dict(document, services={
+                    str(name): config if isinstance(config, miniyaml.Tagged) else normalize_service(name, config)
+                    for name, config in services.items()
+                })
+            self._documents[path] = document
+        return self._documents[path]
+
+    def resolve_service(self, path, name, stack=()):
+        """Service ``name`` from the file at path with its ``extends`` chain applied."""
+        key = (os.path.abspath(path), name)
+        if key in stack:
+            chain = " -> ".join(n for _, n in stack + (key,))
+            raise ComposeError(f"circular extends: {chain}")
+        services = self.document(path).get("services") or {}
+        if name not in services:
+            raise ComposeError(f"{os.path.basename(path)}: extends unknown service {name!r}")
+        config = services[name]
+        extends = config.get("extends")
+        if not extends:
+            return config
+        if not isinstance(extends, dict) or "service" not in extends:
+            raise ComposeError(f"service {name!r}: extends needs a 'service'")
+        base_path = path
+        if extends.get("file"):
+            base_path = os.path.join(os.path.dirname(os.path.abspath(path)), extends["file"])
+        base = self.resolve_service(base_path, extends["service"], stack + (key,))
+        config = {k: v for k, v in config.items() if k != "extends"}
+        return merge_service(copy.deepcopy(base), config)
+
+    def load_document(self, path, text=None):
+        """One file's document with every service's ``extends`` resolved."""
+        document = self.document(path, text)
+        services = document.get("services")
+        if not services:
+            return document
+        return dict(document, services={
+            name: config if isinstance(config, miniyaml.Tagged) else self.resolve_service(path, name)
+            for name, config in services.items()
+        })
+
+    @property
+    def sources(self):
+        """Every file read so far, including ``extends`` targets."""
+        return list(self._documents)
+
+
+def load(paths, texts=None, read=read_file):
+    """Load and merge compose files in order into a ComposeModel.
+
+    ``texts`` may supply already-read contents by path, so callers that
+    hold a file in memory do not read it twice.
+    """
+    loader = ComposeLoader(read)
+    texts = texts or {}
+    merged = None
+    for path in paths:
+        document = loader.load_document(path, texts.get(path))
+        merged = document if merged is None else merge_documents(merged, document)
+    return ComposeModel(merged or {}, [os.path.abspath(p) for p in paths], loader.sources)
+
+
+def default_files(path):
+    """``path`` plus docker-compose.override.yml beside it, if present (as docker compose does)."""
+    override = os.path.join(os.path.dirname(os.path.abspath(path)), OVERRIDE_FILENAME)
+    return [path, override] if os.path.isfile(override) else [path]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the merged model of one or more compose files")
+    parser.add_argument("files", nargs="+", help="Compose files, merged in order")
+    args = parser.parse_args()
+    try:
+        model = load(args.files)
+    except ComposeError as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+    json.dump(model.as_dict(), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
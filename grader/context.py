@@ -0,0 +1,257 @@
+"""
+Per-grade artifact context.
+
+A GradeContext is created once per grade run and handed to every check.
+Workshop artifacts are read (and parsed) the first time a check asks for
+them and served from memory afterwards, so a full grade reads each file
+once no matter how many checks look at it. The same goes for the Docker
+daemon's image and volume listings.
+
+Long-running graders can also pass an ArtifactStore (as the
+"artifact_store" option) to keep artifacts read and parsed across grades;
+entries are revalidated against the file's metadata before reuse.
+
+Each artifact has a size cap (ARTIFACT_LIMITS). An artifact over its cap,
+binary or not a regular file raises FileRejected from the accessors, which
+run.py reports as that check's failure; ``scan()`` searches a large
+artifact through a memory map instead of reading it.
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+from grader import dockerfile, buildcontext, compose, build
+from grader.docker_api import DockerInventory, OfflineInventory
+from grader.files import read_file, scan, file_exists, FileRejected
+
+# Artifact name -> path relative to the submission root. The names double as
+# the file resources checks list under "needs" in the CHECKS registry.
+ARTIFACTS = {
+    "dockerfile": os.path.join("app", "Dockerfile"),
+    "dockerignore": os.path.join("app", ".dockerignore"),
+    "package_json": os.path.join("app", "package.json"),
+    "index_html": os.path.join("app", "src", "static", "index.html"),
+    "compose": "docker-compose.yml",
+    "compose_override": "docker-compose.override.yml",
+}
+
+# Artifact name -> largest file the grader will read for it, in bytes. The
+# workshop's own files are a few KB; index.html is only ever searched.
+ARTIFACT_LIMITS = {
+    "dockerfile": 1024 * 1024,
+    "dockerignore": 1024 * 1024,
+    "package_json": 4 * 1024 * 1024,
+    "index_html": 64 * 1024 * 1024,
+    "compose": 1024 * 1024,
+    "compose_override": 1024 * 1024,
+}
+
+
+class ArtifactStore:
+    """Artifacts read and parsed by earlier grades, keyed by path and file metadata."""
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, kind, loader):
+        """Return ``loader(path)``, reusing the last result while the file is unchanged."""
+        # Stat before loading: if the file changes mid-read the stored
+        # signature is already stale and the next grade reloads it.
+        signature = _stat_signature(path)
+        key = (kind, path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        value = loader(path)
+        with self._lock:
+            self._entries[key] = (signature, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def _stat_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _read_artifact(artifact):
+    limit = ARTIFACT_LIMITS[artifact]
+    return lambda path: read_file(path, limit)
+
+
+def _parse_dockerfile(path):
+    return dockerfile.parse(read_file(path, ARTIFACT_LIMITS["dockerfile"]))
+
+
+class GradeContext:
+    """Paths, grading options and cached artifacts for one submission checkout."""
+
+    def __init__(self, root_dir, options=None):
+        self.root_dir = os.path.abspath(root_dir)
+        self.app_dir = os.path.join(self.root_dir, "app")
+        self.options = options or {}
+        self._store = self.options.get("artifact_store")
+        self._cache = {}
+        self._lock = threading.RLock()
+        self._leases = {}
+
+    def _memo(self, key, loader):
+        # Checks run on several threads; the lock keeps each loader to a
+        # single call per context.
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = loader()
+            return self._cache[key]
+
+    def _load(self, artifact, kind, loader):
+        # Through the shared store when there is one, memoized per grade
+        # either way so every check sees the same snapshot.
+        path = self.path(artifact)
+        if self._store is None:
+            return self._memo((kind, artifact), lambda: loader(path))
+        return self._memo((kind, artifact), lambda: self._store.get(path, kind, loader))
+
+    def path(self, artifact):
+        """Absolute path of a named artifact."""
+        return os.path.join(self.root_dir, ARTIFACTS[artifact])
+
+    def exists(self, artifact):
+        """Whether a named artifact is present in the checkout."""
+        return self._memo(("exists", artifact), lambda: file_exists(self.path(artifact)))
+
+    def text(self, artifact):
+        """Contents of a named artifact, or empty string if missing.
+
+        Raises FileRejected if the artifact is over its size cap, binary or
+        not a regular file.
+        """
+        return self._load(artifact, "text", _read_artifact(artifact))
+
+    def scan(self, artifact, patterns):
+        """Whether each regular expression in ``patterns`` matches a named artifact.
+
+        All patterns are searched in one pass over the file, without
+        loading it into memory; a grade scans each artifact once per
+        pattern tuple. Returns a tuple of bools, or None if the artifact is
+        missing or empty. Raises FileRejected like text().
+        """
+        return self._memo(("scan", artifact, patterns),
+                          lambda: scan(self.path(artifact), patterns, ARTIFACT_LIMITS[artifact]))
+
+    def digest(self, resource):
+        """SHA-256 of a content resource: a named artifact, or "context" for the build context."""
+        if resource == "context":
+            return self.build_context.digest
+        if resource == "compose":
+            return self._memo("compose_digest", self._compose_digest)
+        return self._load(resource, "digest", file_digest)
+
+    def _compose_digest(self):
+        # The compose model can read more than docker-compose.yml: the
+        # override file and any file named by "extends"
+        try:
+            paths = self.compose_model.sources
+        except compose.ComposeError:
+            paths = [self.path("compose")]
+        h = hashlib.sha256()
+        for path in paths:
+            h.update(path.encode("utf-8") + b"=" + file_digest(path).encode("ascii") + b"\0")
+        return h.hexdigest()
+
+    @property
+    def build_context(self):
+        """BuildContext summary of app/ as docker build would send it."""
+        return self._memo("build_context", lambda: buildcontext.analyze(self.app_dir, self.text("dockerignore")))
+
+    @property
+    def dockerfile(self):
+        """Parsed app/Dockerfile instructions."""
+        if self._store is None:
+            return self._memo("dockerfile", lambda: dockerfile.parse(self.text("dockerfile")))
+        return self._load("dockerfile", "dockerfile", _parse_dockerfile)
+
+    @property
+    def compose_model(self):
+        """ComposeModel of docker-compose.yml, merged with docker-compose.override.yml if present.
+
+        Raises ComposeError if the files cannot be loaded and FileRejected if
+        one is over its size cap, binary or not a regular file.
+        """
+        model, error = self._memo("compose_model", self._load_compose)
+        if isinstance(error, FileRejected):
+            raise FileRejected(str(error))
+        if error is not None:
+            raise compose.ComposeError(str(error))
+        return model
+
+    def _load_compose(self):
+        artifacts = ["compose"] + (["compose_override"] if self.exists("compose_override") else [])
+        try:
+            texts = {self.path(a): self.text(a) for a in artifacts}
+            return compose.load(list(texts), texts), None
+        except (compose.ComposeError, FileRejected) as e:
+            return None, e
+
+    @property
+    def docker(self):
+        """DockerInventory shared by every check in this grade.
+
+        A "docker_inventory" option supplies one that outlives the grade;
+        with the "docker" option False every listing raises DockerUnavailable.
+        """
+        if self.options.get("docker") is False:
+            return self._memo("docker", OfflineInventory)
+        return self._memo("docker", lambda: self.options.get("docker_inventory") or DockerInventory())
+
+    def lease_image(self, tag):
+        """Keep the test image ``tag`` from being collected until this grade ends."""
+        with self._lock:
+            if tag not in self._leases:
+                self._leases[tag] = build.lease_image(tag)
+
+    def close(self):
+        """Release connections and image leases held for this grade. Safe to call twice."""
+        with self._lock:
+            leases, self._leases = self._leases, {}
+            inventory = self._cache.pop("docker", None)
+        for lease in leases.values():
+            if lease is not None:
+                lease.close()
+        if inventory is not None and inventory is not self.options.get("docker_inventory"):
+            inventory.close()
+
+
+def file_digest(path):
+    """SHA-256 of a file's bytes, or of the marker "missing" if it is absent."""
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+    except OSError:
+        return hashlib.sha256(b"missing").hexdigest()
+    return h.hexdigest()
+
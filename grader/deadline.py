@@ -0,0 +1,91 @@
+"""
+Time budget for one grade.
+
+A Deadline ends when its budget (``--deadline SECONDS``) runs out, or
+earlier when the grader ends it on purpose (``--stop-at-pass`` once the
+pass mark is reached). Subprocesses started through ``timing.run`` while a
+check runs under a deadline get at most the time that is left, are
+registered with it and are killed the moment it ends, along with their
+own children (a docker CLI plugin such as buildx, which would otherwise
+keep building and hold the output pipes open); the executor stops
+waiting for unfinished checks, which are reported as timed out (or not
+run) instead of holding up the grade.
+"""
+
+import os
+import time
+import signal
+import threading
+
+TIMED_OUT = "timed out"
+PASS_REACHED = "pass mark reached"
+
+
+def kill_process(process, group=False):
+    """Kill a Popen, or with ``group`` the process group it leads."""
+    try:
+        if group:
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except OSError:
+        pass
+
+
+class Deadline:
+    """A grade's time budget, which can also be ended early."""
+
+    def __init__(self, seconds=None):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds if seconds else None
+        self.reason = None
+        self._ended = threading.Event()
+        self._lock = threading.Lock()
+        self._processes = {}
+        self._timer = None
+        if self.expires is not None:
+            self._timer = threading.Timer(seconds, self.end, args=(TIMED_OUT,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def remaining(self):
+        """Seconds left, 0 once ended, or None without a time budget."""
+        if self._ended.is_set():
+            return 0.0
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.monotonic())
+
+    def ended(self):
+        return self._ended.is_set()
+
+    def wait(self, timeout):
+        """Block until the deadline ends or timeout passes; return whether it ended."""
+        return self._ended.wait(timeout)
+
+    def end(self, reason):
+        """End the deadline now, killing the subprocesses registered with it."""
+        with self._lock:
+            if self._ended.is_set():
+                return
+            self.reason = reason
+            self._ended.set()
+            processes = list(self._processes.items())
+        for process, group in processes:
+            kill_process(process, group)
+
+    def register(self, process, group=False):
+        """Kill ``process`` (a Popen; with ``group``, its process group) if the deadline ends while it runs."""
+        with self._lock:
+            if not self._ended.is_set():
+                self._processes[process] = group
+                return
+        kill_process(process, group)
+
+    def unregister(self, process):
+        with self._lock:
+            self._processes.pop(process, None)
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
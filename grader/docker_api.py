@@ -0,0 +1,235 @@
+"""
+Minimal Docker Engine API client.
+
+Talks HTTP to the daemon's Unix socket over one persistent connection using
+only the standard library, so Docker-backed checks do not fork the docker
+CLI for every query. DockerInventory sits on top of it and memoizes image
+and volume listings for the lifetime of a grade, or for a few seconds at a
+time when one inventory serves many grades (``run.py serve``).
+
+Where no Unix socket is available (Docker Desktop on Windows exposes a
+named pipe instead) the inventory falls back to the docker CLI.
+"""
+
+import os
+import json
+import time
+import socket
+import threading
+import subprocess
+import http.client
+from urllib.parse import quote, urlencode
+
+from grader import timing, admission
+
+DEFAULT_SOCKET = "/var/run/docker.sock"
+
+
+class DockerUnavailable(Exception):
+    """The Docker daemon could not be reached or returned an error."""
+
+
+def socket_path_from_env():
+    """Socket path from DOCKER_HOST (unix:// only), else the default socket."""
+    host = os.environ.get("DOCKER_HOST", "")
+    if host.startswith("unix://"):
+        return host[len("unix://"):]
+    if host:
+        return None
+    return DEFAULT_SOCKET
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection that connects to a Unix domain socket."""
+
+    def __init__(self, socket_path, timeout=30):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class DockerClient:
+    """JSON-over-HTTP client for the Docker Engine API on a Unix socket."""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, timeout=30):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+        return self._conn
+
+    def request(self, method, path, params=None, body=None):
+        """Send a request and return the decoded JSON body (or None if empty)."""
+        if params:
+            path = f"{path}?{urlencode(params)}"
+        headers = {}
+        if body is not None:
+            body = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        with self._lock:
+            # Retry once on a fresh connection: the daemon may have closed
+            # an idle keep-alive connection between requests.
+            for attempt in (1, 2):
+                conn = self._connection()
+                try:
+                    conn.request(method, path, body=body, headers=headers)
+                    response = conn.getresponse()
+                    payload = response.read()
+                    break
+                except (OSError, http.client.HTTPException) as e:
+                    self._close_connection()
+                    if attempt == 2 or isinstance(e, (FileNotFoundError, ConnectionRefusedError)):
+                        raise DockerUnavailable(f"cannot reach Docker at {self.socket_path}: {e}") from e
+
+        if response.status >= 400:
+            try:
+                message = json.loads(payload).get("message", "")
+            except ValueError:
+                message = payload.decode("utf-8", "replace")
+            raise DockerUnavailable(f"{method} {path} failed ({response.status}): {message}")
+        if not payload:
+            return None
+        content_type = response.getheader("Content-Type", "")
+        if "json" not in content_type:
+            return payload.decode("utf-8", "replace")
+        return json.loads(payload)
+
+    def get(self, path, params=None):
+        return self.request("GET", path, params=params)
+
+    def ping(self):
+        """Return True if the daemon answers /_ping."""
+        try:
+            return self.get("/_ping") == "OK"
+        except DockerUnavailable:
+            return False
+
+    def _close_connection(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def close(self):
+        with self._lock:
+            self._close_connection()
+
+
+def _cli_lines(args, timeout=30):
+    try:
+        with admission.admitted("query"):
+            result = timing.run(["docker"] + args, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise DockerUnavailable(f"docker {args[0]} failed: {e}") from e
+    if result.returncode != 0:
+        raise DockerUnavailable(result.stderr.strip() or f"docker {args[0]} exited {result.returncode}")
+    return [line for line in result.stdout.splitlines() if line.strip()]
+
+
+def daemon_reachable(timeout=10):
+    """Whether a Docker daemon answers, over the socket or through the CLI."""
+    path = socket_path_from_env()
+    if path and hasattr(socket, "AF_UNIX") and os.path.exists(path):
+        client = DockerClient(path, timeout=timeout)
+        try:
+            return client.ping()
+        finally:
+            client.close()
+    try:
+        _cli_lines(["version", "--format", "{{.Server.Version}}"], timeout=timeout)
+    except DockerUnavailable:
+        return False
+    return True
+
+
+class DockerInventory:
+    """Image and volume listings, fetched at most once each per grade (or per ``ttl`` seconds)."""
+
+    def __init__(self, client=None, ttl=None):
+        if client is None:
+            path = socket_path_from_env()
+            if path and hasattr(socket, "AF_UNIX") and os.path.exists(path):
+                client = DockerClient(path)
+        self.client = client
+        self.ttl = ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _memo(self, key, loader):
+        # Failures are memoized too, so an unreachable daemon costs one
+        # round trip per grade rather than one per check.
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or (self.ttl is not None and time.monotonic() - entry[0] > self.ttl):
+                try:
+                    entry = (time.monotonic(), True, loader())
+                except DockerUnavailable as e:
+                    entry = (time.monotonic(), False, e)
+                self._cache[key] = entry
+            _, ok, value = entry
+        if not ok:
+            raise value
+        return value
+
+    def image_tags(self):
+        """Every ``repository:tag`` reference known to the daemon."""
+        return self._memo("images", self._load_image_tags)
+
+    def volume_names(self):
+        """Names of every volume known to the daemon."""
+        return self._memo("volumes", self._load_volume_names)
+
+    def image_summary(self, tag):
+        """``(size in bytes, layer count)`` of one image; not memoized, images change during a grade."""
+        if self.client is None:
+            lines = _cli_lines(["image", "inspect", "--format", "{{.Size}} {{len .RootFS.Layers}}", tag])
+            try:
+                size, count = lines[0].split()
+                return int(size), int(count)
+            except (IndexError, ValueError):
+                raise DockerUnavailable(f"unexpected docker image inspect output for {tag}") from None
+        image = self.client.get(f"/images/{quote(tag, safe='')}/json") or {}
+        return image.get("Size", 0), len((image.get("RootFS") or {}).get("Layers") or [])
+
+    def _load_image_tags(self):
+        if self.client is None:
+            return _cli_lines(["images", "--format", "{{.Repository}}:{{.Tag}}"])
+        tags = []
+        for image in self.client.get("/images/json") or []:
+            tags.extend(image.get("RepoTags") or [])
+        return tags
+
+    def _load_volume_names(self):
+        if self.client is None:
+            return _cli_lines(["volume", "ls", "--format", "{{.Name}}"])
+        listing = self.client.get("/volumes") or {}
+        return [v["Name"] for v in listing.get("Volumes") or []]
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+
+
+class OfflineInventory:
+    """Stands in for DockerInventory when Docker is turned off: every listing raises DockerUnavailable."""
+
+    def _unavailable(self, *args):
+        raise DockerUnavailable("Docker is turned off for this grade")
+
+    image_tags = volume_names = image_summary = _unavailable
+
+    def close(self):
+        pass
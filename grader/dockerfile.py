@@ -0,0 +1,181 @@
+"""
+Dockerfile parser.
+
+A single-pass, streaming parser that follows the rules BuildKit uses for
+the parts of the syntax the grader cares about:
+
+- parser directives (``# syntax=``, ``# escape=``, ``# check=``) at the top
+  of the file, including a custom escape character
+- line continuations, with comment and blank lines inside a continued
+  instruction dropped
+- comments, which never produce instructions
+- heredocs (``RUN <<EOF`` ... ``EOF``) on RUN, COPY and ADD
+
+The result is a compact list of Instruction records carrying the build
+stage index, the upper-cased instruction keyword, its arguments and the
+source line the instruction starts on. Checks query that list instead of
+running regular expressions over the raw text.
+"""
+
+import re
+
+DIRECTIVE_RE = re.compile(r"^#\s*([a-zA-Z][a-zA-Z0-9]*)\s*=\s*(.+?)\s*$")
+DIRECTIVES = ("syntax", "escape", "check")
+KEYWORD_RE = re.compile(r"(\S+)\s*(.*)", re.DOTALL)
+HEREDOC_RE = re.compile(r"<<(-?)\s*([\"']?)([A-Za-z_][\w.-]*)\2")
+HEREDOC_INSTRUCTIONS = ("RUN", "COPY", "ADD")
+
+
+class Instruction:
+    """One Dockerfile instruction."""
+
+    __slots__ = ("stage", "instruction", "arguments", "line")
+
+    def __init__(self, stage, instruction, arguments, line):
+        self.stage = stage              # 0-based build stage, -1 before the first FROM
+        self.instruction = instruction  # upper-cased keyword, e.g. "COPY"
+        self.arguments = arguments      # everything after the keyword
+        self.line = line                # 1-based source line of the keyword
+
+    def __repr__(self):
+        return f"Instruction({self.stage}, {self.instruction!r}, {self.arguments!r}, line={self.line})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Instruction):
+            return NotImplemented
+        return (self.stage, self.instruction, self.arguments, self.line) == \
+            (other.stage, other.instruction, other.arguments, other.line)
+
+    def flags(self):
+        """Return ``{flag: value}`` for leading ``--flag[=value]`` arguments."""
+        flags = {}
+        for token in self.arguments.split():
+            if not token.startswith("--"):
+                break
+            name, _, value = token[2:].partition("=")
+            flags[name.lower()] = value
+        return flags
+
+    def operands(self):
+        """Return the arguments with any leading ``--flags`` removed."""
+        tokens = self.arguments.split()
+        while tokens and tokens[0].startswith("--"):
+            tokens.pop(0)
+        return " ".join(tokens)
+
+
+def _is_comment(line):
+    return line.lstrip().startswith("#")
+
+
+def iter_instructions(lines):
+    """Yield Instruction records from an iterable of source lines."""
+    escape = "\\"
+    in_directives = True
+    stage = -1
+    lines = iter(lines)
+    lineno = 0
+
+    for raw in lines:
+        lineno += 1
+        line = raw.rstrip("\r\n")
+
+        if in_directives:
+            match = DIRECTIVE_RE.match(line)
+            if match and match.group(1).lower() in DIRECTIVES:
+                if match.group(1).lower() == "escape" and match.group(2) in ("\\", "`"):
+                    escape = match.group(2)
+                continue
+            in_directives = False
+
+        stripped = line.strip()
+        if not stripped or _is_comment(stripped):
+            continue
+
+        start = lineno
+        parts = []
+        current = stripped
+        while True:
+            body = current.rstrip()
+            if body.endswith(escape):
+                parts.append(body[:-1])
+                # Continued instruction: skip comment and blank lines
+                for raw in lines:
+                    lineno += 1
+                    current = raw.rstrip("\r\n").lstrip()
+                    if current and not _is_comment(current):
+                        break
+                else:
+                    current = None
+                if current is None:
+                    break
+                continue
+            parts.append(body)
+            break
+
+        match = KEYWORD_RE.match("".join(parts))
+        if match is None:
+            # A lone escape character continued into blank lines, comments
+            # or the end of the file: there is no instruction to yield
+            continue
+        keyword, arguments = match.groups()
+        keyword = keyword.upper()
+        arguments = arguments.strip()
+
+        if keyword in HEREDOC_INSTRUCTIONS:
+            for dash, _, word in HEREDOC_RE.findall(arguments):
+                body = []
+                for raw in lines:
+                    lineno += 1
+                    doc_line = raw.rstrip("\r\n")
+                    if dash:
+                        doc_line = doc_line.lstrip("\t")
+                    if doc_line == word:
+                        break
+                    body.append(doc_line)
+                arguments = arguments + "\n" + "\n".join(body)
+
+        if keyword == "FROM":
+            stage += 1
+        yield Instruction(stage, keyword, arguments, start)
+
+
+def parse(text):
+    """Parse Dockerfile text into a list of Instruction records."""
+    return list(iter_instructions(text.splitlines()))
+
+
+def parse_file(path):
+    """Parse a Dockerfile from disk, streaming it line by line."""
+    with open(path, "r", encoding="utf-8") as f:
+        return list(iter_instructions(f))
+
+
+def find(instructions, name, stage=None):
+    """Return every instruction with the given keyword, optionally in one stage."""
+    name = name.upper()
+    return [
+        i for i in instructions
+        if i.instruction == name and (stage is None or i.stage == stage)
+    ]
+
+
+def stage_count(instructions):
+    """Number of build stages (FROM instructions)."""
+    return len(find(instructions, "FROM"))
+
+
+def stage_names(instructions):
+    """Return ``{stage index: name}`` for stages declared with ``FROM ... AS name``."""
+    names = {}
+    for i in find(instructions, "FROM"):
+        tokens = i.operands().split()
+        if len(tokens) >= 3 and tokens[1].upper() == "AS":
+            names[i.stage] = tokens[2]
+    return names
+
+
+def final_stage(instructions):
+    """Instructions belonging to the last build stage."""
+    last = stage_count(instructions) - 1
+    return [i for i in instructions if i.stage == last]
@@ -0,0 +1,66 @@
+"""
+NDJSON progress events for ``run.py --stream``.
+
+Writes one JSON object per line as grading progresses, so dashboards can
+render a grade while it runs and pipelines can consume results straight
+from stdout:
+
+    {"event": "grade_started", "root": ..., "checks": 23, "total_points": 100}
+    {"event": "check_started", "name": ..., "module": 4}
+    {"event": "check_finished", "name": ..., "passed": true, "timing": {...}, ...}
+    {"event": "module_summary", "module": 4, "earned": 20, "points": 25, ...}
+    {"event": "score", "earned_points": 78, "total_points": 100, "passed": true, ...}
+
+Check events are written from the executor's worker threads the moment a
+check starts or finishes, so they arrive in completion order rather than
+registry order. A module's summary follows its last check.
+"""
+
+import sys
+import json
+import time
+import threading
+
+
+class EventStream:
+    """Thread-safe NDJSON event writer for one grade."""
+
+    def __init__(self, checks, out=None):
+        self.out = out or sys.stdout
+        self._lock = threading.Lock()
+        self._remaining = {}
+        self._modules = {}
+        for check in checks:
+            module = check["module"]
+            self._remaining[module] = self._remaining.get(module, 0) + 1
+            self._modules.setdefault(module, {"earned": 0, "points": 0, "passed": 0, "failed": 0})
+
+    def emit(self, event, **fields):
+        line = json.dumps({"event": event, "ts": round(time.time(), 3), **fields})
+        with self._lock:
+            self.out.write(line + "\n")
+            self.out.flush()
+
+    def grade_started(self, root_dir, checks):
+        self.emit("grade_started", root=root_dir, checks=len(checks),
+                  total_points=sum(c["points"] for c in checks))
+
+    def check_started(self, check):
+        self.emit("check_started", name=check["name"], module=check["module"])
+
+    def check_finished(self, result):
+        self.emit("check_finished", **result)
+        module = result["module"]
+        with self._lock:
+            summary = self._modules[module]
+            summary["earned"] += result["earned"]
+            summary["points"] += result["points"]
+            summary["passed" if result["passed"] else "failed"] += 1
+            self._remaining[module] -= 1
+            done = self._remaining[module] == 0
+        if done:
+            self.emit("module_summary", module=module, **summary)
+
+    def score(self, report):
+        """Final event: the JSON report without its per-check list."""
+        self.emit("score", **{k: v for k, v in report.items() if k != "checks"})
@@ -0,0 +1,192 @@
+"""
+Concurrent check executor.
+
+Checks declare the external resources they touch with a ``needs`` tuple in
+the CHECKS registry (for example ``("docker",)`` or ``("build", "docker")``)
+and, optionally, the resources they produce with ``provides``. The executor
+runs independent checks on a thread pool, caps how many checks may hold a
+given resource at once, holds consumers of a resource back until every
+check providing it has finished, and hands results back in registry order
+so output stays grouped by module. A consumer whose provider failed (its
+result did not pass) is not run at all when the caller supplies ``skip``:
+there is nothing for it to use.
+
+Checks that touch none of the EXPENSIVE_RESOURCES (static checks on the
+checkout's files) are started first, so under a Deadline (grader.deadline)
+they are done before builds and containers take up the rest of the budget.
+Once the deadline ends, checks that have not started are dropped, running
+ones get GRACE_SECONDS to wind down after their subprocesses are killed,
+and every check that did not finish is yielded with a None result. A
+check still running after that is abandoned, not interrupted: it keeps
+its worker thread until it returns, and whatever it returns is dropped.
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+# Maximum number of checks that may use a resource at the same time.
+# Resources not listed here are unlimited.
+RESOURCE_LIMITS = {
+    "docker": 4,   # CLI / daemon queries
+    "build": 1,    # docker build (disk and CPU heavy)
+}
+
+# Checks needing any of these are run after the cheap ones
+EXPENSIVE_RESOURCES = frozenset(("docker", "build", "image"))
+
+DEFAULT_JOBS = min(8, (os.cpu_count() or 1) + 4)
+POLL_SECONDS = 0.05
+GRACE_SECONDS = 1.0
+
+
+def _order_for_submission(checks):
+    """Return checks cheapest first, with every provider ahead of its consumers.
+
+    ThreadPoolExecutor starts work in FIFO order, so submitting providers
+    before the checks that need what they provide guarantees a consumer
+    never waits on a provider that has not been picked up by a worker yet.
+    Cheap checks need nothing expensive or provided, so they can go first.
+    """
+    provided = {name for c in checks for name in c.get("provides", ())}
+    costly = EXPENSIVE_RESOURCES | provided
+    cheap = [c for c in checks if not c.get("provides") and not costly.intersection(c.get("needs", ()))]
+    providers = [c for c in checks if c.get("provides")]
+    others = [c for c in checks if not c.get("provides") and c not in cheap]
+    return cheap + providers + others
+
+
+def _providers(check, provided_by):
+    return [p for name in check.get("needs", ()) for p in provided_by.get(name, ())]
+
+
+def _failed(result):
+    # None: cut short by a deadline, which ends the grade for everyone anyway
+    return result is not None and not result["passed"]
+
+
+class CheckExecutor:
+    """Run registry entries concurrently, respecting declared resources."""
+
+    def __init__(self, jobs=None, limits=None):
+        self.jobs = max(1, jobs or DEFAULT_JOBS)
+        limits = RESOURCE_LIMITS if limits is None else limits
+        self._semaphores = {
+            name: threading.BoundedSemaphore(limit) for name, limit in limits.items()
+        }
+
+    def _acquire(self, needs, deadline=None):
+        """Take the semaphores for ``needs``; None if the deadline ends first."""
+        held = []
+        # Sorted acquisition order rules out lock-order deadlocks
+        for name in sorted(set(needs)):
+            sem = self._semaphores.get(name)
+            if sem is None:
+                continue
+            if deadline is None:
+                sem.acquire()
+            else:
+                while not sem.acquire(timeout=POLL_SECONDS):
+                    if deadline.ended():
+                        self._release(held)
+                        return None
+            held.append(sem)
+        return held
+
+    def _release(self, held):
+        for sem in reversed(held):
+            sem.release()
+
+    def _task(self, check, call, dependencies, deadline=None, skip=None):
+        # dependencies: (provider, function returning its result) pairs
+        failed = None
+        for provider, result in dependencies:
+            outcome = result()
+            if failed is None and _failed(outcome):
+                failed = outcome
+        if deadline is not None and deadline.ended():
+            return None
+        if failed is not None and skip is not None:
+            return skip(check, failed)
+        held = self._acquire(check.get("needs", ()), deadline)
+        if held is None:
+            return None
+        try:
+            if deadline is not None and deadline.ended():
+                return None
+            return call(check)
+        finally:
+            self._release(held)
+
+    def run(self, checks, call, deadline=None, skip=None):
+        """Yield ``(check, call(check))`` for each check, in registry order.
+
+        ``call`` must not raise and returns a result dict with a "passed"
+        key; run.py wraps each check function so errors are reported as
+        failed checks. With ``skip``, a check needing a resource whose
+        provider failed yields ``skip(check, provider's result)`` instead
+        of being called. Under a ``deadline`` a check that was not run, or
+        had not finished shortly after the deadline ended, is yielded as
+        ``(check, None)``.
+        """
+        checks = list(checks)
+        if self.jobs == 1:
+            # Still through the semaphores: an executor shared by several
+            # grades (run.py serve, run.py worker) caps them across grades
+            results = {}
+            provided_by = {}
+
+            def run_one(check):
+                dependencies = [(p, lambda p=p: results[id(p)]) for p in _providers(check, provided_by)]
+                results[id(check)] = self._task(check, call, dependencies, deadline, skip)
+                for name in check.get("provides", ()):
+                    provided_by.setdefault(name, []).append(check)
+                return results[id(check)]
+
+            if deadline is None:
+                # Registry order, so results stream out as they finish
+                for check in checks:
+                    yield check, run_one(check)
+                return
+            for check in _order_for_submission(checks):
+                run_one(check)
+            for check in checks:
+                yield check, results[id(check)]
+            return
+
+        futures = {}
+        provided_by = {}
+        pool = ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix="check")
+        try:
+            for check in _order_for_submission(checks):
+                dependencies = [(p, futures[id(p)].result) for p in _providers(check, provided_by)]
+                futures[id(check)] = pool.submit(self._task, check, call, dependencies, deadline, skip)
+                for name in check.get("provides", ()):
+                    provided_by.setdefault(name, []).append(check)
+
+            grace_until = None
+            for check in checks:
+                future = futures[id(check)]
+                if deadline is None:
+                    yield check, future.result()
+                    continue
+                while grace_until is None and not future.done() and not deadline.wait(POLL_SECONDS):
+                    pass
+                if grace_until is None and deadline.ended():
+                    grace_until = time.monotonic() + GRACE_SECONDS
+                    for pending in futures.values():
+                        pending.cancel()
+                if future.cancelled():
+                    yield check, None
+                    continue
+                try:
+                    timeout = None if grace_until is None else max(0.0, grace_until - time.monotonic())
+                    yield check, future.result(timeout=timeout)
+                except (FutureTimeout, CancelledError):
+                    # Cancelled: a provider it was waiting on never started
+                    yield check, None
+        finally:
+            # Under a deadline, checks still running past the grace period
+            # are abandoned rather than waited for
+            pool.shutdown(wait=deadline is None, cancel_futures=deadline is not None)
@@ -0,0 +1,145 @@
+"""
+File helpers shared by the grader.
+
+Submissions are untrusted: an artifact may be hundreds of megabytes, binary,
+or not a regular file at all (a FIFO would block a plain ``open``). Reads
+here check the file's type and size before touching its contents, sniff
+the first block for binary data, and raise FileRejected instead of loading
+something the grader cannot use. Pattern scans over large files go
+through ``mmap`` so the file is never copied into the Python heap.
+"""
+
+import os
+import re
+import stat
+import mmap
+
+from grader.buildcontext import format_size
+
+MAX_TEXT_BYTES = 8 * 1024 * 1024   # default cap for read_file
+MMAP_THRESHOLD = 1024 * 1024       # scan() maps files at least this large
+SNIFF_BYTES = 8192                 # leading bytes checked for binary content
+LEADING_FLAGS_RE = re.compile(rb"^\(\?([imsx]+)\)")
+
+
+class FileRejected(ValueError):
+    """A file the grader will not read: too large, binary or not a regular file."""
+
+
+def _open_checked(path, max_bytes):
+    """Open path for binary reading after checking its type and size.
+
+    Returns ``(file, size)``, or None if the file is missing or unreadable.
+    """
+    try:
+        # Non-blocking so a FIFO planted in the checkout cannot stall the open
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_NONBLOCK", 0) | getattr(os, "O_BINARY", 0))
+    except (FileNotFoundError, PermissionError, IsADirectoryError, NotADirectoryError):
+        return None
+    f = os.fdopen(fd, "rb", buffering=0)
+    try:
+        st = os.fstat(f.fileno())
+        name = os.path.basename(path)
+        if not stat.S_ISREG(st.st_mode):
+            raise FileRejected(f"{name} is not a regular file")
+        if max_bytes is not None and st.st_size > max_bytes:
+            raise FileRejected(f"{name} is {format_size(st.st_size)}, over the "
+                               f"{format_size(max_bytes)} limit for this file")
+    except BaseException:
+        f.close()
+        raise
+    return f, st.st_size
+
+
+def _reject_binary(path, head):
+    if b"\0" in head:
+        raise FileRejected(f"{os.path.basename(path)} is a binary file, expected text")
+
+
+def read_file(path, max_bytes=MAX_TEXT_BYTES):
+    """Read a text file and return its contents, or empty string if not found.
+
+    Raises FileRejected for files over ``max_bytes``, binary files, files
+    that are not UTF-8 and anything that is not a regular file.
+    """
+    opened = _open_checked(path, max_bytes)
+    if opened is None:
+        return ""
+    f, size = opened
+    with f:
+        head = f.read(SNIFF_BYTES)
+        _reject_binary(path, head)
+        # Read at most the cap even if the file grows after the stat
+        rest = f.read(max_bytes - len(head) + 1) if max_bytes is not None else f.readall()
+    data = head + rest
+    if max_bytes is not None and len(data) > max_bytes:
+        raise FileRejected(f"{os.path.basename(path)} grew past the {format_size(max_bytes)} limit while being read")
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError as e:
+        raise FileRejected(f"{os.path.basename(path)} is not UTF-8 text (byte {e.start})") from None
+    # Universal newlines, as open(path, "r") would give
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _scoped(pattern):
+    """Wrap a pattern in a group, turning leading inline flags like (?i) into scoped ones."""
+    flags = LEADING_FLAGS_RE.match(pattern)
+    if flags:
+        return b"(?" + flags.group(1) + b":" + pattern[flags.end():] + b")"
+    return b"(?:" + pattern + b")"
+
+
+def _first_matches(data, patterns):
+    """Which compiled patterns match anywhere in data, in one combined pass.
+
+    One alternation of every pattern not found yet is searched from left
+    to right. At each hit every remaining pattern is tried at that offset
+    too, since an alternation reports only one alternative per position,
+    and found patterns drop out of the scanner. Typically a single pass.
+    """
+    found = [False] * len(patterns)
+    remaining = list(range(len(patterns)))
+    pos = 0
+    while remaining:
+        combined = re.compile(b"|".join(_scoped(patterns[i].pattern) for i in remaining))
+        hit = combined.search(data, pos)
+        if hit is None:
+            break
+        start = hit.start()
+        for i in remaining:
+            if patterns[i].match(data, start):
+                found[i] = True
+        remaining = [i for i in remaining if not found[i]]
+        pos = start + 1
+    return tuple(found)
+
+
+def scan(path, patterns, max_bytes=None):
+    """Which of ``patterns`` (regular expressions, str) match the file, as a tuple of bools.
+
+    All patterns are searched together in one combined pass over the file's
+    bytes. Returns None if the file is missing, unreadable or empty. Files
+    of MMAP_THRESHOLD bytes or more are scanned through a read-only memory
+    map instead of being read. Raises FileRejected like read_file.
+    """
+    opened = _open_checked(path, max_bytes)
+    if opened is None:
+        return None
+    f, size = opened
+    compiled = [re.compile(pattern.encode("utf-8")) for pattern in patterns]
+    with f:
+        if size == 0:
+            return None
+        if size < MMAP_THRESHOLD:
+            data = f.read(size)
+            _reject_binary(path, data[:SNIFF_BYTES])
+            return _first_matches(data, compiled)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            _reject_binary(path, mapped[:SNIFF_BYTES])
+            return _first_matches(mapped, compiled)
+
+
+def file_exists(path):
+    """Check if a file exists."""
+    return os.path.isfile(path)
@@ -0,0 +1,431 @@
+"""
+Durable grading queue shared by workers on several nodes.
+
+``run.py submit`` puts checkouts into a queue; ``run.py worker`` processes on
+any number of nodes lease jobs, grade them and write the reports back. Two
+backends need nothing beyond the standard library:
+
+- SQLite (a ``.db`` / ``.sqlite`` path): one database file, for workers on
+  one host or a filesystem with working POSIX locks
+- a shared directory: one JSON file per job, moved between ``queued/``,
+  ``leased/``, ``done/`` and ``failed/`` with atomic renames, for workers
+  that only share a network filesystem
+
+A lease is held for ``lease_seconds`` and renewed by a heartbeat while the
+grade runs. A lease that is not renewed (the worker crashed, hung or lost
+its node) expires, and the job goes back to the queue until it has been
+attempted ``max_attempts`` times, after which it is marked failed. A grade
+that raises is retried the same way, except for ValueError (the submission
+cannot be graded, e.g. its directory is missing), which fails the job at
+once: another attempt would only raise it again.
+"""
+
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+
+DEFAULT_LEASE_SECONDS = 60
+DEFAULT_MAX_ATTEMPTS = 3
+POLL_INTERVAL = 1.0
+STATES = ("queued", "leased", "done", "failed")
+
+
+class Job:
+    """One leased grading job."""
+
+    __slots__ = ("id", "root", "module", "attempts")
+
+    def __init__(self, id, root, module, attempts):
+        self.id = id
+        self.root = root
+        self.module = module
+        self.attempts = attempts
+
+    def __repr__(self):
+        return f"Job({self.id!r}, {self.root!r}, attempt {self.attempts})"
+
+
+def worker_name(slot=0):
+    """Name identifying one grading slot of this process, e.g. "node1-4242-0"."""
+    host = socket.gethostname().replace("@", "-").replace(os.sep, "-")
+    return f"{host}-{os.getpid()}-{slot}"
+
+
+def open_queue(path, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """SQLiteQueue for a .db/.sqlite file (or an existing file), DirectoryQueue otherwise."""
+    if path.endswith((".db", ".sqlite", ".sqlite3")) or os.path.isfile(path):
+        return SQLiteQueue(path, lease_seconds, max_attempts)
+    return DirectoryQueue(path, lease_seconds, max_attempts)
+
+
+# ─── SQLite ────────────────────────────────────────────────────────────────
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    root TEXT NOT NULL,
+    module INTEGER,
+    state TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires REAL,
+    enqueued_at REAL NOT NULL,
+    finished_at REAL,
+    report TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id);
+"""
+
+
+class SQLiteQueue:
+    """Job queue in a SQLite database file."""
+
+    def __init__(self, path, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # One connection per queue object, shared by its grading and
+        # heartbeat threads; other processes are kept apart by SQLite's
+        # own file locking.
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params)
+
+    def _transaction(self, body):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers
+        # cannot both select the same queued row
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = body(self._db)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return result
+
+    def submit(self, root, module=None):
+        cursor = self._execute(
+            "INSERT INTO jobs (root, module, enqueued_at) VALUES (?, ?, ?)", (root, module, time.time()))
+        return str(cursor.lastrowid)
+
+    def _expire(self, db, now):
+        db.execute(
+            "UPDATE jobs SET state = 'failed', worker = NULL, finished_at = ?, "
+            "error = 'lease expired on the last attempt' "
+            "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?", (now, now, self.max_attempts))
+        db.execute(
+            "UPDATE jobs SET state = 'queued', worker = NULL, error = 'lease expired' "
+            "WHERE state = 'leased' AND lease_expires < ?", (now,))
+
+    def lease(self, worker):
+        """Take the oldest queued job for worker, or return None."""
+        now = time.time()
+
+        def take(db):
+            self._expire(db, now)
+            row = db.execute("SELECT id, root, module, attempts FROM jobs WHERE state = 'queued' "
+                             "ORDER BY id LIMIT 1").fetchone()
+            if row is not None:
+                db.execute("UPDATE jobs SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                           "WHERE id = ?", (worker, now + self.lease_seconds, row[0]))
+            return row
+
+        row = self._transaction(take)
+        if row is None:
+            return None
+        return Job(str(row[0]), row[1], row[2], row[3] + 1)
+
+    def heartbeat(self, job, worker):
+        """Extend the lease; False if the worker no longer holds it."""
+        cursor = self._execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND state = 'leased' AND worker = ?",
+            (time.time() + self.lease_seconds, int(job.id), worker))
+        return cursor.rowcount == 1
+
+    def complete(self, job, worker, report):
+        """Store the report; False if the lease was lost (the job will be graded again)."""
+        cursor = self._execute(
+            "UPDATE jobs SET state = 'done', worker = NULL, finished_at = ?, report = ?, error = NULL "
+            "WHERE id = ? AND state = 'leased' AND worker = ?",
+            (time.time(), json.dumps(report), int(job.id), worker))
+        return cursor.rowcount == 1
+
+    def fail(self, job, worker, error, retry=True):
+        """Give a job back after an error; returns its new state, or None if the lease was lost."""
+        state = "failed" if not retry or job.attempts >= self.max_attempts else "queued"
+        cursor = self._execute(
+            "UPDATE jobs SET state = ?, worker = NULL, error = ?, finished_at = ? "
+            "WHERE id = ? AND state = 'leased' AND worker = ?",
+            (state, error, time.time() if state == "failed" else None, int(job.id), worker))
+        return state if cursor.rowcount == 1 else None
+
+    def counts(self):
+        def count(db):
+            self._expire(db, time.time())
+            return db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+
+        rows = self._transaction(count)
+        return {state: dict(rows).get(state, 0) for state in STATES}
+
+    def finished(self):
+        """Yield a record for every done or failed job, oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, root, module, state, attempts, report, error FROM jobs "
+                "WHERE state IN ('done', 'failed') ORDER BY id").fetchall()
+        for id, root, module, state, attempts, report, error in rows:
+            record = {"job": str(id), "submission": root, "module": module, "state": state, "attempts": attempts}
+            if report is not None:
+                record.update(json.loads(report))
+            if state == "failed":
+                record["error"] = error
+            yield record
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# ─── Shared Directory ──────────────────────────────────────────────────────
+
+class DirectoryQueue:
+    """Job queue as JSON files in a shared directory.
+
+    A job's state is the subdirectory its file is in; every transition is an
+    ``os.rename``, which is atomic on POSIX filesystems (NFS included), so two
+    workers can never both move the same file. A leased file is named
+    ``<id>@<worker>.json`` and its mtime, refreshed by heartbeats, is the
+    start of the current lease.
+
+    A file is never rewritten where another worker can take it: a job
+    leaving ``leased/`` is first renamed to a claim name only its mover
+    uses, updated there and then renamed into place. A claim left behind
+    by a crashed worker goes back to ``leased/`` once it is older than a
+    lease, and from there back to the queue.
+    """
+
+    def __init__(self, path, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        for state in STATES:
+            os.makedirs(os.path.join(path, state), exist_ok=True)
+
+    def _file(self, state, name):
+        return os.path.join(self.path, state, name)
+
+    def _listing(self, state):
+        try:
+            return sorted(n for n in os.listdir(os.path.join(self.path, state)) if n.endswith(".json"))
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def _read(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write(self, path, record):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp, path)
+
+    def submit(self, root, module=None):
+        # Time-ordered ids keep the queue first in, first out
+        job_id = f"{time.time_ns():020d}-{os.urandom(4).hex()}"
+        record = {"id": job_id, "root": root, "module": module, "attempts": 0, "enqueued_at": time.time()}
+        self._write(self._file("queued", f"{job_id}.json"), record)
+        return job_id
+
+    def _move(self, leased, job_id, update):
+        """Move a leased file to the state ``update(record)`` returns; False if another worker moved it first."""
+        claim = f"{leased}.{os.getpid()}.{threading.get_ident()}.claim"
+        try:
+            # Whoever wins the rename owns the job; the claim starts fresh,
+            # so it is not taken for a crashed worker's while it is updated
+            os.utime(leased)
+            os.rename(leased, claim)
+        except FileNotFoundError:
+            return False
+        record = self._read(claim)
+        state = update(record)
+        self._write(claim, record)
+        os.rename(claim, self._file(state, f"{job_id}.json"))
+        return True
+
+    def _recover_claims(self, now):
+        for name in os.listdir(os.path.join(self.path, "leased")):
+            if not name.endswith(".claim"):
+                continue
+            path = self._file("leased", name)
+            job_id = name.split("@", 1)[0]
+            try:
+                if os.stat(path).st_mtime + self.lease_seconds < now:
+                    os.rename(path, self._file("leased", f"{job_id}@recovered-{os.urandom(4).hex()}.json"))
+            except FileNotFoundError:
+                continue
+
+    def _expire(self):
+        now = time.time()
+        self._recover_claims(now)
+
+        def expired(record):
+            state = "failed" if record["attempts"] >= self.max_attempts else "queued"
+            record.pop("worker", None)
+            record["error"] = "lease expired on the last attempt" if state == "failed" else "lease expired"
+            return state
+
+        for name in self._listing("leased"):
+            path = self._file("leased", name)
+            try:
+                if os.stat(path).st_mtime + self.lease_seconds >= now:
+                    continue
+            except FileNotFoundError:
+                continue
+            self._move(path, name.split("@", 1)[0], expired)
+
+    def lease(self, worker):
+        self._expire()
+        for name in self._listing("queued"):
+            job_id = name[:-len(".json")]
+            queued = self._file("queued", name)
+            leased = self._file("leased", f"{job_id}@{worker}.json")
+            try:
+                # Fresh before it is renamed, so the lease cannot look expired
+                os.utime(queued)
+                os.rename(queued, leased)
+            except FileNotFoundError:
+                continue  # another worker took it first
+            record = self._read(leased)
+            record["attempts"] += 1
+            record["worker"] = worker
+            self._write(leased, record)
+            return Job(job_id, record["root"], record.get("module"), record["attempts"])
+        return None
+
+    def heartbeat(self, job, worker):
+        try:
+            os.utime(self._file("leased", f"{job.id}@{worker}.json"))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _finish(self, job, worker, state, **fields):
+        def finished(record):
+            record.pop("worker", None)
+            record.update(fields, finished_at=time.time())
+            return state
+
+        return self._move(self._file("leased", f"{job.id}@{worker}.json"), job.id, finished)
+
+    def complete(self, job, worker, report):
+        return self._finish(job, worker, "done", report=report)
+
+    def fail(self, job, worker, error, retry=True):
+        state = "failed" if not retry or job.attempts >= self.max_attempts else "queued"
+        return state if self._finish(job, worker, state, error=error) else None
+
+    def counts(self):
+        self._expire()
+        return {state: len(self._listing(state)) for state in STATES}
+
+    def finished(self):
+        records = []
+        for state in ("done", "failed"):
+            for name in self._listing(state):
+                try:
+                    records.append((state, self._read(self._file(state, name))))
+                except (FileNotFoundError, ValueError):
+                    continue
+        for state, job in sorted(records, key=lambda item: item[1]["id"]):
+            record = {"job": job["id"], "submission": job["root"], "module": job.get("module"),
+                      "state": state, "attempts": job["attempts"]}
+            record.update(job.get("report") or {})
+            if state == "failed":
+                record["error"] = job.get("error")
+            yield record
+
+    def close(self):
+        pass
+
+
+# ─── Workers ───────────────────────────────────────────────────────────────
+
+class Heartbeat:
+    """Background thread renewing one lease until stopped."""
+
+    def __init__(self, queue, job, worker):
+        self.queue = queue
+        self.job = job
+        self.worker = worker
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{job.id}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        interval = self.queue.lease_seconds / 3
+        while not self._stop.wait(interval):
+            if not self.queue.heartbeat(self.job, self.worker):
+                self.lost = True
+                return
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def work(queue, grade, worker, stop, exit_when_empty=False, log=None):
+    """Lease and grade jobs until ``stop`` is set (or the queue is empty, if asked)."""
+    while not stop.is_set():
+        job = queue.lease(worker)
+        if job is None:
+            if exit_when_empty:
+                return
+            stop.wait(POLL_INTERVAL)
+            continue
+        heartbeat = Heartbeat(queue, job, worker)
+        try:
+            report = grade(job.root, job.module)
+        except Exception as e:
+            heartbeat.stop()
+            state = queue.fail(job, worker, f"{type(e).__name__}: {e}", retry=not isinstance(e, ValueError))
+            if log is not None:
+                log(f"{worker}: job {job.id} ({job.root}) raised {type(e).__name__}: {e}; now {state or 'lost'}")
+            continue
+        heartbeat.stop()
+        stored = queue.complete(job, worker, report)
+        if log is not None:
+            outcome = f"{report.get('earned_points')}/{report.get('total_points')}" if stored else "lease lost, discarded"
+            log(f"{worker}: job {job.id} ({job.root}) attempt {job.attempts}: {outcome}")
+
+
+def run_workers(queue, grade, slots=1, exit_when_empty=False, log=None):
+    """Run ``slots`` grading threads against queue until interrupted (or drained)."""
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=work, args=(queue, grade, worker_name(n), stop, exit_when_empty, log),
+                         name=f"worker-{n}", daemon=True)
+        for n in range(max(1, slots))
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(0.5)
+    except KeyboardInterrupt:
+        # In-flight leases are not renewed any more and expire back into
+        # the queue for another worker
+        stop.set()
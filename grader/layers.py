@@ -0,0 +1,484 @@
+"""
+Image size and layer analyzer.
+
+Streams ``docker save`` output through tarfile in stream mode, so an image
+is read once, front to back, and nothing is extracted to disk. Both archive
+layouts are understood: the legacy one (``<id>/layer.tar`` plus
+``manifest.json``) and the OCI one Docker 25+ writes (``blobs/sha256/...``
+plus ``index.json``), including gzip-compressed layer blobs.
+
+For every layer the report carries its uncompressed size (file contents),
+its compressed size (the blob size, or a gzip estimate for uncompressed
+layer tars) and the Dockerfile instruction that produced it, found by
+aligning the image history with the final build stage. Wasted bytes are
+split into:
+
+- shadowed: files that a later layer overwrites or deletes, which still
+  ship in the earlier layer
+- dev_dependencies: packages under ``node_modules`` that npm marks as dev
+  only in ``node_modules/.package-lock.json`` (or, without a lockfile, the
+  package.json devDependencies)
+
+``python -m grader.layers IMAGE [--reference IMAGE]`` prints the report.
+"""
+
+import io
+import os
+import sys
+import json
+import zlib
+import tarfile
+import argparse
+import threading
+import subprocess
+import posixpath
+
+from grader import dockerfile, timing
+from grader.buildcontext import format_size
+from grader.deadline import kill_process
+
+SAVE_TIMEOUT = 300
+# Archive members up to this size are read into memory and may be JSON
+# (manifests, image configs); larger ones are always layer tars.
+SMALL_BLOB = 1024 * 1024
+MAX_LOCKFILE_BYTES = 16 * 1024 * 1024
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+WHITEOUT_PREFIX = ".wh."
+OPAQUE_MARKER = ".wh..wh..opq"
+LOCKFILE_NAME = "node_modules/.package-lock.json"
+
+
+class LayerAnalysisError(Exception):
+    """The image could not be saved or its archive could not be read."""
+
+
+class Layer:
+    """One filesystem layer and what it contributes to the image."""
+
+    __slots__ = ("digest", "compressed", "size", "files", "deleted", "opaque", "lockfiles",
+                 "estimated", "created_by", "instruction", "shadowed", "dev_bytes")
+
+    def __init__(self, digest=""):
+        self.digest = digest
+        self.compressed = 0
+        self.size = 0
+        self.files = {}         # path -> content bytes
+        self.deleted = set()    # paths removed by whiteout files
+        self.opaque = set()     # directories whose lower contents are hidden
+        self.lockfiles = {}     # path of node_modules/.package-lock.json -> parsed JSON
+        self.estimated = False  # compressed size is a gzip estimate, not the blob size
+        self.created_by = ""
+        self.instruction = None
+        self.shadowed = 0
+        self.dev_bytes = 0
+
+    def as_dict(self):
+        return {
+            "digest": self.digest,
+            "instruction": self.instruction,
+            "size": self.size,
+            "compressed": self.compressed,
+            "files": len(self.files),
+            "wasted": self.shadowed + self.dev_bytes,
+        }
+
+
+# ─── Archive Streaming ─────────────────────────────────────────────────────
+
+class _BlobReader:
+    """Re-serves peeked bytes, then the rest of the blob, optionally gzip-counting what passes."""
+
+    def __init__(self, head, rest, deflate=False):
+        self.head = head
+        self.rest = rest
+        self.deflated = 0
+        self._deflate = zlib.compressobj(6, zlib.DEFLATED, 31) if deflate else None
+
+    def read(self, size=-1):
+        if self.head:
+            if size is None or size < 0:
+                data, self.head = self.head + self.rest.read(), b""
+            else:
+                data, self.head = self.head[:size], self.head[size:]
+        else:
+            data = self.rest.read(size)
+        if self._deflate is not None and data:
+            self.deflated += len(self._deflate.compress(data))
+        return data
+
+    def finish(self):
+        """Read to the end of the blob (tar padding included) and close the estimate."""
+        while self.read(1024 * 1024):
+            pass
+        if self._deflate is not None:
+            self.deflated += len(self._deflate.flush())
+
+
+def _normalize(path):
+    return posixpath.normpath("/" + path).lstrip("/")
+
+
+def scan_layer(source, blob_size, digest=""):
+    """Read one layer blob from a file object; return a Layer, or None if it is not a tar."""
+    head = source.read(512)
+    if head.startswith(ZSTD_MAGIC):
+        # tarfile cannot read zstd; keep what the archive tells us
+        layer = Layer(digest)
+        layer.compressed = blob_size
+        _BlobReader(b"", source).finish()
+        return layer
+    compressed = head.startswith(GZIP_MAGIC)
+    reader = _BlobReader(head, source, deflate=not compressed)
+    layer = Layer(digest)
+    try:
+        with tarfile.open(fileobj=reader, mode="r|gz" if compressed else "r|") as archive:
+            for member in archive:
+                _scan_member(archive, member, layer)
+    except (tarfile.TarError, EOFError, zlib.error, OSError):
+        if not layer.files and not layer.deleted:
+            return None
+    reader.finish()
+    layer.compressed = blob_size if compressed else reader.deflated
+    layer.estimated = not compressed
+    return layer
+
+
+def _scan_member(archive, member, layer):
+    path = _normalize(member.name)
+    directory, name = posixpath.split(path)
+    if name == OPAQUE_MARKER:
+        layer.opaque.add(directory)
+        return
+    if name.startswith(WHITEOUT_PREFIX):
+        layer.deleted.add(posixpath.join(directory, name[len(WHITEOUT_PREFIX):]))
+        return
+    if member.isdir():
+        return
+    size = member.size if member.isfile() else 0
+    layer.files[path] = size
+    layer.size += size
+    if path.endswith(LOCKFILE_NAME) and member.isfile() and size <= MAX_LOCKFILE_BYTES:
+        try:
+            layer.lockfiles[path] = json.loads(archive.extractfile(member).read())
+        except (ValueError, tarfile.TarError):
+            pass
+
+
+def read_archive(stream):
+    """Walk a ``docker save`` tar stream; return ``(manifest entry, config, layers)``.
+
+    ``layers`` is the ordered list of Layer records named by the manifest.
+    """
+    scanned = {}
+    documents = {}
+    links = {}
+    try:
+        with tarfile.open(fileobj=stream, mode="r|") as archive:
+            for member in archive:
+                name = _normalize(member.name)
+                if member.issym() or member.islnk():
+                    # Legacy archives link layers that appear twice
+                    target = member.linkname if member.islnk() else \
+                        posixpath.join(posixpath.dirname(name), member.linkname)
+                    links[name] = _normalize(target)
+                    continue
+                if not member.isfile():
+                    continue
+                blob = archive.extractfile(member)
+                if member.size <= SMALL_BLOB:
+                    data = blob.read()
+                    if data[:1] in (b"{", b"["):
+                        try:
+                            documents[name] = json.loads(data)
+                            continue
+                        except ValueError:
+                            pass
+                    blob = io.BytesIO(data)
+                layer = scan_layer(blob, member.size, _digest_from_name(name))
+                if layer is not None:
+                    scanned[name] = layer
+    except (tarfile.TarError, EOFError) as e:
+        raise LayerAnalysisError(f"could not read the saved image: {e}") from e
+
+    manifest = documents.get("manifest.json")
+    if not manifest:
+        raise LayerAnalysisError("saved image has no manifest.json")
+    entry = manifest[0]
+    config = documents.get(_normalize(entry.get("Config", ""))) or {}
+    layers = []
+    for name in entry.get("Layers") or []:
+        name = _normalize(name)
+        name = links.get(name, name)
+        layers.append(scanned.get(name) or Layer(_digest_from_name(name)))
+    return entry, config, layers
+
+
+def _digest_from_name(name):
+    # "blobs/sha256/<hex>" or "<hex>/layer.tar"
+    parts = name.split("/")
+    if len(parts) == 3 and parts[0] == "blobs":
+        return f"{parts[1]}:{parts[2]}"
+    return parts[0] if len(parts) == 2 else name
+
+
+# ─── Attribution ───────────────────────────────────────────────────────────
+
+def history_keyword(created_by):
+    """Dockerfile keyword behind one image history entry."""
+    text = created_by.strip()
+    if "#(nop)" in text:
+        # Legacy builder: "/bin/sh -c #(nop) COPY file:... in . "
+        words = text.split("#(nop)", 1)[1].split()
+        return words[0].upper() if words else ""
+    word = text.split(None, 1)[0] if text else ""
+    if word.isalpha() and word.isupper():
+        return word
+    # Legacy RUN: "/bin/sh -c npm install" or "|1 ARG=x /bin/sh -c ..."
+    return "RUN"
+
+
+def attribute(layers, history, instructions):
+    """Set each layer's created_by and the Dockerfile instruction it came from."""
+    labels = [None] * len(history)
+    stage = dockerfile.final_stage(instructions) if instructions else []
+    steps = [i for i in stage if i.instruction != "FROM"]
+    base = next((i.operands().split()[0] for i in stage if i.instruction == "FROM"), "")
+
+    # Walk both lists from the end: the final stage's instructions are the
+    # newest history entries, the base image's come before them. An
+    # instruction with no history entry of its kind (e.g. ARG) is skipped.
+    h = len(history) - 1
+    for step in reversed(steps):
+        if h < 0:
+            break
+        if history_keyword(history[h].get("created_by", "")) == step.instruction:
+            labels[h] = f"line {step.line}: {step.instruction} {step.arguments.splitlines()[0]}"
+            h -= 1
+    if steps:
+        for index in range(h + 1):
+            labels[index] = f"base image ({base})" if base else "base image"
+
+    entries = [(entry, label) for entry, label in zip(history, labels) if not entry.get("empty_layer")]
+    if len(entries) != len(layers):
+        entries = [({}, None)] * len(layers)
+    for layer, (entry, label) in zip(layers, entries):
+        layer.created_by = entry.get("created_by", "")
+        layer.instruction = label or layer.created_by or None
+
+
+# ─── Waste ─────────────────────────────────────────────────────────────────
+
+def _under(path, prefixes):
+    """Whether path or one of its ancestors is in prefixes."""
+    while path:
+        if path in prefixes:
+            return True
+        path = posixpath.dirname(path)
+    return False
+
+
+def merge_layers(layers):
+    """Apply layers in order; return the final ``{path: layer index}`` and count shadowed bytes."""
+    final = {}
+    for index, layer in enumerate(layers):
+        removed = layer.deleted | layer.opaque
+        if removed:
+            for path in [p for p in final if _under(p, layer.deleted) or _under(posixpath.dirname(p), layer.opaque)]:
+                owner = layers[final.pop(path)]
+                owner.shadowed += owner.files[path]
+        for path in layer.files:
+            previous = final.get(path)
+            if previous is not None:
+                layers[previous].shadowed += layers[previous].files[path]
+            final[path] = index
+    return final
+
+
+def dev_package_dirs(final, layers, dev_packages=()):
+    """Directories of dev-only npm packages in the final filesystem."""
+    dirs = set()
+    for path, index in final.items():
+        lock = layers[index].lockfiles.get(path)
+        if lock is None:
+            continue
+        root = path[:-len(LOCKFILE_NAME)].rstrip("/")
+        for key, package in (lock.get("packages") or {}).items():
+            if key and isinstance(package, dict) and package.get("dev"):
+                dirs.add(posixpath.join(root, key) if root else key)
+    if dirs or not dev_packages:
+        return dirs
+    # No lockfile in the image: fall back to the direct devDependencies
+    for path in final:
+        parts = path.split("/")
+        if "node_modules" not in parts:
+            continue
+        at = parts.index("node_modules") + 1
+        name = "/".join(parts[at:at + 2]) if at < len(parts) and parts[at].startswith("@") else "/".join(parts[at:at + 1])
+        if name in dev_packages:
+            dirs.add("/".join(parts[:at]) + "/" + name)
+    return dirs
+
+
+def dev_packages_from(package_json_text):
+    """Names listed under devDependencies in package.json text."""
+    try:
+        return set((json.loads(package_json_text).get("devDependencies") or {}))
+    except (ValueError, AttributeError):
+        return set()
+
+
+# ─── Analysis ──────────────────────────────────────────────────────────────
+
+def analyze_stream(stream, instructions=None, dev_packages=()):
+    """Analyze a ``docker save`` archive read from stream; return the report dict."""
+    entry, config, layers = read_archive(stream)
+    attribute(layers, config.get("history") or [], instructions)
+    final = merge_layers(layers)
+    dev_dirs = dev_package_dirs(final, layers, dev_packages)
+    if dev_dirs:
+        for path, index in final.items():
+            if _under(posixpath.dirname(path), dev_dirs):
+                layers[index].dev_bytes += layers[index].files[path]
+
+    shadowed = sum(layer.shadowed for layer in layers)
+    dev_bytes = sum(layer.dev_bytes for layer in layers)
+    return {
+        "tags": entry.get("RepoTags") or [],
+        "size": sum(layer.size for layer in layers),
+        "compressed": sum(layer.compressed for layer in layers),
+        "compressed_estimated": any(layer.estimated for layer in layers),
+        "layer_count": len(layers),
+        "files": len(final),
+        "layers": [layer.as_dict() for layer in layers],
+        "wasted": {"shadowed": shadowed, "dev_dependencies": dev_bytes, "total": shadowed + dev_bytes},
+    }
+
+
+def analyze_image(image, instructions=None, dev_packages=(), timeout=SAVE_TIMEOUT):
+    """Stream ``docker save image`` into the analyzer; return the report dict.
+
+    Raises LayerAnalysisError if docker is missing, fails or overruns
+    ``timeout`` (cut to what is left of the current check's deadline).
+    """
+    deadline = timing.current_deadline()
+    grouped = deadline is not None and hasattr(os, "killpg")
+    try:
+        timeout = timing.time_left(timeout)
+    except subprocess.TimeoutExpired as e:
+        raise LayerAnalysisError("the grade's deadline ran out before docker save") from e
+    try:
+        proc = subprocess.Popen(["docker", "save", image], stdin=subprocess.DEVNULL,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                start_new_session=grouped)
+    except OSError as e:
+        raise LayerAnalysisError(f"could not run docker save: {e}") from e
+    errors = []
+    reader = threading.Thread(target=lambda: errors.append(proc.stderr.read()), daemon=True)
+    reader.start()
+    expired = threading.Event()
+
+    def kill():
+        expired.set()
+        kill_process(proc, grouped)
+
+    killer = threading.Timer(timeout, kill)
+    killer.start()
+    if deadline is not None:
+        deadline.register(proc, grouped)
+    report = failure = None
+    try:
+        try:
+            report = analyze_stream(proc.stdout, instructions, dev_packages)
+        except LayerAnalysisError as e:
+            failure = e
+        # Drain what follows the end-of-archive marker so docker exits cleanly
+        while proc.stdout.read(1024 * 1024):
+            pass
+        returncode = proc.wait()
+    finally:
+        killer.cancel()
+        if deadline is not None:
+            deadline.unregister(proc)
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+    reader.join()
+    if expired.is_set() or (deadline is not None and deadline.ended() and returncode < 0):
+        raise LayerAnalysisError(f"docker save timed out (>{timeout:g} seconds)")
+    if returncode != 0:
+        message = b"".join(errors).decode("utf-8", "replace").strip()
+        raise LayerAnalysisError(message[-200:] or f"docker save exited {returncode}")
+    if failure is not None:
+        raise failure
+    return report
+
+
+def compare(report, reference):
+    """Differences between an image report and the reference image's (positive = larger)."""
+    return {
+        "size": report["size"] - reference["size"],
+        "compressed": report["compressed"] - reference["compressed"],
+        "layer_count": report["layer_count"] - reference["layer_count"],
+        "wasted": report["wasted"]["total"] - reference["wasted"]["total"],
+    }
+
+
+def format_report(report, out):
+    tag = ", ".join(report["tags"]) or "image"
+    estimate = " (estimated)" if report["compressed_estimated"] else ""
+    out.write(f"{tag}: {format_size(report['size'])}, {format_size(report['compressed'])} compressed{estimate}, "
+              f"{report['layer_count']} layers, {report['files']} files\n")
+    for layer in report["layers"]:
+        out.write(f"  {format_size(layer['size']):>10} {format_size(layer['compressed']):>10}  "
+                  f"{layer['instruction'] or layer['digest'][:19]}\n")
+    wasted = report["wasted"]
+    out.write(f"  wasted: {format_size(wasted['total'])} "
+              f"({format_size(wasted['shadowed'])} overwritten or deleted later, "
+              f"{format_size(wasted['dev_dependencies'])} dev dependencies)\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze the layers of a Docker image")
+    parser.add_argument("image", help="Image to analyze, e.g. todo-app-test:0123abcd")
+    parser.add_argument("--dockerfile", help="Dockerfile the image was built from, to label its layers")
+    parser.add_argument("--package-json", help="package.json whose devDependencies count as waste")
+    parser.add_argument("--reference", help="Image to compare against")
+    parser.add_argument("--reference-dockerfile", help="Dockerfile the reference image was built from")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    def load(path):
+        if not path:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    dev_packages = dev_packages_from(load(args.package_json) or "{}")
+    try:
+        report = analyze_image(args.image, dockerfile.parse(load(args.dockerfile) or ""), dev_packages)
+        if args.reference:
+            reference = analyze_image(args.reference, dockerfile.parse(load(args.reference_dockerfile) or ""),
+                                      dev_packages)
+            report["reference"] = reference
+            report["versus_reference"] = compare(report, reference)
+    except (LayerAnalysisError, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return
+    format_report(report, sys.stdout)
+    if args.reference:
+        format_report(report["reference"], sys.stdout)
+        delta = report["versus_reference"]
+        sign = "+" if delta["size"] >= 0 else "-"
+        print(f"versus reference: {sign}{format_size(abs(delta['size']))}, "
+              f"{delta['layer_count']:+d} layers, {delta['wasted']:+d} wasted bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""
+Runtime load test for the built todo app image.
+
+Starts the test image with its default SQLite persistence on an ephemeral
+localhost port, waits for ``/healthz`` to answer, then drives mixed
+GET/POST/PUT/DELETE traffic at ``/api/todos`` from a fixed number of
+concurrent asyncio clients for a set duration. Each client holds one
+keep-alive connection, as a browser would, so the numbers measure the app
+rather than connection setup.
+
+The report carries requests per second, error counts and p50/p95/p99
+latency, overall and per method. ``run.py --load-test`` runs it as an
+optional check; ``python -m grader.loadtest --url http://127.0.0.1:3000``
+load-tests an app that is already running.
+"""
+
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+from urllib.parse import urlsplit
+
+from grader import timing, admission
+
+APP_PORT = 3000
+HEALTH_PATH = "/healthz"
+TODOS_PATH = "/api/todos"
+DEFAULT_CONCURRENCY = 8
+DEFAULT_DURATION = 10.0
+START_TIMEOUT = 60.0
+HEALTH_TIMEOUT = 30.0
+REQUEST_TIMEOUT = 10.0
+MAX_ERROR_RATE = 0.01
+
+# Relative weights of each request type. PUT and DELETE act on todos the
+# client created earlier and fall back to POST until it has one.
+MIX = {"GET": 40, "POST": 20, "PUT": 20, "DELETE": 20}
+
+
+class LoadTestError(Exception):
+    """The app could not be started or never became healthy."""
+
+
+# ─── HTTP ──────────────────────────────────────────────────────────────────
+
+class Connection:
+    """Minimal HTTP/1.1 keep-alive client over asyncio streams."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, body=None):
+        """Send one request and return ``(status, body bytes)``."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        head = (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n\r\n"
+        )
+        self.writer.write(head.encode("ascii") + payload)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed by the app")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            data = b""
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                data += chunk[:-2]
+        elif "content-length" in headers:
+            data = await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            data = b""
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, data
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def wait_for_health(host, port, timeout=HEALTH_TIMEOUT):
+    """Poll the health endpoint until it answers 200; return the seconds waited."""
+    start = time.perf_counter()
+    while True:
+        conn = Connection(host, port)
+        try:
+            status, _ = await asyncio.wait_for(conn.request("GET", HEALTH_PATH), 2)
+            if status == 200:
+                return time.perf_counter() - start
+        except (OSError, ValueError, IndexError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            conn.close()
+        if time.perf_counter() - start > timeout:
+            raise LoadTestError(f"app did not answer {HEALTH_PATH} within {timeout:.0f}s")
+        await asyncio.sleep(0.25)
+
+
+# ─── Load Generator ────────────────────────────────────────────────────────
+
+class LoadStats:
+    """Latency samples and outcome counts, per method."""
+
+    def __init__(self):
+        self.latencies = {method: [] for method in MIX}
+        self.errors = {method: 0 for method in MIX}
+        self.elapsed = 0.0
+
+    def record(self, method, latency_ms, ok):
+        self.latencies[method].append(latency_ms)
+        if not ok:
+            self.errors[method] += 1
+
+    def report(self):
+        samples = [ms for values in self.latencies.values() for ms in values]
+        requests = len(samples)
+        errors = sum(self.errors.values())
+        return {
+            "requests": requests,
+            "errors": errors,
+            "error_rate": round(errors / requests, 4) if requests else None,
+            "duration_s": round(self.elapsed, 3),
+            "rps": round(requests / self.elapsed, 1) if self.elapsed else 0.0,
+            "latency_ms": _percentiles(samples),
+            "by_method": {
+                method: {"requests": len(values), "errors": self.errors[method], "latency_ms": _percentiles(values)}
+                for method, values in self.latencies.items() if values
+            },
+        }
+
+
+def _percentiles(samples):
+    if not samples:
+        return {}
+    return {
+        "p50": round(timing.percentile(samples, 50), 3),
+        "p95": round(timing.percentile(samples, 95), 3),
+        "p99": round(timing.percentile(samples, 99), 3),
+        "max": round(max(samples), 3),
+    }
+
+
+async def _client(host, port, deadline, stats, rng):
+    conn = Connection(host, port)
+    created = []
+    methods, weights = list(MIX), list(MIX.values())
+    try:
+        while time.perf_counter() < deadline:
+            method = rng.choices(methods, weights)[0]
+            if method in ("PUT", "DELETE") and not created:
+                method = "POST"
+            if method == "GET":
+                path, body, expected = TODOS_PATH, None, 200
+            elif method == "POST":
+                path, body, expected = TODOS_PATH, {"title": f"load test {rng.randrange(1 << 30)}"}, 201
+            elif method == "PUT":
+                todo = rng.choice(created)
+                path, body, expected = f"{TODOS_PATH}/{todo}", {"title": "updated", "completed": True}, 200
+            else:
+                todo = created.pop(rng.randrange(len(created)))
+                path, body, expected = f"{TODOS_PATH}/{todo}", None, 204
+
+            start = time.perf_counter_ns()
+            try:
+                status, data = await asyncio.wait_for(conn.request(method, path, body), REQUEST_TIMEOUT)
+            except (OSError, ValueError, IndexError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                conn.close()
+                stats.record(method, (time.perf_counter_ns() - start) / 1e6, False)
+                continue
+            stats.record(method, (time.perf_counter_ns() - start) / 1e6, status == expected)
+            if method == "POST" and status == 201:
+                try:
+                    created.append(json.loads(data)["id"])
+                except (ValueError, KeyError, TypeError):
+                    pass
+    finally:
+        conn.close()
+
+
+async def generate_load(host, port, concurrency=DEFAULT_CONCURRENCY, duration=DEFAULT_DURATION, seed=0):
+    """Run ``concurrency`` clients against the app for ``duration`` seconds; return LoadStats."""
+    stats = LoadStats()
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        _client(host, port, deadline, stats, random.Random(seed + n)) for n in range(max(1, concurrency))
+    ))
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def run_load(host, port, concurrency=DEFAULT_CONCURRENCY, duration=DEFAULT_DURATION, health_timeout=HEALTH_TIMEOUT):
+    """Wait for the app at host:port to be healthy, load it and return the report dict."""
+    async def main():
+        ready = await wait_for_health(host, port, health_timeout)
+        stats = await generate_load(host, port, concurrency, duration)
+        return ready, stats
+
+    ready, stats = asyncio.run(main())
+    report = stats.report()
+    report["startup_s"] = round(ready, 3)
+    report["concurrency"] = concurrency
+    return report
+
+
+# ─── Container ─────────────────────────────────────────────────────────────
+
+def start_container(image, timeout=None):
+    """Run image detached with port 3000 on an ephemeral localhost port; return (id, port).
+
+    Takes a host-wide "run" slot for the ``docker run`` itself.
+    """
+    try:
+        with admission.admitted("run"):
+            if timeout is None:
+                timeout = admission.timeout_for("run", START_TIMEOUT)
+            start = time.perf_counter()
+            result = timing.run(
+                ["docker", "run", "-d", "--rm", "--pull", "never", "-p", f"127.0.0.1::{APP_PORT}",
+                 "-e", "SQLITE_DB_PATH=/tmp/todos.db", image],
+                timeout=timeout,
+            )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise LoadTestError(f"could not start {image}: {e}") from e
+    if result.returncode != 0:
+        raise LoadTestError(f"could not start {image}: {result.stderr.strip()[-200:]}")
+    admission.record("run", time.perf_counter() - start)
+    container = result.stdout.strip()
+    try:
+        result = timing.run(["docker", "port", container, f"{APP_PORT}/tcp"], timeout=30)
+        # "127.0.0.1:49153" (one line per published address)
+        port = int(result.stdout.split()[0].rsplit(":", 1)[1])
+    except (OSError, subprocess.TimeoutExpired, IndexError, ValueError) as e:
+        stop_container(container)
+        raise LoadTestError(f"could not find the published port of {container[:12]}") from e
+    return container, port
+
+
+def stop_container(container):
+    try:
+        # Clean-up must run even after the grade's deadline has ended
+        with timing.within(None):
+            timing.run(["docker", "rm", "-f", container], timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+
+
+def load_test_image(image, concurrency=DEFAULT_CONCURRENCY, duration=DEFAULT_DURATION):
+    """Start image, load-test it and remove the container; return the report dict.
+
+    Under a grade deadline the health wait and the load itself are cut to
+    fit the time left.
+    """
+    container, port = start_container(image)
+    try:
+        try:
+            health_timeout = timing.time_left(HEALTH_TIMEOUT)
+            # Half of what is left goes to the load, so the check can finish
+            duration = timing.time_left(2 * duration) / 2
+        except subprocess.TimeoutExpired as e:
+            raise LoadTestError("the grade's deadline ran out before the load test") from e
+        return run_load("127.0.0.1", port, concurrency, duration, health_timeout)
+    finally:
+        stop_container(container)
+
+
+def evaluate(report, min_rps=None, max_p95_ms=None):
+    """Return the reasons (if any) a report misses the error budget or the thresholds."""
+    problems = []
+    if not report["requests"]:
+        problems.append("no requests completed")
+    elif report["error_rate"] > MAX_ERROR_RATE:
+        problems.append(f"{report['errors']} of {report['requests']} requests failed")
+    if min_rps is not None and report["rps"] < min_rps:
+        problems.append(f"{report['rps']} req/s is below {min_rps}")
+    p95 = report["latency_ms"].get("p95")
+    if max_p95_ms is not None and p95 is not None and p95 > max_p95_ms:
+        problems.append(f"p95 {p95} ms is above {max_p95_ms} ms")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the todo app")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--image", help="Image to start and load-test")
+    target.add_argument("--url", help="Base URL of an app that is already running, e.g. http://127.0.0.1:3000")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="Seconds of load")
+    parser.add_argument("--min-rps", type=float, help="Fail below this many requests per second")
+    parser.add_argument("--max-p95-ms", type=float, help="Fail above this p95 latency")
+    args = parser.parse_args()
+    try:
+        if args.image:
+            report = load_test_image(args.image, args.concurrency, args.duration)
+        else:
+            url = urlsplit(args.url)
+            report = run_load(url.hostname, url.port or 80, args.concurrency, args.duration)
+    except LoadTestError as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    problems = evaluate(report, args.min_rps, args.max_p95_ms)
+    for problem in problems:
+        print(f"FAIL: {problem}", file=sys.stderr)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,611 @@
+"""
+A small YAML reader for Compose files.
+
+The grader runs on a bare Python install, so it cannot rely on PyYAML.
+This module reads the subset of YAML that Compose files use in practice:
+
+* block mappings and sequences, including ``- key: value`` items and
+  sequences written at the same indentation as their parent key
+* flow collections (``[a, b]``, ``{a: 1}``), also spanning several lines
+* plain, single-quoted and double-quoted scalars, with comments stripped
+* literal (``|``) and folded (``>``) block scalars with chomping indicators
+* anchors, aliases and ``<<`` merge keys
+* tags: ``!!str`` and friends convert the value; any other tag (such as
+  Compose's ``!reset`` and ``!override``) is kept as a Tagged wrapper
+
+Plain scalars resolve as in YAML 1.2's core schema: null, booleans,
+integers and floats; everything else (``3000:3000``, ``mysql:8.0``) is a
+string. Only the first document of a stream is read.
+"""
+
+import re
+
+_INT_RE = re.compile(r"[-+]?(0|[1-9][0-9]*)$")
+_FLOAT_RE = re.compile(r"[-+]?(\.[0-9]+|[0-9]+(\.[0-9]*)?)([eE][-+]?[0-9]+)?$")
+_PROPERTY_RE = re.compile(r"([&!][^\s,\[\]{}]*)\s*")
+_ESCAPES = {
+    "0": "\0", "a": "\a", "b": "\b", "t": "\t", "\t": "\t", "n": "\n", "v": "\v", "f": "\f",
+    "r": "\r", "e": "\x1b", " ": " ", '"': '"', "/": "/", "\\": "\\", "N": "\x85", "_": "\xa0",
+}
+_HEX_LENGTHS = {"x": 2, "u": 4, "U": 8}
+
+
+class YAMLError(ValueError):
+    """The text is not YAML this reader understands."""
+
+    def __init__(self, message, line=None):
+        super().__init__(f"line {line}: {message}" if line else message)
+        self.line = line
+
+
+class Tagged:
+    """A value carrying an application-specific tag such as ``!reset``."""
+
+    __slots__ = ("tag", "value")
+
+    def __init__(self, tag, value):
+        self.tag = tag
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, Tagged) and (self.tag, self.value) == (other.tag, other.value)
+
+    def __repr__(self):
+        return f"Tagged({self.tag!r}, {self.value!r})"
+
+
+def loads(text):
+    """Parse the first YAML document in text; an empty document is None."""
+    return _Parser(text).parse()
+
+
+def resolve_plain(value):
+    """Type of a plain (unquoted) scalar under the YAML 1.2 core schema."""
+    if value in ("", "~", "null", "Null", "NULL"):
+        return None
+    if value in ("true", "True", "TRUE"):
+        return True
+    if value in ("false", "False", "FALSE"):
+        return False
+    if _INT_RE.match(value):
+        return int(value)
+    if _FLOAT_RE.match(value) and any(c.isdigit() for c in value):
+        return float(value)
+    return value
+
+
+def _strip_comment(line):
+    """Remove a trailing comment, leaving # inside quoted scalars alone."""
+    if "#" not in line:
+        return line.rstrip()
+    if "'" not in line and '"' not in line:
+        if line.lstrip().startswith("#"):
+            return ""
+        for marker in (" #", "\t#"):
+            i = line.find(marker)
+            if i != -1:
+                line = line[:i]
+        return line.rstrip()
+    quote = None
+    previous = " "
+    i = 0
+    while i < len(line):
+        c = line[i]
+        if quote == "'":
+            if c == "'":
+                if line[i + 1:i + 2] == "'":
+                    i += 1
+                else:
+                    quote = None
+        elif quote == '"':
+            if c == "\\":
+                i += 1
+            elif c == '"':
+                quote = None
+        elif c in "'\"" and previous in " \t[{,:-?":
+            quote = c
+        elif c == "#" and previous in " \t":
+            return line[:i].rstrip()
+        previous = c
+        i += 1
+    return line.rstrip()
+
+
+def _split_key(content):
+    """Split ``key: rest`` into (key, rest), or return None if content is not a mapping entry."""
+    if content[0] in "\"'":
+        end = _quoted_end(content, 0)
+        if end is None:
+            return None
+        after = content[end:].lstrip()
+        if after == ":" or after.startswith((": ", ":\t")):
+            return _quoted(content[:end]), after[1:].strip()
+        return None
+    if content[0] in "[{|>*!&%@`" or content.startswith(("- ", "? ")) or content == "-":
+        return None
+    i = content.find(":")
+    while i != -1:
+        if i + 1 == len(content) or content[i + 1] in " \t":
+            key = content[:i].rstrip()
+            return resolve_plain(key) if key else None, content[i + 1:].strip()
+        i = content.find(":", i + 1)
+    return None
+
+
+def _quoted_end(text, start):
+    """Index just past the quoted scalar starting at text[start], or None if unterminated."""
+    quote = text[start]
+    i = start + 1
+    while i < len(text):
+        c = text[i]
+        if quote == '"' and c == "\\":
+            i += 2
+            continue
+        if c == quote:
+            if quote == "'" and text[i + 1:i + 2] == "'":
+                i += 2
+                continue
+            return i + 1
+        i += 1
+    return None
+
+
+def _quoted(token):
+    """Value of a complete quoted scalar (including its quotes)."""
+    body = token[1:-1]
+    if token[0] == "'":
+        return _fold_lines(body).replace("''", "'")
+    out = []
+    i = 0
+    body = _fold_lines(body)
+    while i < len(body):
+        c = body[i]
+        if c != "\\":
+            out.append(c)
+            i += 1
+            continue
+        code = body[i + 1:i + 2]
+        if code in _HEX_LENGTHS:
+            digits = body[i + 2:i + 2 + _HEX_LENGTHS[code]]
+            try:
+                out.append(chr(int(digits, 16)))
+            except ValueError:
+                raise YAMLError(f"invalid escape \\{code}{digits}")
+            i += 2 + _HEX_LENGTHS[code]
+        elif code in _ESCAPES:
+            out.append(_ESCAPES[code])
+            i += 2
+        else:
+            raise YAMLError(f"invalid escape \\{code}")
+    return "".join(out)
+
+
+def _fold_lines(text):
+    """Fold the line breaks of a multi-line flow scalar: one break becomes a space."""
+    if "\n" not in text:
+        return text
+    lines = [line.strip() for line in text.split("\n")]
+    out = lines[0]
+    for line in lines[1:]:
+        if not line:
+            out += "\n"
+        elif out.endswith("\n") or not out:
+            out += line
+        else:
+            out += " " + line
+    return out
+
+
+def _flow_balance(text):
+    """Open brackets minus closed ones, ignoring quoted scalars."""
+    depth = 0
+    i = 0
+    while i < len(text):
+        c = text[i]
+        if c in "\"'" and (i == 0 or text[i - 1] in " \t[{,:"):
+            end = _quoted_end(text, i)
+            if end is None:
+                return depth + 1  # unterminated quote: keep reading lines
+            i = end
+            continue
+        if c in "[{":
+            depth += 1
+        elif c in "]}":
+            depth -= 1
+        i += 1
+    return depth
+
+
+class _Parser:
+    def __init__(self, text):
+        self.lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        self.pos = 0
+        self.pending = None
+        self.started = False
+        self.anchors = {}
+        self._peeked = None  # (pos, line) memo for repeated peeks
+
+    # ─── Lines ────────────────────────────────────────────────────────────
+
+    def peek(self):
+        """Next significant line as (indent, content, line number), or None at the end."""
+        if self.pending is not None:
+            return self.pending
+        if self._peeked is not None and self._peeked[0] == self.pos:
+            return self._peeked[1]
+        while self.pos < len(self.lines):
+            raw = self.lines[self.pos]
+            content = _strip_comment(raw)
+            stripped = content.lstrip(" ")
+            if not stripped:
+                self.pos += 1
+                continue
+            if stripped.startswith("\t"):
+                raise YAMLError("tabs are not allowed in indentation", self.pos + 1)
+            if raw.startswith("%") or (raw.startswith("---") and raw[3:4] in ("", " ", "\t")):
+                if self.started and raw.startswith("---"):
+                    self.lines = self.lines[:self.pos]  # a second document: stop here
+                    return None
+                self.pos += 1
+                rest = raw[3:].strip() if raw.startswith("---") else ""
+                if rest and not rest.startswith("#"):
+                    self.pending = (0, rest, self.pos)
+                    self.started = True
+                    return self.pending
+                continue
+            if raw.startswith("...") and raw[3:4] in ("", " ", "\t"):
+                self.lines = self.lines[:self.pos]
+                return None
+            self.started = True
+            line = (len(content) - len(stripped), stripped, self.pos + 1)
+            self._peeked = (self.pos, line)
+            return line
+        return None
+
+    def advance(self):
+        if self.pending is not None:
+            self.pending = None
+        else:
+            self.pos += 1
+
+    # ─── Blocks ───────────────────────────────────────────────────────────
+
+    def parse(self):
+        line = self.peek()
+        if line is None:
+            return None
+        value = self.parse_block(line[0])
+        line = self.peek()
+        if line is not None:
+            raise YAMLError("unexpected content after the document", line[2])
+        return value
+
+    def parse_block(self, indent):
+        """Parse the mapping, sequence or scalar whose first line is at ``indent``."""
+        line = self.peek()
+        content = line[1]
+        if content == "-" or content.startswith("- "):
+            return self.parse_sequence(indent)
+        if _split_key(content) is not None:
+            return self.parse_mapping(indent)
+        self.advance()
+        return self.parse_value(content, indent - 1, line[2])
+
+    def parse_mapping(self, indent):
+        result = {}
+        merges = []
+        while True:
+            line = self.peek()
+            if line is None or line[0] < indent:
+                break
+            if line[0] > indent:
+                raise YAMLError("unexpected indentation", line[2])
+            entry = _split_key(line[1])
+            if entry is None:
+                if line[1] == "-" or line[1].startswith("- "):
+                    raise YAMLError("sequence item where a mapping key was expected", line[2])
+                raise YAMLError(f"expected 'key: value', got {line[1]!r}", line[2])
+            self.advance()
+            key, rest = entry
+            value = self.parse_value(rest, indent, line[2], allow_sequence_at_indent=True)
+            if key == "<<":
+                merges.extend(value if isinstance(value, list) else [value])
+                continue
+            if key in result:
+                raise YAMLError(f"duplicate key {key!r}", line[2])
+            result[key] = value
+        for merged in merges:
+            if not isinstance(merged, dict):
+                raise YAMLError("'<<' must merge a mapping or a list of mappings")
+            for key, value in merged.items():
+                result.setdefault(key, value)
+        return result
+
+    def parse_sequence(self, indent):
+        items = []
+        while True:
+            line = self.peek()
+            if line is None or line[0] < indent:
+                break
+            content = line[1]
+            if line[0] > indent or not (content == "-" or content.startswith("- ")):
+                if line[0] == indent:
+                    break  # a mapping key after a same-indent sequence
+                raise YAMLError("unexpected indentation in sequence", line[2])
+            self.advance()
+            rest = content[1:].lstrip()
+            column = indent + len(content) - len(rest)
+            items.append(self.parse_value(rest, indent, line[2], column=column))
+        return items
+
+    # ─── Values ───────────────────────────────────────────────────────────
+
+    def parse_value(self, rest, parent_indent, lineno, allow_sequence_at_indent=False, column=None):
+        """Parse the value that follows ``key:`` or ``-`` on a line, plus any lines it owns."""
+        anchor = tag = None
+        while rest and rest[0] in "&!":
+            match = _PROPERTY_RE.match(rest)
+            if rest[0] == "&":
+                anchor = match.group(1)[1:]
+            else:
+                tag = match.group(1)
+            rest = rest[match.end():]
+            if column is not None:
+                column += match.end()
+
+        if not rest:
+            value = self.parse_nested(parent_indent, allow_sequence_at_indent)
+        elif rest[0] == "*":
+            name = rest[1:].strip()
+            if name not in self.anchors:
+                raise YAMLError(f"unknown alias *{name}", lineno)
+            value = self.anchors[name]
+        elif rest[0] in "|>":
+            value = self.parse_block_scalar(rest, parent_indent, lineno)
+        elif rest[0] in "[{":
+            value = self.parse_flow_lines(rest, lineno)
+        elif column is not None and (rest == "-" or rest.startswith("- ") or _split_key(rest) is not None):
+            # "- key: value" or "- - item": a block collection starting on the item's line
+            self.pending = (column, rest, lineno)
+            value = self.parse_block(column)
+        elif rest[0] in "\"'":
+            value = self.parse_quoted_lines(rest, lineno)
+        else:
+            value = self.parse_plain_lines(rest, parent_indent)
+
+        value = self.apply_tag(tag, value, lineno)
+        if anchor:
+            self.anchors[anchor] = value
+        return value
+
+    def parse_nested(self, parent_indent, allow_sequence_at_indent):
+        line = self.peek()
+        if line is None:
+            return None
+        if line[0] > parent_indent:
+            return self.parse_block(line[0])
+        if allow_sequence_at_indent and line[0] == parent_indent and (line[1] == "-" or line[1].startswith("- ")):
+            return self.parse_sequence(parent_indent)
+        return None
+
+    def parse_plain_lines(self, rest, parent_indent):
+        # A plain scalar may continue on more-indented lines that are not
+        # themselves mapping entries or sequence items.
+        parts = [rest]
+        while True:
+            line = self.peek()
+            if line is None or line[0] <= parent_indent or line[1].startswith("- ") or _split_key(line[1]) is not None:
+                break
+            parts.append(line[1])
+            self.advance()
+        return resolve_plain(" ".join(parts))
+
+    def parse_quoted_lines(self, rest, lineno):
+        text = rest
+        while _quoted_end(text, 0) is None:
+            if self.pending is not None or self.pos >= len(self.lines):
+                raise YAMLError("unterminated quoted scalar", lineno)
+            text += "\n" + self.lines[self.pos]
+            self.pos += 1
+        end = _quoted_end(text, 0)
+        trailing = _strip_comment(text[end:]).strip()
+        if trailing:
+            raise YAMLError(f"unexpected text after quoted scalar: {trailing!r}", lineno)
+        return _quoted(text[:end])
+
+    def parse_flow_lines(self, rest, lineno):
+        text = rest
+        while _flow_balance(text) > 0:
+            if self.pending is not None or self.pos >= len(self.lines):
+                raise YAMLError("unterminated flow collection", lineno)
+            text += " " + _strip_comment(self.lines[self.pos]).strip()
+            self.pos += 1
+        return _FlowParser(text, self.anchors, lineno).parse()
+
+    def parse_block_scalar(self, header, parent_indent, lineno):
+        match = re.match(r"([|>])([-+]?)([1-9]?)([-+]?)\s*(#.*)?$", header)
+        if match is None:
+            raise YAMLError(f"invalid block scalar header {header!r}", lineno)
+        style, chomp, explicit, chomp_after, _ = match.groups()
+        chomp = chomp or chomp_after
+        if self.pending is not None:
+            raise YAMLError("block scalar must end its line", lineno)
+
+        indent = parent_indent + int(explicit) + (parent_indent < 0) if explicit else None
+        lines = []
+        while self.pos < len(self.lines):
+            raw = self.lines[self.pos]
+            if raw.strip():
+                current = len(raw) - len(raw.lstrip(" "))
+                if indent is None:
+                    if current <= parent_indent:
+                        break
+                    indent = current
+                if current < indent:
+                    break
+                lines.append(raw[indent:])
+            else:
+                lines.append("")
+            self.pos += 1
+
+        body = lines
+        trailing = 0
+        while body and body[-1] == "":
+            body = body[:-1]
+            trailing += 1
+        if style == "|":
+            text = "\n".join(body)
+        else:
+            # Folded: single breaks become spaces, each blank line a
+            # newline; more-indented lines keep their breaks.
+            text = ""
+            previous = None
+            for line in body:
+                if previous is None:
+                    text = line
+                elif not line:
+                    text += "\n"
+                elif not previous:
+                    text += line
+                elif line.startswith(" ") or previous.startswith(" "):
+                    text += "\n" + line
+                else:
+                    text += " " + line
+                previous = line
+        if chomp == "-" or not body:
+            return text if chomp != "+" else text + "\n" * trailing
+        if chomp == "+":
+            return text + "\n" + "\n" * trailing
+        return text + "\n"
+
+    def apply_tag(self, tag, value, lineno):
+        if tag is None or tag == "!":
+            return value
+        if tag == "!!str":
+            return "" if value is None else str(value).lower() if isinstance(value, bool) else str(value)
+        if tag == "!!int":
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                raise YAMLError(f"cannot convert {value!r} to !!int", lineno)
+        if tag == "!!float":
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                raise YAMLError(f"cannot convert {value!r} to !!float", lineno)
+        if tag in ("!!map", "!!seq", "!!null", "!!bool"):
+            return value
+        return Tagged(tag, value)
+
+
+class _FlowParser:
+    """Recursive-descent parser for one flow collection (``[...]`` or ``{...}``)."""
+
+    def __init__(self, text, anchors, lineno):
+        self.text = text
+        self.i = 0
+        self.anchors = anchors
+        self.lineno = lineno
+
+    def error(self, message):
+        return YAMLError(message, self.lineno)
+
+    def skip_space(self):
+        while self.i < len(self.text) and self.text[self.i] in " \t":
+            self.i += 1
+
+    def parse(self):
+        value = self.parse_node()
+        self.skip_space()
+        if self.i != len(self.text):
+            raise self.error(f"unexpected text after flow collection: {self.text[self.i:]!r}")
+        return value
+
+    def parse_node(self):
+        self.skip_space()
+        anchor = None
+        if self.text[self.i:self.i + 1] == "&":
+            match = _PROPERTY_RE.match(self.text, self.i)
+            anchor = match.group(1)[1:]
+            self.i = match.end()
+        c = self.text[self.i:self.i + 1]
+        if c == "[":
+            value = self.parse_sequence()
+        elif c == "{":
+            value = self.parse_mapping()
+        elif c == "*":
+            match = re.compile(r"\*([^\s,\[\]{}]+)").match(self.text, self.i)
+            if match is None or match.group(1) not in self.anchors:
+                raise self.error("unknown alias in flow collection")
+            self.i = match.end()
+            value = self.anchors[match.group(1)]
+        elif c in ("'", '"'):
+            end = _quoted_end(self.text, self.i)
+            if end is None:
+                raise self.error("unterminated quoted scalar")
+            value = _quoted(self.text[self.i:end])
+            self.i = end
+        else:
+            value = self.parse_plain()
+        if anchor:
+            self.anchors[anchor] = value
+        return value
+
+    def parse_plain(self):
+        start = self.i
+        while self.i < len(self.text):
+            c = self.text[self.i]
+            if c in ",[]{}":
+                break
+            if c == ":" and (self.i + 1 == len(self.text) or self.text[self.i + 1] in " \t,]}"):
+                break
+            self.i += 1
+        return resolve_plain(self.text[start:self.i].strip())
+
+    def parse_sequence(self):
+        self.i += 1
+        items = []
+        while True:
+            self.skip_space()
+            if self.text[self.i:self.i + 1] == "]":
+                self.i += 1
+                return items
+            if self.i >= len(self.text):
+                raise self.error("unterminated flow sequence")
+            items.append(self.parse_node())
+            self.skip_space()
+            c = self.text[self.i:self.i + 1]
+            if c == ",":
+                self.i += 1
+            elif c != "]":
+                raise self.error("expected ',' or ']' in flow sequence")
+
+    def parse_mapping(self):
+        self.i += 1
+        result = {}
+        while True:
+            self.skip_space()
+            if self.text[self.i:self.i + 1] == "}":
+                self.i += 1
+                return result
+            if self.i >= len(self.text):
+                raise self.error("unterminated flow mapping")
+            key = self.parse_node()
+            self.skip_space()
+            value = None
+            if self.text[self.i:self.i + 1] == ":":
+                self.i += 1
+                self.skip_space()
+                if self.text[self.i:self.i + 1] not in (",", "}"):
+                    value = self.parse_node()
+            if key == "<<" and isinstance(value, dict):
+                for k, v in value.items():
+                    result.setdefault(k, v)
+            else:
+                result[key] = value
+            self.skip_space()
+            c = self.text[self.i:self.i + 1]
+            if c == ",":
+                self.i += 1
+            elif c != "}":
+                raise self.error("expected ',' or '}' in flow mapping")
@@ -0,0 +1,254 @@
+"""
+Declarative grading rules.
+
+Checks that only look at an artifact's text or its Dockerfile instructions
+are declared in ``rules.json`` (next to challenge.json) instead of being
+written as Python functions. Each rule names the artifact it reads, its
+module and points, and an ordered list of cases; the first case whose
+``when`` predicate holds decides the result:
+
+    {"name": "CMD defined", "module": 4, "points": 3, "artifact": "dockerfile",
+     "cases": [{"when": {"instruction": "CMD"}, "pass": true, "message": "CMD instruction is defined"},
+               {"pass": false, "message": "Dockerfile should have a CMD instruction to start the app"}]}
+
+The last case must have no ``when``. Predicates:
+
+    {"exists": true|false}        the artifact file is present (or not)
+    {"empty": true}               the artifact is missing or has no content
+    {"match": REGEX}              REGEX matches somewhere in the artifact
+    {"instruction": KEYWORD,      Dockerfile instructions of KEYWORD ("first": only
+     "arguments": REGEX,          the first one) whose arguments / operands match
+     "operands": REGEX,           REGEX number between "min" (default 1) and "max"
+     "first": bool, "min": N, "max": N}
+    {"stages": {"min": N, "max": N}}   number of Dockerfile build stages
+    {"all": [...]}, {"any": [...]}, {"not": {...}}
+
+Messages may use ``{stages}`` for Dockerfile rules. Regexes use Python
+syntax with search semantics; ``match`` patterns run over the file's UTF-8
+bytes and may start with inline flags such as ``(?i)``.
+
+The compiler gathers every ``match`` pattern that targets an artifact into
+a single tuple, so a grade scans each artifact once, in one combined pass,
+however many rules look at it (GradeContext.scan). Instruction regexes are
+compiled once at load time. A rule is placed in the registry at the start
+of its module's checks, after the module's earlier rules, or right after
+the check named by an optional ``"after"`` key.
+"""
+
+import os
+import re
+import json
+import string
+
+from grader import dockerfile
+from grader.context import ARTIFACTS
+
+RULES_FILENAME = "rules.json"
+TEMPLATE_FIELDS = {"dockerfile": ("stages",)}
+RULE_KEYS = {"name", "module", "points", "artifact", "cases", "after"}
+
+
+class RuleError(ValueError):
+    """rules.json is malformed."""
+
+
+class RuleSet:
+    """Registry entries compiled from a rules file, plus any module names it declares."""
+
+    __slots__ = ("checks", "module_names")
+
+    def __init__(self, checks, module_names):
+        self.checks = checks
+        self.module_names = module_names
+
+
+# ─── Compiler ──────────────────────────────────────────────────────────────
+
+class _Compiler:
+    def __init__(self):
+        # artifact -> list of match patterns; frozen into tuples by finish()
+        self.patterns = {}
+        self.scanners = {}
+
+    def _pattern_index(self, artifact, pattern, where):
+        if not isinstance(pattern, str):
+            raise RuleError(f"{where}: 'match' must be a string")
+        try:
+            re.compile(pattern.encode("utf-8"))
+        except re.error as e:
+            raise RuleError(f"{where}: bad regex {pattern!r}: {e}") from None
+        patterns = self.patterns.setdefault(artifact, [])
+        if pattern not in patterns:
+            patterns.append(pattern)
+        return patterns.index(pattern)
+
+    def _regex(self, pattern, where):
+        try:
+            return re.compile(pattern)
+        except (re.error, TypeError) as e:
+            raise RuleError(f"{where}: bad regex {pattern!r}: {e}") from None
+
+    def predicate(self, spec, artifact, where):
+        """Compile a predicate spec to ``test(ctx) -> bool``."""
+        if not isinstance(spec, dict) or not spec:
+            raise RuleError(f"{where}: a predicate must be a non-empty object")
+        if "all" in spec or "any" in spec:
+            key = "all" if "all" in spec else "any"
+            parts = [self.predicate(p, artifact, f"{where}.{key}[{i}]") for i, p in enumerate(spec[key])]
+            combine = all if key == "all" else any
+            return lambda ctx: combine(part(ctx) for part in parts)
+        if "not" in spec:
+            inner = self.predicate(spec["not"], artifact, f"{where}.not")
+            return lambda ctx: not inner(ctx)
+        if "exists" in spec:
+            wanted = bool(spec["exists"])
+            return lambda ctx: ctx.exists(artifact) == wanted
+        if "empty" in spec:
+            wanted = bool(spec["empty"])
+            return lambda ctx: (self._scan(ctx, artifact) is None) == wanted
+        if "match" in spec:
+            index = self._pattern_index(artifact, spec["match"], where)
+
+            def test(ctx):
+                found = self._scan(ctx, artifact)
+                return found is not None and found[index]
+            return test
+        if "instruction" in spec or "stages" in spec:
+            if artifact != "dockerfile":
+                raise RuleError(f"{where}: instruction and stage predicates need artifact 'dockerfile'")
+            if "stages" in spec:
+                bounds = spec["stages"]
+                low, high = bounds.get("min", 0), bounds.get("max")
+                return lambda ctx: low <= dockerfile.stage_count(ctx.dockerfile) <= (high if high is not None else float("inf"))
+            return self._instruction(spec, where)
+        raise RuleError(f"{where}: unknown predicate {sorted(spec)}")
+
+    def _instruction(self, spec, where):
+        keyword = str(spec["instruction"]).upper()
+        arguments = self._regex(spec["arguments"], where) if "arguments" in spec else None
+        operands = self._regex(spec["operands"], where) if "operands" in spec else None
+        first = bool(spec.get("first"))
+        low, high = spec.get("min", 1), spec.get("max")
+
+        def test(ctx):
+            found = dockerfile.find(ctx.dockerfile, keyword)
+            if first:
+                found = found[:1]
+            count = sum(
+                1 for i in found
+                if (arguments is None or arguments.search(i.arguments))
+                and (operands is None or operands.search(i.operands()))
+            )
+            return count >= low and (high is None or count <= high)
+        return test
+
+    def _scan(self, ctx, artifact):
+        # Every rule on this artifact passes the same tuple, so the context
+        # scans the file once per grade
+        return ctx.scan(artifact, self.scanners[artifact])
+
+    def rule(self, spec, index):
+        where = f"rules[{index}]"
+        if not isinstance(spec, dict):
+            raise RuleError(f"{where}: a rule must be an object")
+        unknown = set(spec) - RULE_KEYS
+        if unknown:
+            raise RuleError(f"{where}: unknown keys {sorted(unknown)}")
+        for key in ("name", "module", "points", "artifact", "cases"):
+            if key not in spec:
+                raise RuleError(f"{where}: missing '{key}'")
+        where = f"rule {spec['name']!r}"
+        artifact = spec["artifact"]
+        if artifact not in ARTIFACTS:
+            raise RuleError(f"{where}: unknown artifact {artifact!r} (one of {', '.join(ARTIFACTS)})")
+        cases = spec["cases"]
+        if not cases or "when" in cases[-1]:
+            raise RuleError(f"{where}: the last case must have no 'when'")
+
+        compiled = []
+        fields = TEMPLATE_FIELDS.get(artifact, ())
+        for n, case in enumerate(cases):
+            if "pass" not in case or "message" not in case:
+                raise RuleError(f"{where}: case {n} needs 'pass' and 'message'")
+            message = case["message"]
+            used = [name for _, name, _, _ in string.Formatter().parse(message) if name is not None]
+            for name in used:
+                if name not in fields:
+                    raise RuleError(f"{where}: case {n} uses unknown field {{{name}}}")
+            test = self.predicate(case["when"], artifact, f"{where} case {n}") if "when" in case else None
+            compiled.append((test, bool(case["pass"]), message, bool(used)))
+
+        def evaluate(ctx):
+            for test, passed, message, templated in compiled:
+                if test is None or test(ctx):
+                    if templated:
+                        message = message.format(stages=dockerfile.stage_count(ctx.dockerfile))
+                    return passed, message
+
+        entry = {"name": spec["name"], "func": evaluate, "points": spec["points"],
+                 "module": spec["module"], "needs": (artifact,)}
+        if "after" in spec:
+            entry["after"] = spec["after"]
+        return entry
+
+    def finish(self):
+        self.scanners.update({artifact: tuple(p) for artifact, p in self.patterns.items()})
+        for artifact in ARTIFACTS:
+            self.scanners.setdefault(artifact, ())
+
+
+def compile_rules(document):
+    """Registry entries for the rules in a parsed rules document."""
+    if not isinstance(document, dict) or not isinstance(document.get("rules"), list):
+        raise RuleError("expected an object with a 'rules' list")
+    compiler = _Compiler()
+    checks = [compiler.rule(spec, n) for n, spec in enumerate(document["rules"])]
+    compiler.finish()
+    names = [c["name"] for c in checks]
+    duplicates = sorted({n for n in names if names.count(n) > 1})
+    if duplicates:
+        raise RuleError(f"duplicate rule names: {', '.join(duplicates)}")
+    return checks
+
+
+def load(path):
+    """Compile a rules file into a RuleSet. Raises RuleError if it is missing or malformed."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            document = json.load(f)
+    except OSError as e:
+        raise RuleError(f"cannot read {path}: {e}") from None
+    except ValueError as e:
+        raise RuleError(f"{os.path.basename(path)}: {e}") from None
+    try:
+        checks = compile_rules(document)
+    except RuleError as e:
+        raise RuleError(f"{os.path.basename(path)}: {e}") from None
+    names = {int(module): name for module, name in document.get("modules", {}).items()}
+    return RuleSet(checks, names)
+
+
+def merge(checks, rule_checks):
+    """Registry with rule entries placed among the hand-written checks.
+
+    A rule goes right after the check named by its "after" key, else after
+    the previous rule of its module, else at the start of its module's
+    checks (or, for a module with no checks yet, before the next module).
+    """
+    merged = list(checks)
+    last = {}
+    for rule in rule_checks:
+        entry = {k: v for k, v in rule.items() if k != "after"}
+        module = entry["module"]
+        if "after" in rule:
+            anchors = [i for i, c in enumerate(merged) if c["name"] == rule["after"]]
+            if not anchors:
+                raise RuleError(f"rule {entry['name']!r}: no check named {rule['after']!r} to follow")
+            position = anchors[0] + 1
+        elif module in last:
+            position = next(i for i, c in enumerate(merged) if c is last[module]) + 1
+        else:
+            position = next((i for i, c in enumerate(merged) if c["module"] >= module), len(merged))
+        merged.insert(position, entry)
+        last[module] = entry
+    return merged
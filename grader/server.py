@@ -0,0 +1,266 @@
+"""
+Resident grading service for ``run.py serve``.
+
+Keeps one grader process running and accepts grade requests over HTTP on
+localhost or on a Unix socket, so a submission portal does not pay for
+interpreter startup, module import and cold caches on every grade.
+
+Endpoints (JSON in, JSON out):
+
+    POST /grade    {"root": "/path/to/checkout", "module": 5}  ->  grade report
+    GET  /stats    queue depth, in-flight grades, counters and latency percentiles
+    GET  /health   {"status": "ok"}
+
+Grades run on a fixed number of worker threads fed by a bounded queue. A
+request that finds the queue full is answered with 503 and a Retry-After
+header straight away instead of piling up.
+"""
+
+import os
+import json
+import time
+import queue
+import stat
+import socket
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+
+from grader.timing import percentile
+
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE_SIZE = 64
+LATENCY_WINDOW = 1024
+MAX_REQUEST_BYTES = 64 * 1024
+
+
+class GradeJob:
+    """One queued grade request and, once finished, its outcome."""
+
+    __slots__ = ("root", "module", "queued_at", "started_at", "report", "error", "done")
+
+    def __init__(self, root, module):
+        self.root = root
+        self.module = module
+        self.queued_at = time.perf_counter()
+        self.started_at = None
+        self.report = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class GradeService:
+    """Bounded queue of grade jobs served by a pool of worker threads.
+
+    ``grade(root, module)`` returns the JSON report for one checkout and
+    raises ValueError for requests that cannot be graded.
+    """
+
+    def __init__(self, grade, workers=2, queue_size=DEFAULT_QUEUE_SIZE, extra_stats=None):
+        self.grade = grade
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.extra_stats = extra_stats
+        self.started = time.time()
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._counters = {"accepted": 0, "completed": 0, "failed": 0, "rejected": 0}
+        self._latency = deque(maxlen=LATENCY_WINDOW)
+        self._wait = deque(maxlen=LATENCY_WINDOW)
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"grade-{n}", daemon=True)
+            for n in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, root, module=None):
+        """Queue a grade; return the job, or None if the queue is full."""
+        job = GradeJob(root, module)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._counters["rejected"] += 1
+            return None
+        with self._lock:
+            self._counters["accepted"] += 1
+        return job
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            job.started_at = time.perf_counter()
+            with self._lock:
+                self._in_flight += 1
+            try:
+                job.report = self.grade(job.root, job.module)
+            except Exception as e:
+                job.error = e
+            finished = time.perf_counter()
+            with self._lock:
+                self._in_flight -= 1
+                self._counters["failed" if job.error is not None else "completed"] += 1
+                self._wait.append((job.started_at - job.queued_at) * 1000)
+                self._latency.append((finished - job.queued_at) * 1000)
+            job.done.set()
+
+    def stats(self):
+        with self._lock:
+            result = {
+                "uptime_s": round(time.time() - self.started, 1),
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "queue_depth": self._queue.qsize(),
+                "in_flight": self._in_flight,
+                **self._counters,
+                "latency_ms": _distribution(self._latency),
+                "queue_wait_ms": _distribution(self._wait),
+            }
+        if self.extra_stats is not None:
+            result.update(self.extra_stats())
+        return result
+
+    def close(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+
+def _distribution(samples):
+    """Percentiles (ms) over the recent sample window."""
+    if not samples:
+        return {"count": 0}
+    samples = list(samples)
+    return {
+        "count": len(samples),
+        "p50": round(percentile(samples, 50), 3),
+        "p95": round(percentile(samples, 95), 3),
+        "p99": round(percentile(samples, 99), 3),
+        "max": round(max(samples), 3),
+    }
+
+
+class GradeRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end for the GradeService attached to the server."""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "workshop-grader"
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _reject(self, status, message):
+        # The body was not read, so the connection cannot carry another request
+        self.close_connection = True
+        self._send(status, {"error": message}, {"Connection": "close"})
+
+    def _content_length(self):
+        """The request body's length, or None after answering 411/400/413 for an unusable header."""
+        header = self.headers.get("Content-Length")
+        if header is None:
+            self._reject(411, "Content-Length is required")
+            return None
+        # Plain ASCII digits only: int() would also take " 12", "+12", "1_2"
+        if not (header.isascii() and header.isdigit()):
+            self._reject(400, f"invalid Content-Length: {header!r}")
+            return None
+        length = int(header)
+        if length > MAX_REQUEST_BYTES:
+            self._reject(413, "request body too large")
+            return None
+        return length
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, {"status": "ok"})
+        elif self.path == "/stats":
+            self._send(200, self.server.service.stats())
+        else:
+            self._send(404, {"error": f"no such endpoint: {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/grade":
+            self._send(404, {"error": f"no such endpoint: {self.path}"})
+            return
+        length = self._content_length()
+        if length is None:
+            return
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+            root = request["root"]
+            module = request.get("module")
+            if not isinstance(root, str) or not (module is None or isinstance(module, int)):
+                raise TypeError
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self._send(400, {"error": 'expected a JSON body like {"root": "/path/to/checkout", "module": 5}'})
+            return
+
+        job = self.server.service.submit(root, module)
+        if job is None:
+            self._send(503, {"error": "grade queue is full"}, {"Retry-After": "1"})
+            return
+        job.done.wait()
+        if isinstance(job.error, ValueError):
+            self._send(400, {"error": str(job.error)})
+        elif job.error is not None:
+            self._send(500, {"error": f"{type(job.error).__name__}: {job.error}"})
+        else:
+            self._send(200, job.report)
+
+    def log_message(self, format, *args):
+        # One line per grade adds nothing on a busy portal; /stats has the counters
+        pass
+
+
+class LocalHTTPServer(ThreadingHTTPServer):
+    # Bursts of clients wait in the listen backlog until a handler thread
+    # accepts them; the grade queue does the real admission control.
+    request_queue_size = 128
+
+
+class UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def get_request(self):
+        # Unix sockets have no peer address; BaseHTTPRequestHandler expects a tuple
+        request, _ = super().get_request()
+        return request, ("local", 0)
+
+
+def make_server(service, port=DEFAULT_PORT, socket_path=None):
+    """HTTP server bound to ``socket_path`` if given, else to 127.0.0.1:``port``."""
+    if socket_path:
+        if not hasattr(socket, "AF_UNIX"):
+            raise OSError("Unix sockets are not supported on this platform")
+        try:
+            if stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                os.unlink(socket_path)  # left over from a previous run
+        except FileNotFoundError:
+            pass
+        server = UnixHTTPServer(socket_path, GradeRequestHandler)
+    else:
+        server = LocalHTTPServer(("127.0.0.1", port), GradeRequestHandler)
+    server.service = service
+    return server
+
+
+def address(server):
+    """Human-readable address a server is listening on."""
+    if isinstance(server.server_address, str):
+        return f"unix://{server.server_address}"
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
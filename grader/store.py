@@ -0,0 +1,293 @@
+"""
+Append-only, columnar store of grade results.
+
+Every recorded grade adds one row: when it ran, which submission and
+cohort it was, its score and, for every check, the points earned, whether
+it passed and how long it took. Rows are stored column by column in flat
+binary files (``array`` typecodes, native byte order) so a cohort-wide
+query reads each column with a single read and aggregates with
+slicing and ``bytes.count`` instead of parsing thousands of JSON reports.
+
+Layout, one directory per check list (the schema), since optional checks
+and ``--module`` change which checks a grade runs:
+
+    <store>/<schema id>/schema.json     check names, modules and points
+    <store>/<schema id>/time.d          grade time (epoch seconds)
+    <store>/<schema id>/submission.I    index into <store>/submissions.txt
+    <store>/<schema id>/cohort.I        index into <store>/cohorts.txt
+    <store>/<schema id>/score.H         earned points
+    <store>/<schema id>/earned.B        earned points, one byte per check per row
+    <store>/<schema id>/passed.B        1/0, one byte per check per row
+    <store>/<schema id>/wall_ms.f       check wall time, one float per check per row
+
+Appends take an exclusive lock on the store, so batch workers in several
+processes can record into one store. A crash mid-append can leave some
+columns a row longer than others; readers use the shortest.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from array import array
+from collections import Counter
+
+from grader.timing import percentile
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are not serialized across processes
+    fcntl = None
+
+LOCK_NAME = ".lock"
+HISTOGRAM_BUCKET = 10
+
+# column name -> array typecode; per-check columns hold one value per check per row
+ROW_COLUMNS = {"time": "d", "submission": "I", "cohort": "I", "score": "H"}
+CHECK_COLUMNS = {"earned": "B", "passed": "B", "wall_ms": "f"}
+
+
+def schema_id(checks):
+    names = "\0".join(f"{c['module']}:{c['name']}" for c in checks)
+    return hashlib.sha256(names.encode("utf-8")).hexdigest()[:12]
+
+
+class ResultStore:
+    """Append rows to, and read columns from, a results store directory."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._labels = {}
+
+    # ─── Writing ───────────────────────────────────────────────────────────
+
+    def _label_index(self, kind, label):
+        """Index of label in <kind>.txt, appending it if new (caller holds the lock)."""
+        path = os.path.join(self.path, f"{kind}.txt")
+        labels = self._labels.get(kind)
+        if labels is None or label not in labels:
+            labels = {}
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for n, line in enumerate(f):
+                        labels[line.rstrip("\n")] = n
+            except FileNotFoundError:
+                pass
+            self._labels[kind] = labels
+        if label not in labels:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(label.replace("\n", " ") + "\n")
+            labels[label] = len(labels)
+        return labels[label]
+
+    def append(self, submission, results, cohort="", when=None):
+        """Record one grade (its list of check result dicts)."""
+        directory = os.path.join(self.path, schema_id(results))
+        lock = open(os.path.join(self.path, LOCK_NAME), "a")
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            if not os.path.exists(os.path.join(directory, "schema.json")):
+                os.makedirs(directory, exist_ok=True)
+                schema = [{"name": r["name"], "module": r["module"], "points": r["points"]} for r in results]
+                with open(os.path.join(directory, "schema.json"), "w", encoding="utf-8") as f:
+                    json.dump(schema, f)
+
+            row = {
+                "time": array("d", [time.time() if when is None else when]),
+                "submission": array("I", [self._label_index("submissions", os.path.abspath(submission))]),
+                "cohort": array("I", [self._label_index("cohorts", cohort)]),
+                "score": array("H", [sum(r["earned"] for r in results)]),
+                "earned": array("B", [min(255, r["earned"]) for r in results]),
+                "passed": array("B", [1 if r["passed"] else 0 for r in results]),
+                "wall_ms": array("f", [r.get("timing", {}).get("wall_ms", 0.0) for r in results]),
+            }
+            for name, values in row.items():
+                with open(os.path.join(directory, f"{name}.{values.typecode}"), "ab") as f:
+                    values.tofile(f)
+        finally:
+            lock.close()
+
+    # ─── Reading ───────────────────────────────────────────────────────────
+
+    def _labels_list(self, kind):
+        try:
+            with open(os.path.join(self.path, f"{kind}.txt"), "r", encoding="utf-8") as f:
+                return [line.rstrip("\n") for line in f]
+        except FileNotFoundError:
+            return []
+
+    def segments(self):
+        """Yield a Segment for every schema directory in the store."""
+        with os.scandir(self.path) as entries:
+            for entry in sorted(entries, key=lambda e: e.name):
+                if entry.is_dir() and os.path.exists(os.path.join(entry.path, "schema.json")):
+                    yield Segment(entry.path)
+
+
+class Segment:
+    """All rows recorded under one check list, loaded column by column."""
+
+    def __init__(self, path):
+        with open(os.path.join(path, "schema.json"), "r", encoding="utf-8") as f:
+            self.checks = json.load(f)
+        width = len(self.checks)
+        columns = {}
+        sizes = []
+        for name, typecode in {**ROW_COLUMNS, **CHECK_COLUMNS}.items():
+            values = array(typecode)
+            try:
+                with open(os.path.join(path, f"{name}.{typecode}"), "rb") as f:
+                    values.frombytes(f.read())
+            except FileNotFoundError:
+                pass
+            columns[name] = values
+            sizes.append(len(values) // (width if name in CHECK_COLUMNS else 1))
+        self.rows = min(sizes) if sizes else 0
+        for name in ROW_COLUMNS:
+            del columns[name][self.rows:]
+        for name in CHECK_COLUMNS:
+            del columns[name][self.rows * width:]
+        self.columns = columns
+
+    def select(self, rows):
+        """Keep only the given row indices (ascending)."""
+        width = len(self.checks)
+        if len(rows) == self.rows:
+            return
+        for name, values in self.columns.items():
+            if name in ROW_COLUMNS:
+                self.columns[name] = array(values.typecode, (values[r] for r in rows))
+            else:
+                self.columns[name] = array(values.typecode,
+                                           (values[r * width + i] for r in rows for i in range(width)))
+        self.rows = len(rows)
+
+    def check_column(self, name, index):
+        """One check's values across every row: a strided slice of a per-check column."""
+        return self.columns[name][index::len(self.checks)]
+
+
+# ─── Queries ───────────────────────────────────────────────────────────────
+
+def load(store, cohort=None, since=None, latest=False):
+    """Segments of the store filtered to a cohort, a start time and/or each submission's latest grade."""
+    cohorts = store._labels_list("cohorts")
+    wanted = cohorts.index(cohort) if cohort is not None and cohort in cohorts else None
+    if cohort is not None and wanted is None:
+        return []
+    segments = list(store.segments())
+
+    newest = {}
+    if latest:
+        for s, segment in enumerate(segments):
+            times, subs = segment.columns["time"], segment.columns["submission"]
+            for r in range(segment.rows):
+                if wanted is not None and segment.columns["cohort"][r] != wanted:
+                    continue
+                if times[r] >= newest.get(subs[r], (float("-inf"),))[0]:
+                    newest[subs[r]] = (times[r], s, r)
+        keep = {(s, r) for _, s, r in newest.values()}
+
+    for s, segment in enumerate(segments):
+        if wanted is None and since is None and not latest:
+            continue
+        cohort_col, times = segment.columns["cohort"], segment.columns["time"]
+        rows = [
+            r for r in range(segment.rows)
+            if (wanted is None or cohort_col[r] == wanted)
+            and (since is None or times[r] >= since)
+            and (not latest or (s, r) in keep)
+        ]
+        segment.select(rows)
+    return [segment for segment in segments if segment.rows]
+
+
+def aggregate(segments):
+    """Pass rates per check and module, a score histogram and timing percentiles."""
+    checks = {}
+    modules = {}
+    scores = Counter()
+    runs = 0
+    for segment in segments:
+        runs += segment.rows
+        scores.update(v // HISTOGRAM_BUCKET * HISTOGRAM_BUCKET for v in segment.columns["score"])
+        module_rows = {}
+        for i, check in enumerate(segment.checks):
+            passed = segment.check_column("passed", i).tobytes().count(1)
+            stats = checks.setdefault(check["name"], {"module": check["module"], "points": check["points"],
+                                                      "runs": 0, "passed": 0, "wall_ms": []})
+            stats["runs"] += segment.rows
+            stats["passed"] += passed
+            stats["wall_ms"].extend(segment.check_column("wall_ms", i))
+            module_rows.setdefault(check["module"], []).append(i)
+
+        for module, indices in module_rows.items():
+            # A run passes a module when every check of the module passed: AND
+            # the checks' 0/1 byte columns as big integers, then count the set bits
+            full = -1
+            for i in indices:
+                full &= int.from_bytes(segment.check_column("passed", i).tobytes(), "little")
+            stats = modules.setdefault(module, {"runs": 0, "passed": 0})
+            stats["runs"] += segment.rows
+            stats["passed"] += bin(full).count("1") if segment.rows else 0
+
+    for stats in checks.values():
+        samples = stats.pop("wall_ms")
+        stats["pass_rate"] = round(stats["passed"] / stats["runs"], 4) if stats["runs"] else None
+        stats["wall_ms"] = {
+            "p50": round(percentile(samples, 50), 3),
+            "p95": round(percentile(samples, 95), 3),
+            "p99": round(percentile(samples, 99), 3),
+        } if samples else {}
+    for stats in modules.values():
+        stats["pass_rate"] = round(stats["passed"] / stats["runs"], 4) if stats["runs"] else None
+    return {
+        "runs": runs,
+        "checks": checks,
+        "modules": {str(m): modules[m] for m in sorted(modules)},
+        "score_histogram": {f"{b}-{b + HISTOGRAM_BUCKET - 1}": scores[b] for b in sorted(scores)},
+    }
+
+
+def format_summary(summary, out):
+    out.write(f"  {summary['runs']} graded runs\n\n")
+    out.write(f"  {'Check':<36} {'Module':>6} {'Pass rate':>10} {'p50 ms':>9} {'p95 ms':>9}\n")
+    ranked = sorted(summary["checks"].items(), key=lambda item: (item[1]["pass_rate"] or 0, item[0]))
+    for name, stats in ranked:
+        wall = stats["wall_ms"]
+        out.write(f"  {name[:36]:<36} {stats['module']:>6} {stats['pass_rate'] or 0:>10.1%} "
+                  f"{wall.get('p50', 0):>9.1f} {wall.get('p95', 0):>9.1f}\n")
+    out.write("\n  Module pass rates (every check passed)\n")
+    for module, stats in summary["modules"].items():
+        out.write(f"    Module {int(module):02d}: {stats['pass_rate'] or 0:.1%} of {stats['runs']}\n")
+    out.write("\n  Score histogram\n")
+    peak = max(summary["score_histogram"].values(), default=0)
+    for bucket, count in summary["score_histogram"].items():
+        bar = "█" * (round(count / peak * 40) if peak else 0)
+        out.write(f"    {bucket:>7} {bar} {count}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query a grader results store")
+    parser.add_argument("store", help="Results store directory (run.py --store DIR)")
+    parser.add_argument("--cohort", help="Only runs recorded with this --cohort label")
+    parser.add_argument("--since", type=float, help="Only runs at or after this epoch time")
+    parser.add_argument("--latest", action="store_true", help="Only each submission's most recent run")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+    if not os.path.isdir(args.store):
+        parser.error(f"no results store at {args.store}")
+    summary = aggregate(load(ResultStore(args.store), args.cohort, args.since, args.latest))
+    if args.json:
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+    else:
+        format_summary(summary, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Timing instrumentation for checks.
+
+Every check runs inside ``timed()``, which records its wall time with
+time.perf_counter_ns. Subprocesses started through ``run()`` while a check
+is being timed add their own wall time and CPU time (user + system, taken
+from the child's resource usage) to that check, so a slow grade can be
+attributed to docker build, Docker CLI calls or Python-side work. Time a
+check spends waiting for a host-wide Docker slot (grader.admission) is
+reported separately as its queue wait.
+
+A check running ``within()`` a grade's Deadline (grader.deadline) gives its
+subprocesses no more than the time left, and they are killed if the
+deadline ends while they run.
+
+The Profiler collects cProfile data across the executor's worker threads
+for ``--profile-out``.
+"""
+
+import os
+import time
+import pstats
+import cProfile
+import threading
+import subprocess
+from contextlib import contextmanager
+
+from grader.deadline import kill_process
+
+_local = threading.local()
+
+
+class CheckTimer:
+    """Timings collected for one check."""
+
+    __slots__ = ("wall_ns", "queue_wait_ns", "subprocess_wall_ns", "subprocess_cpu_ns", "subprocess_calls")
+
+    def __init__(self):
+        self.wall_ns = 0
+        self.queue_wait_ns = 0
+        self.subprocess_wall_ns = 0
+        self.subprocess_cpu_ns = 0
+        self.subprocess_calls = 0
+
+    def as_dict(self):
+        return {
+            "wall_ms": round(self.wall_ns / 1e6, 3),
+            "queue_wait_ms": round(self.queue_wait_ns / 1e6, 3),
+            "subprocess_wall_ms": round(self.subprocess_wall_ns / 1e6, 3),
+            "subprocess_cpu_ms": round(self.subprocess_cpu_ns / 1e6, 3),
+            "subprocess_calls": self.subprocess_calls,
+        }
+
+
+@contextmanager
+def timed():
+    """Time the enclosed block and attribute subprocesses started in it."""
+    timer = CheckTimer()
+    previous = getattr(_local, "timer", None)
+    _local.timer = timer
+    start = time.perf_counter_ns()
+    try:
+        yield timer
+    finally:
+        timer.wall_ns = time.perf_counter_ns() - start
+        _local.timer = previous
+
+
+def add_queue_wait(seconds):
+    """Charge time spent waiting for admission to the current check."""
+    timer = getattr(_local, "timer", None)
+    if timer is not None:
+        timer.queue_wait_ns += int(seconds * 1e9)
+
+
+@contextmanager
+def within(deadline):
+    """Run the enclosed block under ``deadline`` (a grader.deadline.Deadline, or None)."""
+    previous = getattr(_local, "deadline", None)
+    _local.deadline = deadline
+    try:
+        yield
+    finally:
+        _local.deadline = previous
+
+
+def bound(func):
+    """Wrap func to run, on any thread, under the calling thread's check timer and deadline.
+
+    For work a check hands to its own worker threads, so their subprocesses
+    are still attributed to the check and stopped by its deadline.
+    """
+    timer = getattr(_local, "timer", None)
+    deadline = current_deadline()
+
+    def call(*args, **kwargs):
+        previous = getattr(_local, "timer", None), current_deadline()
+        _local.timer, _local.deadline = timer, deadline
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.timer, _local.deadline = previous
+    return call
+
+
+def current_deadline():
+    return getattr(_local, "deadline", None)
+
+
+def time_left(timeout=None):
+    """``timeout`` capped to what is left of the current deadline (None: no limit).
+
+    Raises subprocess.TimeoutExpired if the deadline has already ended.
+    """
+    deadline = current_deadline()
+    left = deadline.remaining() if deadline is not None else None
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise subprocess.TimeoutExpired("deadline", deadline.seconds or 0)
+    return min(timeout, left) if timeout else left
+
+
+def _read_all(stream, chunks):
+    chunks.append(stream.read())
+
+
+def run(args, timeout=None, env=None, cwd=None):
+    """subprocess.run(args, capture_output=True, text=True) with timing.
+
+    Raises FileNotFoundError if the program is missing and
+    subprocess.TimeoutExpired (after killing the child) on timeout.
+    """
+    timer = getattr(_local, "timer", None)
+    deadline = current_deadline()
+    timeout = time_left(timeout)
+    start = time.perf_counter_ns()
+    if not hasattr(os, "wait4"):
+        result = subprocess.run(args, capture_output=True, text=True, timeout=timeout, env=env, cwd=cwd)
+        if timer is not None:
+            timer.subprocess_calls += 1
+            timer.subprocess_wall_ns += time.perf_counter_ns() - start
+        return result
+
+    # Under a deadline the child leads its own process group, so ending the
+    # deadline also stops whatever the child started
+    grouped = deadline is not None and hasattr(os, "killpg")
+    proc = subprocess.Popen(
+        args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        text=True, env=env, cwd=cwd, start_new_session=grouped,
+    )
+    out, err = [], []
+    readers = [
+        threading.Thread(target=_read_all, args=(proc.stdout, out), daemon=True),
+        threading.Thread(target=_read_all, args=(proc.stderr, err), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+    expired = threading.Event()
+
+    def kill():
+        expired.set()
+        kill_process(proc, grouped)
+
+    killer = threading.Timer(timeout, kill) if timeout else None
+    if killer is not None:
+        killer.start()
+    if deadline is not None:
+        deadline.register(proc, grouped)
+    try:
+        # wait4 reaps the child and returns its own resource usage, which
+        # stays accurate while other checks run subprocesses concurrently.
+        _, status, usage = os.wait4(proc.pid, 0)
+    finally:
+        if killer is not None:
+            killer.cancel()
+        if deadline is not None:
+            deadline.unregister(proc)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    for reader in readers:
+        reader.join()
+    proc.stdout.close()
+    proc.stderr.close()
+
+    if timer is not None:
+        timer.subprocess_calls += 1
+        timer.subprocess_wall_ns += time.perf_counter_ns() - start
+        timer.subprocess_cpu_ns += int((usage.ru_utime + usage.ru_stime) * 1e9)
+
+    stdout, stderr = "".join(out), "".join(err)
+    if expired.is_set() or (deadline is not None and deadline.ended() and proc.returncode < 0):
+        raise subprocess.TimeoutExpired(args, timeout, output=stdout, stderr=stderr)
+    return subprocess.CompletedProcess(args, proc.returncode, stdout, stderr)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(samples)
+    rank = max(1, -(-pct * len(ordered) // 100))
+    return ordered[rank - 1]
+
+
+class Profiler:
+    """cProfile collector that also covers the executor's worker threads."""
+
+    def __init__(self):
+        self.main = cProfile.Profile()
+        self._profiles = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.main.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.main.disable()
+
+    def call(self, func, *args):
+        """Call func, profiling it if it runs off the main thread."""
+        # The main thread is already covered by self.main, and cProfile
+        # allows one active profiler per thread.
+        if threading.current_thread() is threading.main_thread():
+            return func(*args)
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(func, *args)
+        finally:
+            with self._lock:
+                self._profiles.append(profile)
+
+    def stats(self):
+        """Merged pstats.Stats for every profiled thread."""
+        stats = pstats.Stats(self.main)
+        with self._lock:
+            for profile in self._profiles:
+                stats.add(profile)
+        return stats
+
+    def dump(self, path):
+        self.stats().dump_stats(path)
@@ -0,0 +1,243 @@
+"""
+Runner for the per-module ``verify.sh`` scripts.
+
+Each workshop module ships a ``NN-*/verify.sh`` that learners run by hand
+from the module directory (the scripts use ``../app/...`` paths). This
+module discovers them, runs them concurrently (each in its own module
+directory, with its own timeout and captured output) and turns their
+``PASS`` / ``FAIL`` / ``SKIP`` lines into result dicts shaped like the
+grader's CHECKS results.
+
+Several scripts ask Docker the same questions (``docker ps``, ``docker
+images``, ``docker info``). While a pass runs, a ``docker`` shim sits first
+on the scripts' PATH and answers read-only probes from a cache shared by all
+scripts; each distinct probe reaches the real CLI once, and scripts asking
+for it at the same moment wait for that one call. Everything else goes
+straight to the real docker binary.
+"""
+
+import os
+import re
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from grader import timing
+
+try:
+    import fcntl
+except ImportError:  # Windows: scripts run without the probe cache
+    fcntl = None
+
+VERIFY_TIMEOUT = 120
+SCRIPT_NAME = "verify.sh"
+MODULE_DIR_RE = re.compile(r"^(\d{2})-")
+# "  FROM instruction                   PASS", "  todo-db volume exists   FAIL — Run: ..."
+STATUS_RE = re.compile(r"^\s{2}(\S.*?)\s+(PASS|FAIL|SKIP)\b\s*(?:—\s*)?(.*)$")
+CONTINUATION_RE = re.compile(r"^\s{4,}(\S.*)$")
+
+# Read-only docker CLI commands the shim may answer from the cache, matched
+# on their first one or two arguments.
+READ_ONLY_PROBES = {
+    ("--version",), ("version",), ("info",), ("images",), ("ps",), ("inspect",),
+    ("image", "ls"), ("image", "inspect"), ("container", "ls"), ("container", "inspect"),
+    ("volume", "ls"), ("volume", "inspect"), ("network", "ls"), ("network", "inspect"),
+    ("compose", "version"),
+}
+
+
+def discover_scripts(root_dir, module_filter=None):
+    """Return ``[(module number, script path)]`` for every ``NN-*/verify.sh``, in module order."""
+    found = []
+    with os.scandir(root_dir) as entries:
+        for entry in entries:
+            match = MODULE_DIR_RE.match(entry.name)
+            if not match or not entry.is_dir():
+                continue
+            module = int(match.group(1))
+            script = os.path.join(entry.path, SCRIPT_NAME)
+            if (module_filter is None or module == module_filter) and os.path.isfile(script):
+                found.append((module, script))
+    return sorted(found)
+
+
+def _result(name, module, passed, message, timer, skipped=False):
+    result = {
+        "name": name,
+        "module": module,
+        "points": 0,
+        "earned": 0,
+        "passed": passed,
+        "message": message,
+        "cached": False,
+        "timing": timer,
+    }
+    if skipped:
+        result["skipped"] = True
+    return result
+
+
+def parse_output(output, module, timer=None):
+    """Result dicts for the PASS/FAIL/SKIP lines a verify script printed."""
+    results = []
+    for line in output.splitlines():
+        match = STATUS_RE.match(line)
+        if match:
+            label, status, note = match.groups()
+            note = note.strip().strip("()")
+            if status == "PASS":
+                results.append(_result(label, module, True, note or "Passed", timer))
+            elif status == "FAIL":
+                results.append(_result(label, module, False, note or "Failed", timer))
+            else:
+                results.append(_result(label, module, False, f"Skipped: {note}" if note else "Skipped",
+                                       timer, skipped=True))
+            continue
+        match = CONTINUATION_RE.match(line)
+        if match and results and not results[-1]["passed"]:
+            # Indented hint lines under a FAIL or SKIP
+            results[-1]["message"] += f" ({match.group(1)})"
+    return results
+
+
+def run_script(module, script, env=None, timeout=VERIFY_TIMEOUT):
+    """Run one verify script from its module directory; return its result dicts."""
+    name = os.path.join(os.path.basename(os.path.dirname(script)), SCRIPT_NAME)
+    completed = failure = None
+    output = ""
+    with timing.timed() as timer:
+        try:
+            completed = timing.run(["bash", SCRIPT_NAME], timeout=timeout, env=env, cwd=os.path.dirname(script))
+            output = completed.stdout
+        except subprocess.TimeoutExpired as e:
+            failure = f"{name} timed out (>{timeout} seconds)"
+            output = e.output or ""
+        except OSError as e:
+            failure = f"Could not run {name}: {e}"
+    timer = timer.as_dict()
+
+    results = parse_output(output, module, timer)
+    if completed is not None and completed.returncode != 0 and not results:
+        # e.g. "ERROR: ../app/Dockerfile not found" before any check ran
+        lines = [line.strip() for line in (completed.stdout + completed.stderr).splitlines() if line.strip()]
+        failure = " ".join(lines[-2:]) or f"{name} exited {completed.returncode}"
+    if failure is not None:
+        results.append(_result(name, module, False, failure, timer))
+    return results
+
+
+# ─── Docker Probe Cache ────────────────────────────────────────────────────
+
+def cacheable(args):
+    return tuple(args[:1]) in READ_ONLY_PROBES or tuple(args[:2]) in READ_ONLY_PROBES
+
+
+class ProbeCache:
+    """Temporary ``docker`` shim and the probe cache it shares across scripts."""
+
+    def __init__(self):
+        self.real_docker = shutil.which("docker")
+        self.dir = tempfile.mkdtemp(prefix="grader-verify-")
+        self.cache_dir = os.path.join(self.dir, "probes")
+        os.mkdir(self.cache_dir)
+        bin_dir = os.path.join(self.dir, "bin")
+        os.mkdir(bin_dir)
+        shim = os.path.join(bin_dir, "docker")
+        with open(shim, "w", encoding="utf-8") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" -m grader.verify --probe "$@"\n')
+        os.chmod(shim, 0o755)
+
+        package_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        python_path = os.environ.get("PYTHONPATH")
+        self.env = dict(
+            os.environ,
+            PATH=bin_dir + os.pathsep + os.environ.get("PATH", ""),
+            PYTHONPATH=package_parent + (os.pathsep + python_path if python_path else ""),
+            GRADER_PROBE_CACHE=self.cache_dir,
+            GRADER_REAL_DOCKER=self.real_docker or "",
+        )
+
+    def stats(self):
+        """Probes answered by the shim and how many of them reached the real CLI."""
+        try:
+            with open(os.path.join(self.cache_dir, "log"), "r", encoding="utf-8") as f:
+                lines = f.read().split()
+        except FileNotFoundError:
+            lines = []
+        return {"probes": len(lines), "docker_calls": lines.count("miss")}
+
+    def close(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def probe(args):
+    """Shim entry point: answer a docker CLI call, from the shared cache when read-only."""
+    real = os.environ.get("GRADER_REAL_DOCKER")
+    cache_dir = os.environ.get("GRADER_PROBE_CACHE")
+    if not real:
+        sys.stderr.write("docker: command not found\n")
+        return 127
+    if not cache_dir or not cacheable(args):
+        os.execv(real, [real] + args)
+
+    key = hashlib.sha256(json.dumps(args).encode("utf-8")).hexdigest()[:32]
+    path = os.path.join(cache_dir, key)
+    with open(path + ".lock", "w") as lock:
+        # Scripts asking the same question wait for the first one's answer
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(path + ".json", "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            outcome = "hit"
+        except FileNotFoundError:
+            completed = subprocess.run([real] + args, stdin=subprocess.DEVNULL, capture_output=True)
+            # latin-1 round-trips arbitrary bytes through JSON
+            entry = {"returncode": completed.returncode,
+                     "stdout": completed.stdout.decode("latin-1"),
+                     "stderr": completed.stderr.decode("latin-1")}
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(path + ".tmp", path + ".json")
+            outcome = "miss"
+    with open(os.path.join(cache_dir, "log"), "a", encoding="utf-8") as log:
+        log.write(outcome + "\n")
+    sys.stdout.buffer.write(entry["stdout"].encode("latin-1"))
+    sys.stderr.buffer.write(entry["stderr"].encode("latin-1"))
+    return entry["returncode"]
+
+
+# ─── Runner ────────────────────────────────────────────────────────────────
+
+def run_scripts(scripts, jobs, timeout=VERIFY_TIMEOUT, stats=None):
+    """Run verify scripts concurrently; yield each script's results in module order.
+
+    ``stats``, if given, is filled with the probe cache counters once the
+    pass has finished.
+    """
+    cache = ProbeCache() if fcntl is not None and os.name == "posix" else None
+    env = cache.env if cache is not None else None
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            futures = [pool.submit(run_script, module, script, env, timeout) for module, script in scripts]
+            for future in futures:
+                yield from future.result()
+    finally:
+        if cache is not None:
+            if stats is not None:
+                stats.update(cache.stats())
+            cache.close()
+
+
+def main():
+    # Not argparse: everything after --probe is the docker command line
+    if len(sys.argv) > 1 and sys.argv[1] == "--probe":
+        sys.exit(probe(sys.argv[2:]))
+    sys.exit("usage: run.py --verify (this module is the docker shim for verify scripts)")
+
+
+if __name__ == "__main__":
+    main()
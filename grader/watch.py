@@ -0,0 +1,161 @@
+"""
+File watching for ``run.py --watch``.
+
+Watches the workshop artifacts and reports which of them changed, so the
+grader can re-run only the checks that read them. On Linux the watcher uses
+inotify (through ctypes, no extra dependencies) on the artifacts' parent
+directories, which also catches editors that save by writing a new file
+and renaming it into place. Elsewhere, or if inotify is unavailable, it
+falls back to polling file metadata.
+"""
+
+import os
+import sys
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+
+from grader.context import ARTIFACTS
+
+# Artifact -> resources (as named under "needs" in the CHECKS registry) that
+# change when the artifact is edited. Only the files that define the image
+# count as changing the build "context" here, so editing app source such as
+# index.html re-grades its own checks without triggering a docker build.
+WATCHED = {
+    "dockerfile": ("dockerfile", "context"),
+    "dockerignore": ("dockerignore", "context"),
+    "package_json": ("package_json", "context"),
+    "index_html": ("index_html",),
+    "compose": ("compose",),
+    "compose_override": ("compose",),
+}
+
+POLL_INTERVAL = 0.5
+DEBOUNCE = 0.1
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def affected_checks(checks, artifacts):
+    """Registry entries that read any of the changed artifacts."""
+    resources = set()
+    for artifact in artifacts:
+        resources.update(WATCHED.get(artifact, (artifact,)))
+    return [c for c in checks if resources.intersection(c.get("needs", ()))]
+
+
+class PollingWatcher:
+    """Detects changes by comparing file metadata at a fixed interval."""
+
+    def __init__(self, paths, interval=POLL_INTERVAL):
+        self.paths = dict(paths)  # artifact -> absolute path
+        self.interval = interval
+        self._state = {name: self._stat(path) for name, path in self.paths.items()}
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def poll(self):
+        changed = set()
+        for name, path in self.paths.items():
+            state = self._stat(path)
+            if state != self._state[name]:
+                self._state[name] = state
+                changed.add(name)
+        return changed
+
+    def wait(self, timeout=None):
+        """Block until something changes (or timeout); return changed artifact names."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = self.poll()
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Linux inotify watcher on the artifacts' parent directories."""
+
+    def __init__(self, paths):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths = dict(paths)
+        self._by_wd = {}  # watch descriptor -> {filename: artifact}
+        try:
+            for name, path in self.paths.items():
+                directory, filename = os.path.split(path)
+                wd = libc.inotify_add_watch(self._fd, os.fsencode(directory), IN_MASK)
+                if wd < 0:
+                    raise OSError(ctypes.get_errno(), f"cannot watch {directory}")
+                self._by_wd.setdefault(wd, {})[os.fsencode(filename)] = name
+        except OSError:
+            os.close(self._fd)
+            raise
+
+    def _read(self):
+        changed = set()
+        data = os.read(self._fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            filename = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            name = self._by_wd.get(wd, {}).get(filename)
+            if name is not None:
+                changed.add(name)
+        return changed
+
+    def wait(self, timeout=None):
+        """Block until a watched file changes (or timeout); return changed artifact names."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed = set()
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            readable, _, _ = select.select([self._fd], [], [], remaining)
+            if not readable:
+                return changed
+            changed |= self._read()
+            if changed:
+                # Editors often write in several steps; collect them together
+                while select.select([self._fd], [], [], DEBOUNCE)[0]:
+                    changed |= self._read()
+                return changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+def make_watcher(root_dir, artifacts=None):
+    """Return an inotify watcher where possible, otherwise a polling one."""
+    artifacts = artifacts or list(WATCHED)
+    paths = {name: os.path.join(root_dir, ARTIFACTS[name]) for name in artifacts}
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(paths)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(paths)
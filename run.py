@@ -8,6 +8,25 @@ Usage:
     python run.py              # Check all modules and show score
     python run.py --module 4   # Check specific module only
     python run.py --json       # Output results as JSON
+    python run.py --jobs 1     # Run checks one at a time
+    python run.py --batch DIR  # Grade every checkout under DIR (JSON lines)
+    python run.py --no-cache   # Re-run every check, ignoring cached results
+    python run.py --profile    # Show where grading time goes
+    python run.py --watch      # Re-grade affected checks whenever a file changes
+    python run.py --stream     # Write progress events as JSON lines to stdout
+    python run.py --load-test  # Also start the built image and measure the todo API under load
+    python run.py --analyze-image  # Also break down the built image's layers and wasted bytes
+    python run.py --compare-references  # Also build the reference solutions and compare rebuilds after a source change
+    python run.py --ci         # GitHub Actions: write step outputs and the job summary
+    python run.py --verify     # Run every module's verify.sh concurrently
+    python run.py --deadline 60    # Partial score after 60s; unfinished checks are reported as timed out
+    python run.py --stop-at-pass   # Stop grading as soon as the pass mark is certain
+    python run.py submit --queue q.db --batch DIR   # Queue checkouts for grading
+    python run.py worker --queue q.db               # Grade queued checkouts (on any number of nodes)
+    python run.py status --queue q.db [--json]      # Queue counts, or finished reports as JSON lines
+    python run.py serve        # Stay resident and grade over a local HTTP API
+    python run.py --results-store DIR --cohort spring   # Also append each grade to a results store
+    python run.py query --results-store DIR [--cohort spring] [--latest]   # Pass rates, scores, timings
 """
 
 import os
@@ -15,7 +34,28 @@ import sys
 import re
 import json
 import argparse
+import time
+import signal
+import threading
 import subprocess
+import functools
+
+from grader import dockerfile, timing, loadtest, layers, ci, verify, admission, rules, compare
+from grader.build import build_image, image_tag, variant_digest
+from grader.buildcontext import format_size
+from grader.compose import ComposeError
+from grader.deadline import Deadline, PASS_REACHED
+from grader.batch import discover_submissions, run_batch, DEFAULT_WORKERS
+from grader.cache import ResultCache, CACHE_DIRNAME
+from grader.context import GradeContext, ArtifactStore, ARTIFACTS
+from grader.files import FileRejected
+from grader.docker_api import DockerInventory, DockerUnavailable, daemon_reachable
+from grader.events import EventStream
+from grader.executor import CheckExecutor, DEFAULT_JOBS, RESOURCE_LIMITS
+from grader.store import ResultStore, load as load_results, aggregate as aggregate_results, format_summary as format_results
+from grader.jobqueue import open_queue, run_workers as run_jobs, DEFAULT_LEASE_SECONDS, DEFAULT_MAX_ATTEMPTS
+from grader.watch import make_watcher, affected_checks
+from grader.server import GradeService, make_server, address, DEFAULT_PORT, DEFAULT_QUEUE_SIZE
 
 # ─── Windows Color Support ─────────────────────────────────────────────────
 
@@ -41,288 +81,216 @@ def colored(text, color):
     return f"{color}{text}{Colors.END}"
 
 
-# ─── File Helpers ──────────────────────────────────────────────────────────
+# ─── Paths ─────────────────────────────────────────────────────────────────
 
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
-APP_DIR = os.path.join(ROOT_DIR, "app")
-
-
-def read_file(path):
-    """Read a file and return its contents, or empty string if not found."""
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read()
-    except (FileNotFoundError, PermissionError):
-        return ""
-
-
-def file_exists(path):
-    """Check if a file exists."""
-    return os.path.isfile(path)
+DEFAULT_CACHE_DIR = os.path.join(ROOT_DIR, CACHE_DIRNAME)
+MAX_CONTEXT_BYTES = 10 * 1024 * 1024
+# Bytes an image may ship in overwritten files and dev dependencies
+MAX_WASTED_BYTES = 1024 * 1024
+REFERENCE_DOCKERFILE = os.path.join("11-image-building-best-practices", "solutions", "Dockerfile.multistage")
 
 
 # ─── Check Functions ───────────────────────────────────────────────────────
-# Each returns (passed: bool, message: str)
-
-
-def check_dockerfile_exists():
-    """Module 04: Dockerfile exists in app/ directory"""
-    path = os.path.join(APP_DIR, "Dockerfile")
-    if file_exists(path):
-        content = read_file(path)
-        # Check it's not just the starter template
-        if "# TODO:" in content and content.count("FROM") <= 1 and "COPY" not in content.split("# TODO")[0].split("FROM")[-1]:
-            return False, "Dockerfile exists but appears to be the starter template. Complete the TODO items."
-        return True, "Dockerfile found in app/"
-    return False, "No Dockerfile found in app/ directory"
-
-
-def check_dockerfile_from_node():
-    """Module 04: Dockerfile uses node base image"""
-    content = read_file(os.path.join(APP_DIR, "Dockerfile"))
-    if re.search(r"FROM\s+node:", content, re.IGNORECASE):
-        return True, "Dockerfile uses node base image"
-    return False, "Dockerfile should use a node base image (e.g., FROM node:18-alpine)"
-
-
-def check_dockerfile_workdir():
-    """Module 04: Dockerfile sets WORKDIR"""
-    content = read_file(os.path.join(APP_DIR, "Dockerfile"))
-    if re.search(r"WORKDIR\s+/app", content, re.IGNORECASE):
-        return True, "WORKDIR set to /app"
-    return False, "Dockerfile should set WORKDIR to /app"
-
-
-def check_dockerfile_copy_package_first():
-    """Module 04: Dockerfile copies package.json before source"""
-    content = read_file(os.path.join(APP_DIR, "Dockerfile"))
-    lines = [l.strip() for l in content.split("\n") if l.strip() and not l.strip().startswith("#")]
-
-    copy_indices = []
-    for i, line in enumerate(lines):
-        if line.upper().startswith("COPY"):
-            copy_indices.append((i, line))
-
-    if len(copy_indices) >= 2:
-        first_copy = copy_indices[0][1].lower()
-        if "package" in first_copy:
-            return True, "package.json is copied before source code (good for layer caching)"
-
-    if len(copy_indices) == 1:
-        return False, "Use two COPY instructions: copy package.json first, then the rest"
-
-    return False, "Dockerfile should COPY package.json before COPY . ."
+# Each takes the GradeContext for the submission and returns
+# (passed: bool, message: str), optionally followed by a dict of details
+# that is included in the JSON output.
 
 
-def check_dockerfile_run_install():
-    """Module 04: Dockerfile runs npm/yarn install"""
-    content = read_file(os.path.join(APP_DIR, "Dockerfile"))
-    if re.search(r"RUN\s+(npm|yarn)\s+install", content, re.IGNORECASE):
-        return True, "Dependencies are installed with npm/yarn install"
-    return False, "Dockerfile should RUN npm install (or yarn install)"
-
-
-def check_dockerfile_copy_source():
-    """Module 04: Dockerfile copies source code"""
-    content = read_file(os.path.join(APP_DIR, "Dockerfile"))
-    lines = [l.strip() for l in content.split("\n") if l.strip() and not l.strip().startswith("#")]
-
-    copy_count = sum(1 for l in lines if l.upper().startswith("COPY"))
-    if copy_count >= 2:
-        return True, "Source code is copied into the image"
-
-    if copy_count == 1 and re.search(r"COPY\s+\.\s+\.", content):
-        return True, "Source code is copied (single COPY . .)"
-
-    return False, "Dockerfile should COPY source code into the image"
-
-
-def check_dockerfile_expose():
-    """Module 04: Dockerfile exposes port"""
-    content = read_file(os.path.join(APP_DIR, "Dockerfile"))
-    if re.search(r"EXPOSE\s+3000", content, re.IGNORECASE):
-        return True, "Port 3000 is exposed"
-    return False, "Dockerfile should EXPOSE 3000"
-
-
-def check_dockerfile_cmd():
-    """Module 04: Dockerfile has CMD instruction"""
-    content = read_file(os.path.join(APP_DIR, "Dockerfile"))
-    if re.search(r"CMD\s+", content, re.IGNORECASE):
-        return True, "CMD instruction is defined"
-    return False, "Dockerfile should have a CMD instruction to start the app"
-
-
-def check_image_builds():
+def check_image_builds(ctx):
     """Module 04: Docker image builds successfully"""
     try:
-        result = subprocess.run(
-            ["docker", "build", "-t", "todo-app-test", os.path.join(APP_DIR)],
-            capture_output=True, text=True, timeout=120
-        )
-        if result.returncode == 0:
-            # Clean up test image
-            subprocess.run(["docker", "rmi", "todo-app-test"], capture_output=True, timeout=30)
-            return True, "Docker image builds successfully"
-        return False, f"Docker build failed: {result.stderr[:200]}"
+        existing = ctx.docker.image_tags()
+    except DockerUnavailable:
+        existing = ()
+    try:
+        build = build_image(ctx.app_dir, ctx.digest("context"), existing,
+                            cache_dir=ctx.options.get("build_cache"), lease=ctx.lease_image)
+        if build.ok:
+            return True, "Docker image builds successfully", build.details()
+        return False, f"Docker build failed: {build.log.strip()[-200:]}", build.details()
     except FileNotFoundError:
         return False, "Docker is not installed or not in PATH"
-    except subprocess.TimeoutExpired:
-        return False, "Docker build timed out (>120 seconds)"
+    except subprocess.TimeoutExpired as e:
+        return False, f"Docker build timed out (>{e.timeout:g} seconds)"
     except Exception as e:
         return False, f"Could not test Docker build: {str(e)}"
 
 
-def check_source_modified():
-    """Module 05: Source code has been modified from the original"""
-    content = read_file(os.path.join(APP_DIR, "src", "static", "index.html"))
-    original_text = "No todos yet! Add one above to get started."
-    if content and original_text not in content:
-        return True, "Source code has been modified from the original"
-    if not content:
-        return False, "Could not read app/src/static/index.html"
-    return False, "Modify the empty state text in app/src/static/index.html (Module 05)"
+def check_runtime_load(ctx):
+    """Module 04: Built image serves the todo API under load"""
+    try:
+        report = loadtest.load_test_image(
+            image_tag(ctx.digest("context")),
+            concurrency=ctx.options.get("load_concurrency") or loadtest.DEFAULT_CONCURRENCY,
+            duration=ctx.options.get("load_duration") or loadtest.DEFAULT_DURATION,
+        )
+    except loadtest.LoadTestError as e:
+        return False, f"Could not load-test the image: {e}"
 
+    latency = report["latency_ms"]
+    summary = (f"{report['rps']} req/s, p50 {latency.get('p50')} ms, "
+               f"p95 {latency.get('p95')} ms, p99 {latency.get('p99')} ms")
+    problems = loadtest.evaluate(report, ctx.options.get("load_min_rps"), ctx.options.get("load_max_p95_ms"))
+    if problems:
+        return False, f"Load test failed: {'; '.join(problems)} ({summary})", report
+    return True, f"Served {report['requests']} requests: {summary}", report
 
-def check_update_text_changed():
-    """Module 05: Empty state text has been updated"""
-    content = read_file(os.path.join(APP_DIR, "src", "static", "index.html"))
-    if not content:
-        return False, "Could not read app/src/static/index.html"
 
-    # Check that the empty-state element exists but with different text
-    if 'id="empty-state"' in content:
-        original = "No todos yet! Add one above to get started."
-        if original not in content:
-            return True, "Empty state text has been updated"
-        return False, "Change the text inside the empty-state paragraph"
+def check_reference_builds(ctx):
+    """Module 04: Source-only changes rebuild as well as with the reference solutions"""
+    try:
+        report = compare.compare_builds(ctx.app_dir, compare.variants(ctx.root_dir), ctx.docker,
+                                        cache_dir=ctx.options.get("build_cache"),
+                                        dockerignore_text=ctx.text("dockerignore"), lease=ctx.lease_image)
+    except FileNotFoundError:
+        return False, "Docker is not installed or not in PATH"
 
-    return False, "The empty-state element should still exist in index.html"
+    student, references = report["variants"][0], report["variants"][1:]
+    if student["error"]:
+        return False, f"Could not compare with the reference solutions: {student['error']}", report
+    if student["cache_hit_ratio"] is None:
+        return True, "Built, but the rebuild after a source-only change could not be measured", report
+    summary = (f"After a change to {report['changed_file']} the rebuild took {student['rebuild_seconds']:.1f}s "
+               f"with {student['cache_hit_ratio']:.0%} of steps cached")
+    measured = [r for r in references if not r["error"] and r["cache_hit_ratio"] is not None]
+    if not measured:
+        return True, summary, report
+    # Dockerfiles differ in step count, so the share of cached steps is
+    # only compared as a fallback; what the advice is about is whether the
+    # dependency install survives a source-only change
+    reference = max(measured, key=lambda r: r["cache_hit_ratio"])
+    summary += f" (the {reference['name']}: {reference['rebuild_seconds']:.1f}s, {reference['cache_hit_ratio']:.0%})"
+    delta = report["versus"][reference["name"]]
+    if delta["size"] is not None:
+        summary += (f"; image {format_size(student['size'])} in {student['layer_count']} layers, "
+                    f"{'+' if delta['size'] >= 0 else '-'}{format_size(abs(delta['size']))} "
+                    f"and {delta['layer_count']:+g} layers versus the reference")
+    if student["install_cached"] is None:
+        worse = all(student["cache_hit_ratio"] < r["cache_hit_ratio"] for r in measured)
+    else:
+        worse = not student["install_cached"] and any(r["install_cached"] for r in measured)
+    if worse:
+        return False, (f"{summary}. Copy package.json and install dependencies before copying the source, "
+                       "so source changes reuse the install layer"), report
+    return True, summary, report
+
+
+def image_still_built(ctx, outcome):
+    """Serve a cached build pass only while its image exists, leasing it for this grade."""
+    image = outcome[2].get("image")
+    if not image:
+        return False
+    ctx.lease_image(image)
+    try:
+        return image in ctx.docker.image_tags()
+    except DockerUnavailable:
+        return False
 
 
-def check_image_tagged():
+def check_image_tagged(ctx):
     """Module 06: Image has been tagged with username/repo format"""
     try:
-        result = subprocess.run(
-            ["docker", "images", "--format", "{{.Repository}}:{{.Tag}}"],
-            capture_output=True, text=True, timeout=30
-        )
-        for line in result.stdout.strip().split("\n"):
-            if "/" in line and "todo" in line.lower():
-                return True, f"Image tagged correctly: {line}"
+        for tag in ctx.docker.image_tags():
+            if "/" in tag and "todo" in tag.lower():
+                return True, f"Image tagged correctly: {tag}"
         return False, "No image found with username/repository format containing 'todo'"
-    except Exception:
+    except DockerUnavailable:
         return False, "Could not check Docker images (is Docker running?)"
 
 
-def check_tag_format():
+def check_tag_format(ctx):
     """Module 06: Image tag follows proper naming convention"""
     try:
-        result = subprocess.run(
-            ["docker", "images", "--format", "{{.Repository}}:{{.Tag}}"],
-            capture_output=True, text=True, timeout=30
-        )
-        for line in result.stdout.strip().split("\n"):
-            if re.match(r"^[\w\-]+/[\w\-]+:\w+", line):
-                if "todo" in line.lower():
-                    return True, f"Tag format is valid: {line}"
+        for tag in ctx.docker.image_tags():
+            if re.match(r"^[\w\-]+/[\w\-]+:\w+", tag):
+                if "todo" in tag.lower():
+                    return True, f"Tag format is valid: {tag}"
         return False, "Tag should follow format: username/repository:tag"
-    except Exception:
+    except DockerUnavailable:
         return False, "Could not check Docker images"
 
 
-def check_volume_config():
+def check_volume_config(ctx):
     """Module 07: Volume configuration is present"""
     # Check docker-compose.yml for volume config
-    compose = read_file(os.path.join(ROOT_DIR, "docker-compose.yml"))
-    dockerfile = read_file(os.path.join(APP_DIR, "Dockerfile"))
-
-    if "todo-db" in compose or "todo-mysql-data" in compose:
-        if "volumes:" in compose:
+    try:
+        named_volumes = ctx.compose_model.named_volumes
+        if "todo-db" in named_volumes or "todo-mysql-data" in named_volumes:
             return True, "Volume configuration found in docker-compose.yml"
+    except ComposeError:
+        pass
 
     # Also accept if they've been running docker commands with volumes
     try:
-        result = subprocess.run(
-            ["docker", "volume", "ls", "--format", "{{.Name}}"],
-            capture_output=True, text=True, timeout=30
-        )
-        if "todo" in result.stdout.lower():
+        if any("todo" in v.lower() for v in ctx.docker.volume_names()):
             return True, "Docker volume found for todo app"
-    except Exception:
+    except DockerUnavailable:
         pass
 
     return False, "Configure a named volume for data persistence (Module 07)"
 
 
-def check_volume_mount_path():
+def check_volume_mount_path(ctx):
     """Module 07: Volume mount path is correct"""
-    compose = read_file(os.path.join(ROOT_DIR, "docker-compose.yml"))
-
     # Check for proper mount paths
-    if "/var/lib/mysql" in compose or "/app/data" in compose:
-        return True, "Volume mount path is correctly configured"
+    try:
+        model = ctx.compose_model
+        if model.mounts_under("/var/lib/mysql") or model.mounts_under("/app/data"):
+            return True, "Volume mount path is correctly configured"
+    except ComposeError:
+        pass
 
     # Check if a todo-related volume exists
     try:
-        result = subprocess.run(
-            ["docker", "volume", "ls", "--format", "{{.Name}}"],
-            capture_output=True, text=True, timeout=30
-        )
-        volumes = result.stdout.strip().split("\n")
-        todo_volumes = [v for v in volumes if "todo" in v.lower()]
+        todo_volumes = [v for v in ctx.docker.volume_names() if "todo" in v.lower()]
         if todo_volumes:
             return True, f"Volume(s) found: {', '.join(todo_volumes)}"
-    except Exception:
+    except DockerUnavailable:
         pass
 
     return False, "Mount path should point to the database data directory"
 
 
-def check_bind_mount_config():
+def check_bind_mount_config(ctx):
     """Module 08: Bind mount configuration understood"""
     # This checks if the user has a proper development setup understanding
-    compose = read_file(os.path.join(ROOT_DIR, "docker-compose.yml"))
+    try:
+        model = ctx.compose_model
+    except ComposeError:
+        model = None
 
-    # Check for bind mount syntax in compose or evidence of usage
-    if "./" in compose and ":/app" in compose:
+    # Check for a bind mount of the source into the app container
+    if model is not None and any(m.type == "bind" for _, m in model.mounts_under("/app")):
         return True, "Bind mount configuration found"
 
     # Check app/Dockerfile for development-related instructions
-    dockerfile = read_file(os.path.join(APP_DIR, "Dockerfile"))
-    if "nodemon" in dockerfile.lower() or "dev" in dockerfile.lower():
-        return True, "Development configuration found"
+    for instruction in ctx.dockerfile:
+        arguments = instruction.arguments.lower()
+        if "nodemon" in arguments or "dev" in arguments:
+            return True, "Development configuration found"
 
     # Give credit if they have a proper compose file with build context
-    if "build:" in compose and "./app" in compose:
+    if model is not None and any(s.build_context and os.path.normpath(s.build_context) == "app"
+                                 for s in model.services.values()):
         return True, "Build context configured (implies understanding of bind mounts)"
 
     return False, "Set up a bind mount for development workflow (Module 08)"
 
 
-def check_bind_mount_dev():
-    """Module 08: Development workflow configured"""
-    # Check package.json for dev script
-    pkg = read_file(os.path.join(APP_DIR, "package.json"))
-    if '"dev"' in pkg and "nodemon" in pkg:
-        return True, "Development script with nodemon is configured"
-    return False, "package.json should have a 'dev' script using nodemon"
-
-
-def check_mysql_host_env():
+def check_mysql_host_env(ctx):
     """Module 09: MYSQL_HOST environment variable configured"""
-    compose = read_file(os.path.join(ROOT_DIR, "docker-compose.yml"))
-    if "MYSQL_HOST" in compose:
+    if ctx.compose_model.services_with_env("MYSQL_HOST"):
         return True, "MYSQL_HOST environment variable is set"
     return False, "Set MYSQL_HOST environment variable in docker-compose.yml"
 
 
-def check_mysql_credentials():
+def check_mysql_credentials(ctx):
     """Module 09: MySQL credentials configured"""
-    compose = read_file(os.path.join(ROOT_DIR, "docker-compose.yml"))
-    has_user = "MYSQL_USER" in compose
-    has_password = "MYSQL_PASSWORD" in compose or "MYSQL_ROOT_PASSWORD" in compose
-    has_db = "MYSQL_DB" in compose or "MYSQL_DATABASE" in compose
+    env = ctx.compose_model.env_index
+    has_user = "MYSQL_USER" in env
+    has_password = "MYSQL_PASSWORD" in env or "MYSQL_ROOT_PASSWORD" in env
+    has_db = "MYSQL_DB" in env or "MYSQL_DATABASE" in env
 
     if has_user and has_password and has_db:
         return True, "MySQL credentials are configured"
@@ -338,156 +306,194 @@ def check_mysql_credentials():
     return False, f"Missing MySQL env vars: {', '.join(missing)}"
 
 
-def check_multi_container_network():
+def check_multi_container_network(ctx):
     """Module 09: Multi-container networking configured"""
-    compose = read_file(os.path.join(ROOT_DIR, "docker-compose.yml"))
-
-    # In Compose, services on the same file share a default network
-    has_app = re.search(r"^\s+app:", compose, re.MULTILINE)
-    has_mysql = re.search(r"^\s+mysql:", compose, re.MULTILINE)
-
-    if has_app and has_mysql:
+    model = ctx.compose_model
+    app = model.service("app", "web")
+    mysql = model.service("mysql")
+
+    if app and mysql:
+        # In Compose, services in the same file share a default network
+        # unless they are put on separate ones
+        if not set(app.networks) & set(mysql.networks):
+            return False, f"Put '{app.name}' and 'mysql' on a common network"
         return True, "Multi-container setup with app and mysql services"
 
-    if has_app:
+    if app:
         return False, "Add a 'mysql' service to docker-compose.yml"
 
     return False, "Configure both app and mysql services in docker-compose.yml"
 
 
-def check_compose_file_exists():
+def check_compose_file_exists(ctx):
     """Module 10: docker-compose.yml exists and has content"""
-    path = os.path.join(ROOT_DIR, "docker-compose.yml")
-    if file_exists(path):
-        content = read_file(path)
-        if "services:" in content and "# TODO:" not in content.split("services:")[1][:100]:
+    if ctx.exists("compose"):
+        model = ctx.compose_model
+        if model.services:
             return True, "docker-compose.yml found with service definitions"
-        if "services:" in content:
+        if model.has_services_key:
             return True, "docker-compose.yml found (may still have TODOs to complete)"
         return False, "docker-compose.yml exists but doesn't define any services"
     return False, "No docker-compose.yml found in project root"
 
 
-def check_compose_app_service():
+def check_compose_app_service(ctx):
     """Module 10: App service defined in docker-compose.yml"""
-    compose = read_file(os.path.join(ROOT_DIR, "docker-compose.yml"))
-
-    has_app = re.search(r"^\s+(app|web):", compose, re.MULTILINE)
-    has_build = "build:" in compose
+    app = ctx.compose_model.service("web", "app")
 
-    if has_app and has_build:
+    if app and app.build:
         return True, "App service with build configuration defined"
-    if has_app:
+    if app:
         return False, "App service exists but needs 'build:' directive"
     return False, "Define a 'web' (or 'app') service in docker-compose.yml"
 
 
-def check_compose_mysql_service():
+def check_compose_mysql_service(ctx):
     """Module 10: MySQL service defined in docker-compose.yml"""
-    compose = read_file(os.path.join(ROOT_DIR, "docker-compose.yml"))
+    mysql = ctx.compose_model.service("mysql")
 
-    has_mysql = re.search(r"^\s+mysql:", compose, re.MULTILINE)
-    has_image = "mysql:8" in compose or "mysql:latest" in compose
-
-    if has_mysql and has_image:
+    if mysql and str(mysql.image or "").startswith(("mysql:8", "mysql:latest")):
         return True, "MySQL service with image defined"
-    if has_mysql:
+    if mysql:
         return True, "MySQL service defined"
     return False, "Define a 'mysql' service using the mysql:8.0 image"
 
 
-def check_compose_volumes():
+def check_compose_volumes(ctx):
     """Module 10: Named volume defined in docker-compose.yml"""
-    compose = read_file(os.path.join(ROOT_DIR, "docker-compose.yml"))
-
     # Check for top-level volumes section
-    lines = compose.split("\n")
-    for i, line in enumerate(lines):
-        if line.startswith("volumes:") and not line.startswith("  "):
-            return True, "Named volumes defined at top level"
+    if ctx.compose_model.volumes:
+        return True, "Named volumes defined at top level"
 
     return False, "Define named volumes at the top level of docker-compose.yml"
 
 
-def check_compose_ports():
+def check_compose_ports(ctx):
     """Module 10: Port mapping defined for app service"""
-    compose = read_file(os.path.join(ROOT_DIR, "docker-compose.yml"))
+    model = ctx.compose_model
+    publishers = model.services_publishing("3000:3000")
+    app = model.service("web", "app")
 
-    if re.search(r"ports:\s*\n\s+-\s*[\"']?3000:3000", compose):
+    if app and app.name in publishers:
         return True, "Port 3000:3000 mapped for app service"
-    if "3000:3000" in compose:
+    if publishers:
         return True, "Port 3000 mapping found"
     return False, "Map port 3000:3000 in the app service"
 
 
-def check_multistage_dockerfile():
-    """Module 11: Multi-stage Dockerfile"""
-    content = read_file(os.path.join(APP_DIR, "Dockerfile"))
-    from_count = len(re.findall(r"^FROM\s+", content, re.MULTILINE | re.IGNORECASE))
+def check_build_context_size(ctx):
+    """Module 11: Build context stays small"""
+    context = ctx.build_context
+    limit = ctx.options.get("max_context_bytes") or MAX_CONTEXT_BYTES
+    size = format_size(context.total_bytes)
+    if context.total_bytes <= limit:
+        return True, f"Build context is {size} across {context.files} files", context.details()
+    heaviest = ", ".join(f"{path} ({format_size(n)})" for path, n in context.heaviest_entries(3))
+    return False, (f"Build context is {size} (limit {format_size(limit)}); largest: {heaviest}. "
+                   "Exclude them in app/.dockerignore"), context.details()
 
-    if from_count >= 2:
-        return True, f"Multi-stage build detected ({from_count} stages)"
-    return False, "Use multiple FROM statements for a multi-stage build (Module 11)"
 
-
-def check_dockerignore():
-    """Module 11: .dockerignore file exists"""
-    path = os.path.join(APP_DIR, ".dockerignore")
-    if file_exists(path):
-        content = read_file(path)
-        if "node_modules" in content:
-            return True, ".dockerignore found with node_modules excluded"
-        return True, ".dockerignore found"
-    return False, "Create app/.dockerignore to exclude unnecessary files from build context"
+def check_image_layers(ctx):
+    """Module 11: Image layers carry no wasted bytes"""
+    dev_packages = layers.dev_packages_from(ctx.text("package_json"))
+    try:
+        report = layers.analyze_image(image_tag(ctx.digest("context")), ctx.dockerfile, dev_packages)
+    except layers.LayerAnalysisError as e:
+        return False, f"Could not analyze the image: {e}"
+
+    summary = (f"Image is {format_size(report['size'])} ({format_size(report['compressed'])} compressed) "
+               f"in {report['layer_count']} layers")
+    reference = reference_image_report(ctx, dev_packages)
+    if reference is not None:
+        report["reference"] = {key: reference[key] for key in ("size", "compressed", "layer_count", "wasted")}
+        report["versus_reference"] = layers.compare(report, reference)
+        delta = report["versus_reference"]["size"]
+        summary += f", {'+' if delta >= 0 else '-'}{format_size(abs(delta))} versus the reference solution"
+
+    wasted = report["wasted"]
+    if wasted["total"] > MAX_WASTED_BYTES:
+        worst = max(report["layers"], key=lambda layer: layer["wasted"])
+        return False, (f"{summary}; {format_size(wasted['total'])} wasted "
+                       f"({format_size(wasted['dev_dependencies'])} dev dependencies), "
+                       f"most in {worst['instruction'] or worst['digest']}"), report
+    return True, summary, report
+
+
+def reference_image_report(ctx, dev_packages):
+    """Layer report for the app built with the Module 11 reference Dockerfile, or None."""
+    path = os.path.join(ctx.root_dir, REFERENCE_DOCKERFILE)
+    if not os.path.isfile(path):
+        return None
+    try:
+        existing = ctx.docker.image_tags()
+    except DockerUnavailable:
+        existing = ()
+    try:
+        build = build_image(ctx.app_dir, variant_digest(ctx.digest("context"), path), existing,
+                            cache_dir=ctx.options.get("build_cache"), dockerfile=path, lease=ctx.lease_image)
+        if not build.ok:
+            return None
+        return layers.analyze_image(build.image, dockerfile.parse_file(path), dev_packages)
+    except (OSError, subprocess.TimeoutExpired, layers.LayerAnalysisError):
+        return None
 
 
 # ─── Checks Registry ──────────────────────────────────────────────────────
 
+# "needs" lists the resources a check touches: artifact files ("dockerfile",
+# "compose", ...), the app/ build context ("context") and shared external
+# resources ("docker", "build"). The
+# executor uses them to decide which checks may run side by side.
+# "provides" marks resources that other checks must wait for.
+# "optional" names the grading option that must be set for the check to run
+# at all (e.g. --load-test). "offline" checks can still pass from their files
+# alone, so they run (and cannot see the daemon) when Docker is turned off.
+# The result cache keys each check on the content of its file needs and on
+# the grading options listed under "options"; see grader/cache.py for the
+# "cache" policy key. "revalidate" is called with a cached outcome before it
+# is served; returning False runs the check again.
+# Checks that only read an artifact's text or Dockerfile instructions are
+# declared in rules.json and merged in below (see grader/rules.py).
+
 CHECKS = [
-    # Module 04: Containerize an Application (25 pts)
-    {"name": "Dockerfile exists", "func": check_dockerfile_exists, "points": 5, "module": 4},
-    {"name": "FROM node base image", "func": check_dockerfile_from_node, "points": 3, "module": 4},
-    {"name": "WORKDIR set to /app", "func": check_dockerfile_workdir, "points": 2, "module": 4},
-    {"name": "COPY package.json first", "func": check_dockerfile_copy_package_first, "points": 3, "module": 4},
-    {"name": "RUN npm/yarn install", "func": check_dockerfile_run_install, "points": 3, "module": 4},
-    {"name": "COPY source code", "func": check_dockerfile_copy_source, "points": 2, "module": 4},
-    {"name": "EXPOSE 3000", "func": check_dockerfile_expose, "points": 2, "module": 4},
-    {"name": "CMD defined", "func": check_dockerfile_cmd, "points": 3, "module": 4},
-    {"name": "Image builds successfully", "func": check_image_builds, "points": 2, "module": 4},
-
-    # Module 05: Update the Application (10 pts)
-    {"name": "Source code modified", "func": check_source_modified, "points": 5, "module": 5},
-    {"name": "Empty state text changed", "func": check_update_text_changed, "points": 5, "module": 5},
+    # Module 04: Containerize an Application (25 pts, 23 from rules.json)
+    {"name": "Image builds successfully", "func": check_image_builds, "points": 2, "module": 4, "needs": ("build", "context", "docker"), "provides": ("image",), "cache": "pass", "revalidate": image_still_built},
+    {"name": "Serves todo API under load", "func": check_runtime_load, "points": 0, "module": 4, "needs": ("docker", "image"), "optional": "load_test"},
+    {"name": "Rebuilds like the reference", "func": check_reference_builds, "points": 0, "module": 4, "needs": ("build", "context", "docker", "dockerfile", "image"), "optional": "compare_references"},
+
+    # Module 05: Update the Application (10 pts, all from rules.json)
 
     # Module 06: Share the Application (10 pts)
-    {"name": "Image tagged correctly", "func": check_image_tagged, "points": 5, "module": 6},
-    {"name": "Tag format valid", "func": check_tag_format, "points": 5, "module": 6},
+    {"name": "Image tagged correctly", "func": check_image_tagged, "points": 5, "module": 6, "needs": ("docker",)},
+    {"name": "Tag format valid", "func": check_tag_format, "points": 5, "module": 6, "needs": ("docker",)},
 
     # Module 07: Persist the DB (10 pts)
-    {"name": "Volume config present", "func": check_volume_config, "points": 5, "module": 7},
-    {"name": "Volume mount path correct", "func": check_volume_mount_path, "points": 5, "module": 7},
+    {"name": "Volume config present", "func": check_volume_config, "points": 5, "module": 7, "needs": ("compose", "docker"), "offline": True},
+    {"name": "Volume mount path correct", "func": check_volume_mount_path, "points": 5, "module": 7, "needs": ("compose", "docker"), "offline": True},
 
-    # Module 08: Use Bind Mounts (10 pts)
-    {"name": "Bind mount configured", "func": check_bind_mount_config, "points": 5, "module": 8},
-    {"name": "Dev workflow configured", "func": check_bind_mount_dev, "points": 5, "module": 8},
+    # Module 08: Use Bind Mounts (10 pts, 5 from rules.json)
+    {"name": "Bind mount configured", "func": check_bind_mount_config, "points": 5, "module": 8, "needs": ("compose", "dockerfile")},
 
     # Module 09: Multi-Container Apps (15 pts)
-    {"name": "MYSQL_HOST env var", "func": check_mysql_host_env, "points": 5, "module": 9},
-    {"name": "MySQL credentials", "func": check_mysql_credentials, "points": 5, "module": 9},
-    {"name": "Multi-container network", "func": check_multi_container_network, "points": 5, "module": 9},
+    {"name": "MYSQL_HOST env var", "func": check_mysql_host_env, "points": 5, "module": 9, "needs": ("compose",)},
+    {"name": "MySQL credentials", "func": check_mysql_credentials, "points": 5, "module": 9, "needs": ("compose",)},
+    {"name": "Multi-container network", "func": check_multi_container_network, "points": 5, "module": 9, "needs": ("compose",)},
 
     # Module 10: Use Docker Compose (15 pts)
-    {"name": "Compose file exists", "func": check_compose_file_exists, "points": 3, "module": 10},
-    {"name": "App service defined", "func": check_compose_app_service, "points": 3, "module": 10},
-    {"name": "MySQL service defined", "func": check_compose_mysql_service, "points": 3, "module": 10},
-    {"name": "Volumes defined", "func": check_compose_volumes, "points": 3, "module": 10},
-    {"name": "Ports mapped", "func": check_compose_ports, "points": 3, "module": 10},
-
-    # Module 11: Image-Building Best Practices (5 pts)
-    {"name": "Multi-stage Dockerfile", "func": check_multistage_dockerfile, "points": 3, "module": 11},
-    {"name": ".dockerignore exists", "func": check_dockerignore, "points": 2, "module": 11},
+    {"name": "Compose file exists", "func": check_compose_file_exists, "points": 3, "module": 10, "needs": ("compose",)},
+    {"name": "App service defined", "func": check_compose_app_service, "points": 3, "module": 10, "needs": ("compose",)},
+    {"name": "MySQL service defined", "func": check_compose_mysql_service, "points": 3, "module": 10, "needs": ("compose",)},
+    {"name": "Volumes defined", "func": check_compose_volumes, "points": 3, "module": 10, "needs": ("compose",)},
+    {"name": "Ports mapped", "func": check_compose_ports, "points": 3, "module": 10, "needs": ("compose",)},
+
+    # Module 11: Image-Building Best Practices (5 pts, 4 from rules.json)
+    {"name": "Build context size", "func": check_build_context_size, "points": 1, "module": 11, "needs": ("context",), "options": ("max_context_bytes",)},
+    {"name": "Image layers carry no waste", "func": check_image_layers, "points": 0, "module": 11, "needs": ("build", "context", "docker", "dockerfile", "image", "package_json"), "optional": "analyze_image"},
 ]
 
+RULES = rules.load(os.path.join(ROOT_DIR, rules.RULES_FILENAME))
+CHECKS = rules.merge(CHECKS, RULES.checks)
+
 
 # ─── Display Helpers ───────────────────────────────────────────────────────
 
@@ -515,41 +521,330 @@ def print_progress_bar(earned, total):
     print()
 
 
+def print_profile(results, elapsed_ns):
+    """Print checks sorted by wall time, slowest first."""
+    print(colored("  Check timings (slowest first)", Colors.BOLD))
+    print(colored(f"  {'─' * 84}", Colors.DIM))
+    print(colored(f"  {'Check':<32} {'wall ms':>10} {'queued ms':>10} {'subproc ms':>11} {'subproc cpu':>12}  {'calls':>5}",
+                  Colors.DIM))
+    for result in sorted(results, key=lambda r: r["timing"]["wall_ms"], reverse=True):
+        t = result["timing"]
+        name = result["name"] + (" (cached)" if result["cached"] else "")
+        print(f"  {name:<32.32} {t['wall_ms']:>10.1f} {t.get('queue_wait_ms', 0):>10.1f} "
+              f"{t['subprocess_wall_ms']:>11.1f} {t['subprocess_cpu_ms']:>12.1f}  {t['subprocess_calls']:>5}")
+    print(colored(f"  {'─' * 84}", Colors.DIM))
+    busy = sum(r["timing"]["wall_ms"] for r in results)
+    queued = sum(r["timing"].get("queue_wait_ms", 0) for r in results)
+    print(f"  {'Total (wall clock)':<32} {elapsed_ns / 1e6:>10.1f}   sum of checks: {busy:.1f} ms, "
+          f"{queued:.1f} ms of it waiting for host Docker slots")
+    print()
+
+
+MODULE_NAMES = {
+    0: "Get Docker",
+    4: "Containerize an Application",
+    5: "Update the Application",
+    6: "Share the Application",
+    7: "Persist the DB",
+    8: "Use Bind Mounts",
+    9: "Multi-Container Apps",
+    10: "Use Docker Compose",
+    11: "Image-Building Best Practices",
+}
+MODULE_NAMES.update(RULES.module_names)
+
+
 def print_module_header(module_num):
-    module_names = {
-        4: "Containerize an Application",
-        5: "Update the Application",
-        6: "Share the Application",
-        7: "Persist the DB",
-        8: "Use Bind Mounts",
-        9: "Multi-Container Apps",
-        10: "Use Docker Compose",
-        11: "Image-Building Best Practices",
-    }
-    name = module_names.get(module_num, f"Module {module_num:02d}")
+    name = MODULE_NAMES.get(module_num, f"Module {module_num:02d}")
     print(colored(f"  Module {module_num:02d}: {name}", Colors.BOLD))
     print(colored(f"  {'─' * 50}", Colors.DIM))
 
 
 # ─── Main ──────────────────────────────────────────────────────────────────
 
-def run_checks(module_filter=None):
-    print_header()
+PASSING_SCORE = 70
+SERVE_INVENTORY_TTL = 5  # seconds a resident grader trusts its Docker listings
+
+
+def select_checks(module_filter=None, options=None):
+    """Return the registry entries to run, optionally limited to one module.
+
+    Checks that need the Docker daemon are left out when the "docker"
+    option is False, unless they are marked "offline".
+    """
+    options = options or {}
+    return [
+        c for c in CHECKS
+        if (module_filter is None or c["module"] == module_filter)
+        and (not c.get("optional") or options.get(c["optional"]))
+        and (options.get("docker", True) or "docker" not in c["needs"] or c.get("offline"))
+    ]
+
+
+def run_check(check, ctx):
+    """Run a single registry entry, turning exceptions into a failed check.
+
+    Always returns (passed, message, details).
+    """
+    try:
+        outcome = check["func"](ctx)
+    except FileRejected as e:
+        return False, str(e), {}
+    except Exception as e:
+        return False, f"Error: {str(e)}", {}
+    if len(outcome) == 2:
+        return outcome + ({},)
+    return tuple(outcome)
+
+
+def mark_unfinished(result, deadline, started=True):
+    """Turn a result into the report for a check the deadline cut short or kept from running."""
+    when = "finished" if started else "started"
+    result.update(passed=False, earned=0)
+    if deadline.reason == PASS_REACHED:
+        result["skipped"] = True
+        result["message"] = f"Not graded: the pass mark was reached before this check {when}"
+    else:
+        result["timed_out"] = True
+        result["message"] = f"Timed out: the {deadline.seconds:g}s deadline ran out before this check {when}"
+    return result
+
+
+def evaluate(check, ctx, cache, deadline=None):
+    """Run a check (through the result cache, if any) and return its result dict.
+
+    Emits the check_started event; the caller emits check_finished.
+    """
+    events = ctx.options.get("events")
+    if events is not None:
+        events.check_started(check)
+    interrupted = False
+    with timing.timed() as timer, timing.within(deadline):
+        key = cache.key(check, ctx) if cache is not None else None
+        outcome = cache.get(key) if key is not None else None
+        if outcome is not None and check.get("revalidate") and not check["revalidate"](ctx, outcome):
+            outcome = None
+        cached = outcome is not None
+        if not cached:
+            profiler = ctx.options.get("profiler")
+            if profiler is not None:
+                outcome = profiler.call(run_check, check, ctx)
+            else:
+                outcome = run_check(check, ctx)
+            # A check that failed once the deadline ended was most likely
+            # cut short by it; its outcome says nothing about the submission.
+            # Nothing finishing after the deadline is cached: the grade may
+            # have moved on and closed the cache.
+            ended = deadline is not None and deadline.ended()
+            interrupted = ended and not outcome[0]
+            if key is not None and not ended:
+                cache.put(key, check, outcome)
+
+    passed, message, details = outcome
+    result = {
+        "name": check["name"],
+        "module": check["module"],
+        "points": check["points"],
+        "earned": check["points"] if passed else 0,
+        "passed": passed,
+        "message": message,
+        "cached": cached,
+        "timing": timer.as_dict(),
+    }
+    if details:
+        result["details"] = details
+    if interrupted:
+        mark_unfinished(result, deadline)
+    return result
+
+
+def provider_failed(check, provider, events=None):
+    """Result for a check not run because the check providing what it needs failed."""
+    if events is not None:
+        events.check_started(check)
+    return {
+        "name": check["name"],
+        "module": check["module"],
+        "points": check["points"],
+        "earned": 0,
+        "passed": False,
+        "message": f"Not run: \"{provider['name']}\" did not pass",
+        "cached": False,
+        "timing": timing.CheckTimer().as_dict(),
+    }
 
-    total_points = 0
-    earned_points = 0
-    results = []
-    current_module = None
 
-    checks_to_run = CHECKS
-    if module_filter is not None:
-        checks_to_run = [c for c in CHECKS if c["module"] == module_filter]
-        if not checks_to_run:
-            print(colored(f"  No graded checks for module {module_filter}", Colors.YELLOW))
-            return
+def not_run(check, deadline, started=False):
+    """Result for a check the deadline stopped before it finished (or started)."""
+    result = {
+        "name": check["name"],
+        "module": check["module"],
+        "points": check["points"],
+        "cached": False,
+        "timing": timing.CheckTimer().as_dict(),
+    }
+    return mark_unfinished(result, deadline, started)
+
+
+def iter_results(root_dir, checks, jobs=DEFAULT_JOBS, cache=None, options=None):
+    """Grade the checkout at root_dir, yielding one result dict per check in registry order.
+
+    With a "deadline" option (seconds) or "stop_at_pass", checks still
+    unfinished when the deadline runs out or the pass mark is certain are
+    reported as timed out or not graded. A check the executor gave up on
+    may still finish on its worker thread; that late result is dropped,
+    and the context is closed only once no check is still using it.
+    """
+    ctx = GradeContext(root_dir, options)
+    executor = ctx.options.get("executor") or CheckExecutor(jobs=jobs)
+    deadline = None
+    if ctx.options.get("deadline") or ctx.options.get("stop_at_pass"):
+        deadline = Deadline(ctx.options.get("deadline"))
+    stop_at_pass = ctx.options.get("stop_at_pass")
+    events = ctx.options.get("events")
+    lock = threading.Lock()
+    # Guarded by lock: points earned, checks running, whether the grade is
+    # over, and which checks started, finished or were given up on
+    state = {"earned": 0, "running": 0, "done": False}
+    started = set()
+    settled = {}
+    given_up = set()
+
+    def idle():
+        # Called with lock held; True once the context can be closed
+        return state["done"] and state["running"] == 0
+
+    def settle(check, produce):
+        with lock:
+            if state["done"]:
+                return None
+            state["running"] += 1
+            started.add(id(check))
+        try:
+            result = produce()
+        finally:
+            with lock:
+                state["running"] -= 1
+                close = idle()
+            if close:
+                ctx.close()
+        with lock:
+            if id(check) in given_up:
+                return None
+            settled[id(check)] = result
+            if stop_at_pass:
+                # Points are never taken away, so reaching the pass mark is final
+                state["earned"] += result["earned"]
+                if state["earned"] >= PASSING_SCORE:
+                    deadline.end(PASS_REACHED)
+        if events is not None:
+            events.check_finished(result)
+        return result
+
+    def call(check):
+        return settle(check, lambda: evaluate(check, ctx, cache, deadline))
+
+    def skip(check, provider):
+        return settle(check, lambda: provider_failed(check, provider, events))
+
+    try:
+        for check, result in executor.run(checks, call, deadline, skip):
+            if result is None:
+                with lock:
+                    # It may have finished just after the executor stopped waiting
+                    result = settled.get(id(check))
+                    if result is None:
+                        given_up.add(id(check))
+                    was_started = id(check) in started
+                if result is None:
+                    result = not_run(check, deadline, was_started)
+                    if events is not None:
+                        events.check_finished(result)
+            yield result
+    finally:
+        if deadline is not None:
+            deadline.close()
+        with lock:
+            state["done"] = True
+            close = idle()
+        if close:
+            ctx.close()
+
+
+def open_cache(cache_dir):
+    """Open the result cache in cache_dir, or return None when caching is off."""
+    if cache_dir is None:
+        return None
+    return ResultCache(cache_dir)
+
+
+def summarize(results, elapsed_ns=None):
+    """Build the JSON report for a list of check results."""
+    total = sum(r["points"] for r in results)
+    earned = sum(r["earned"] for r in results)
+    output = {
+        "total_points": total,
+        "earned_points": earned,
+        "passing_score": PASSING_SCORE,
+        "passed": earned >= PASSING_SCORE,
+        "checks": results,
+    }
+    if any(r.get("timed_out") or r.get("skipped") for r in results):
+        # Some checks were not graded: earned_points is a lower bound
+        output["partial"] = True
+    if elapsed_ns is not None:
+        output["elapsed_ms"] = round(elapsed_ns / 1e6, 3)
+    return output
+
+
+def record_results(root_dir, results, options=None):
+    """Append a grade to the --results-store, if one was given."""
+    options = options or {}
+    if options.get("results_store") and results:
+        ResultStore(options["results_store"]).append(root_dir, results, cohort=options.get("cohort") or "")
+
 
-    for check in checks_to_run:
-        module = check["module"]
+def grade_submission(root_dir, module_filter=None, jobs=DEFAULT_JOBS, cache_dir=None, options=None):
+    """Grade one checkout without printing and return its JSON report."""
+    start = time.perf_counter_ns()
+    cache = open_cache(cache_dir)
+    try:
+        results = list(iter_results(root_dir, select_checks(module_filter, options), jobs, cache, options))
+    finally:
+        if cache is not None:
+            cache.close()
+    record_results(root_dir, results, options)
+    return summarize(results, time.perf_counter_ns() - start)
+
+
+def print_result(result):
+    """Print one check result line (and its hint when it failed)."""
+    if result["passed"]:
+        icon = colored("✓", Colors.GREEN)
+        pts = colored(f"+{result['points']}pts", Colors.GREEN)
+    else:
+        icon = colored("✗", Colors.RED)
+        pts = colored(f" {result['points']}pts", Colors.DIM)
+
+    if result.get("skipped"):
+        icon = colored("–", Colors.YELLOW)
+    elif result.get("timed_out"):
+        icon = colored("⏱", Colors.YELLOW)
+
+    print(f"    {icon} {result['name']:.<40} {pts}")
+    if not result["passed"]:
+        print(colored(f"      └─ {result['message']}", Colors.DIM))
+
+
+def print_results(results):
+    """Print check results grouped under module headers, as they arrive.
+
+    Returns the list of printed results.
+    """
+    printed = []
+    current_module = None
+    for result in results:
+        module = result["module"]
 
         if module != current_module:
             if current_module is not None:
@@ -557,68 +852,451 @@ def run_checks(module_filter=None):
             print_module_header(module)
             current_module = module
 
-        total_points += check["points"]
+        print_result(result)
+        printed.append(result)
+    return printed
 
-        try:
-            passed, message = check["func"]()
-        except Exception as e:
-            passed, message = False, f"Error: {str(e)}"
-
-        if passed:
-            earned_points += check["points"]
-            icon = colored("✓", Colors.GREEN)
-            pts = colored(f"+{check['points']}pts", Colors.GREEN)
-        else:
-            icon = colored("✗", Colors.RED)
-            pts = colored(f" {check['points']}pts", Colors.DIM)
-
-        print(f"    {icon} {check['name']:.<40} {pts}")
-        if not passed:
-            print(colored(f"      └─ {message}", Colors.DIM))
-
-        results.append({
-            "name": check["name"],
-            "module": check["module"],
-            "points": check["points"],
-            "earned": check["points"] if passed else 0,
-            "passed": passed,
-            "message": message,
-        })
 
+def print_summary(earned_points, total_points):
+    """Print the progress bar and the pass/fail verdict."""
     print_progress_bar(earned_points, total_points)
 
     # Pass/Fail status
-    passing_score = 70
-    if earned_points >= passing_score:
-        print(colored(f"  🎉 PASSED! You scored {earned_points}/{total_points} (need {passing_score} to pass)", Colors.GREEN))
+    if earned_points >= PASSING_SCORE:
+        print(colored(f"  🎉 PASSED! You scored {earned_points}/{total_points} (need {PASSING_SCORE} to pass)", Colors.GREEN))
     else:
-        remaining = passing_score - earned_points
-        print(colored(f"  Keep going! You need {remaining} more points to pass ({passing_score}/{total_points})", Colors.YELLOW))
+        remaining = PASSING_SCORE - earned_points
+        print(colored(f"  Keep going! You need {remaining} more points to pass ({PASSING_SCORE}/{total_points})", Colors.YELLOW))
 
     print()
+
+
+def print_unfinished(results):
+    """Say how much of the score a --deadline or --stop-at-pass left ungraded."""
+    timed_out = [r for r in results if r.get("timed_out")]
+    not_graded = [r for r in results if r.get("skipped")]
+    if timed_out:
+        points = sum(r["points"] for r in timed_out)
+        print(colored(f"  Partial score: {len(timed_out)} checks ({points} pts) timed out", Colors.YELLOW))
+    if not_graded:
+        print(colored(f"  Stopped at the pass mark: {len(not_graded)} checks were not graded", Colors.YELLOW))
+    if timed_out or not_graded:
+        print()
+
+
+def run_checks(module_filter=None, jobs=DEFAULT_JOBS, root_dir=ROOT_DIR, cache_dir=None, options=None):
+    print_header()
+
+    checks_to_run = select_checks(module_filter, options)
+    if not checks_to_run:
+        print(colored(f"  No graded checks for module {module_filter}", Colors.YELLOW))
+        return
+
+    cache = open_cache(cache_dir)
+    try:
+        results = print_results(iter_results(root_dir, checks_to_run, jobs, cache, options))
+    finally:
+        if cache is not None:
+            cache.close()
+
+    total_points = sum(r["points"] for r in results)
+    earned_points = sum(r["earned"] for r in results)
+    print_unfinished(results)
+    print_summary(earned_points, total_points)
     return results, earned_points, total_points
 
 
+def ci_checks(module_filter=None, jobs=DEFAULT_JOBS, root_dir=ROOT_DIR, cache_dir=None, options=None):
+    """Grade for GitHub Actions: print as usual, then write the step outputs and job summary.
+
+    Docker checks are skipped when no daemon is reachable. The pass mark
+    still applies to the full score, so the verdict is then reported as
+    provisional: the skipped points could change it.
+    """
+    options = dict(options or {})
+    if not daemon_reachable():
+        options["docker"] = False
+    skipped = [c for c in select_checks(module_filter, dict(options, docker=True))
+               if c not in select_checks(module_filter, options)]
+
+    outcome = run_checks(module_filter, jobs, root_dir, cache_dir, options)
+    if outcome is None:
+        return None
+    results = outcome[0]
+    if skipped:
+        points = sum(c["points"] for c in skipped)
+        print(colored(f"  Skipped {len(skipped)} Docker checks: no Docker daemon is reachable", Colors.YELLOW))
+        print(colored(f"  Provisional result: {points} pts were not graded", Colors.YELLOW))
+        print()
+
+    report = summarize(results)
+    report["skipped"] = [{"name": c["name"], "module": c["module"], "points": c["points"]} for c in skipped]
+    report["provisional"] = bool(skipped)
+    if os.environ.get("GITHUB_OUTPUT"):
+        ci.write_outputs(os.environ["GITHUB_OUTPUT"], report)
+    if os.environ.get("GITHUB_STEP_SUMMARY"):
+        ci.write_summary(os.environ["GITHUB_STEP_SUMMARY"], report, MODULE_NAMES)
+    return outcome
+
+
+def verify_scripts(module_filter=None, jobs=DEFAULT_JOBS, root_dir=ROOT_DIR, timeout=verify.VERIFY_TIMEOUT):
+    """Run the modules' verify.sh scripts concurrently and print their checks.
+
+    Returns the number of failed checks, or None if there was nothing to run.
+    """
+    print_header()
+    scripts = verify.discover_scripts(root_dir, module_filter)
+    if not scripts:
+        print(colored(f"  No verify.sh scripts found{f' for module {module_filter}' if module_filter else ''}", Colors.YELLOW))
+        return None
+
+    start = time.perf_counter_ns()
+    stats = {}
+    results = print_results(verify.run_scripts(scripts, jobs, timeout, stats))
+    elapsed_ms = (time.perf_counter_ns() - start) / 1e6
+
+    passed = sum(1 for r in results if r["passed"])
+    skipped = sum(1 for r in results if r.get("skipped"))
+    failed = len(results) - passed - skipped
+    print()
+    print(colored(f"  {passed} passed, {failed} failed, {skipped} skipped across {len(scripts)} verify scripts",
+                  Colors.GREEN if not failed else Colors.YELLOW))
+    probes = f"; {stats['probes']} docker probes, {stats['docker_calls']} sent to docker" if stats.get("probes") else ""
+    print(colored(f"  Finished in {elapsed_ms:.0f} ms{probes}", Colors.DIM))
+    print()
+    return failed
+
+
+def stream_checks(module_filter=None, jobs=DEFAULT_JOBS, root_dir=ROOT_DIR, cache_dir=None, options=None):
+    """Grade like run_checks, but write NDJSON events to stdout instead of the report."""
+    checks_to_run = select_checks(module_filter, options)
+    events = EventStream(checks_to_run)
+    if not checks_to_run:
+        events.emit("error", message=f"No graded checks for module {module_filter}")
+        return
+
+    start = time.perf_counter_ns()
+    events.grade_started(os.path.abspath(root_dir), checks_to_run)
+    cache = open_cache(cache_dir)
+    try:
+        results = list(iter_results(root_dir, checks_to_run, jobs, cache, dict(options or {}, events=events)))
+    finally:
+        if cache is not None:
+            cache.close()
+    events.score(summarize(results, time.perf_counter_ns() - start))
+
+    return results, sum(r["earned"] for r in results), sum(r["points"] for r in results)
+
+
+def watch(results, module_filter=None, jobs=DEFAULT_JOBS, root_dir=ROOT_DIR, cache_dir=None, options=None):
+    """Re-grade the checks that read each changed artifact until interrupted."""
+    results = {r["name"]: r for r in results}
+    checks = select_checks(module_filter, options)
+    watcher = make_watcher(root_dir)
+    print(colored(f"  Watching for changes ({type(watcher).__name__}), Ctrl+C to stop", Colors.DIM))
+    try:
+        while True:
+            changed = watcher.wait()
+            affected = affected_checks(checks, changed)
+            if not affected:
+                continue
+
+            start = time.perf_counter_ns()
+            cache = open_cache(cache_dir)
+            try:
+                for result in iter_results(root_dir, affected, jobs, cache, options):
+                    results[result["name"]] = result
+            finally:
+                if cache is not None:
+                    cache.close()
+            elapsed_ms = (time.perf_counter_ns() - start) / 1e6
+
+            ordered = [results[c["name"]] for c in checks]
+            print("\033[2J\033[H", end="")
+            print_header()
+            print_results(ordered)
+            print_summary(sum(r["earned"] for r in ordered), sum(r["points"] for r in ordered))
+            files = ", ".join(sorted(ARTIFACTS[name] for name in changed))
+            print(colored(f"  Re-graded {len(affected)} check(s) in {elapsed_ms:.1f} ms after changes to {files}", Colors.DIM))
+            print(colored("  Watching for changes, Ctrl+C to stop", Colors.DIM))
+    except KeyboardInterrupt:
+        print()
+    finally:
+        watcher.close()
+
+
+def resident_grader(jobs, cache, options):
+    """Return ``grade(root_dir, module_filter)`` for processes that grade many checkouts."""
+    def grade(root_dir, module_filter=None):
+        if not os.path.isdir(root_dir):
+            raise ValueError(f"not a directory: {root_dir}")
+        checks = select_checks(module_filter, options)
+        if not checks:
+            raise ValueError(f"no graded checks for module {module_filter}")
+        start = time.perf_counter_ns()
+        results = list(iter_results(root_dir, checks, jobs, cache, options))
+        record_results(root_dir, results, options)
+        return summarize(results, time.perf_counter_ns() - start)
+    return grade
+
+
+def work_queue(queue, workers=DEFAULT_WORKERS, jobs=DEFAULT_JOBS, cache_dir=None, options=None,
+               limits=None, exit_when_empty=False):
+    """Lease checkouts from a grading queue and grade them until interrupted (or drained).
+
+    ``limits`` caps resource use across all of this node's grades, e.g.
+    one image build at a time however many jobs are in flight.
+    """
+    inventory = DockerInventory(ttl=SERVE_INVENTORY_TTL)
+    cache = open_cache(cache_dir)
+    options = dict(options or {}, docker_inventory=inventory, executor=CheckExecutor(jobs=jobs, limits=limits))
+    print(f"  Worker grading from {queue.path} with {max(1, workers)} slots", flush=True)
+    try:
+        run_jobs(queue, resident_grader(jobs, cache, options), slots=workers,
+                 exit_when_empty=exit_when_empty, log=lambda line: print(f"  {line}", flush=True))
+    finally:
+        inventory.close()
+        if cache is not None:
+            cache.close()
+
+
+def serve(port=DEFAULT_PORT, socket_path=None, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+          jobs=DEFAULT_JOBS, cache_dir=None, options=None):
+    """Grade checkouts on request until interrupted, keeping caches warm between grades."""
+    store = ArtifactStore()
+    inventory = DockerInventory(ttl=SERVE_INVENTORY_TTL)
+    cache = open_cache(cache_dir)
+    options = dict(options or {}, artifact_store=store, docker_inventory=inventory,
+                   executor=CheckExecutor(jobs=jobs))
+
+    grade = resident_grader(jobs, cache, options)
+    service = GradeService(grade, workers=workers, queue_size=queue_size,
+                           extra_stats=lambda: {"artifact_cache": store.stats()})
+    server = make_server(service, port=port, socket_path=socket_path)
+    print(f"  Grader listening on {address(server)} ({service.workers} workers, queue of {service.queue_size})")
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print()
+    finally:
+        server.server_close()
+        service.close()
+        inventory.close()
+        if cache is not None:
+            cache.close()
+        if socket_path:
+            try:
+                os.unlink(socket_path)
+            except OSError:
+                pass
+
+
 def main():
     parser = argparse.ArgumentParser(description="Docker Zero-to-Hero Workshop Grader")
+    parser.add_argument("command", nargs="?", choices=("serve", "submit", "worker", "status", "query"),
+                        help="serve: stay resident and grade checkouts over a local HTTP API; "
+                             "submit / worker / status: queue checkouts, grade queued jobs, show the queue; "
+                             "query: pass rates, score histogram and timings from a --results-store")
     parser.add_argument("--module", type=int, help="Check a specific module only (e.g., --module 4)")
     parser.add_argument("--json", action="store_true", help="Output results as JSON")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                        help=f"Number of checks to run concurrently (default: {DEFAULT_JOBS})")
+    parser.add_argument("--root", default=ROOT_DIR,
+                        help="Workshop checkout to grade (default: the directory containing run.py)")
+    parser.add_argument("--batch", metavar="PATH",
+                        help="Grade many checkouts: a directory of checkouts or a manifest file with one path per line")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Worker processes for --batch, grade threads for serve and worker (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help=f"serve: port to listen on at 127.0.0.1 (default: {DEFAULT_PORT})")
+    parser.add_argument("--socket", metavar="PATH", help="serve: listen on this Unix socket instead of a port")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help=f"serve: grade requests that may wait for a worker (default: {DEFAULT_QUEUE_SIZE})")
+    parser.add_argument("--queue", metavar="PATH",
+                        help="submit/worker/status: grading queue, a SQLite file (*.db) or a shared directory")
+    parser.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS,
+                        help=f"worker: seconds a job lease lasts without a heartbeat (default: {DEFAULT_LEASE_SECONDS})")
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help=f"worker: attempts before a job is marked failed (default: {DEFAULT_MAX_ATTEMPTS})")
+    parser.add_argument("--max-builds", type=int, default=RESOURCE_LIMITS["build"],
+                        help=f"worker: image builds at once on this node (default: {RESOURCE_LIMITS['build']})")
+    parser.add_argument("--max-docker-checks", type=int, default=RESOURCE_LIMITS["docker"],
+                        help=f"worker: Docker checks at once on this node (default: {RESOURCE_LIMITS['docker']})")
+    parser.add_argument("--exit-when-empty", action="store_true", help="worker: stop once the queue is empty")
+    parser.add_argument("--results-store", metavar="DIR",
+                        help="Append every grade's per-check results to this store (and query reads it)")
+    parser.add_argument("--cohort", default="",
+                        help="Label grades recorded in --results-store, or the cohort to query")
+    parser.add_argument("--latest", action="store_true",
+                        help="query: only each submission's most recent grade")
+    parser.add_argument("--host-limit", action="append", default=[], metavar="OP=N",
+                        help="Docker operations at once across every grader on this host, for OP build, run or "
+                             f"query (default: {', '.join(f'{k}={v}' for k, v in admission.HOST_LIMITS.items())}; 0 = no limit)")
+    parser.add_argument("--admission-dir", metavar="DIR",
+                        help=f"Directory holding the host-wide Docker slots (default: {admission.default_dir()})")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and do not update cached check results")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help=f"Directory for the check result cache (default: {CACHE_DIRNAME}/ next to run.py)")
+    parser.add_argument("--build-cache", metavar="DIR",
+                        help="Persistent BuildKit layer cache directory for image builds (uses docker buildx)")
+    parser.add_argument("--max-context-mb", type=float,
+                        help=f"Build context size limit in MB (default: {MAX_CONTEXT_BYTES // (1024 * 1024)})")
+    parser.add_argument("--profile", action="store_true", help="Print a per-check timing table after grading")
+    parser.add_argument("--profile-out", metavar="FILE",
+                        help="Also write cProfile data for the whole run to FILE (implies --profile)")
+    parser.add_argument("--load-test", action="store_true",
+                        help="Start the built image and load-test the todo API (optional, unscored check)")
+    parser.add_argument("--load-concurrency", type=int, default=loadtest.DEFAULT_CONCURRENCY,
+                        help=f"Concurrent clients for --load-test (default: {loadtest.DEFAULT_CONCURRENCY})")
+    parser.add_argument("--load-duration", type=float, default=loadtest.DEFAULT_DURATION,
+                        help=f"Seconds of load for --load-test (default: {loadtest.DEFAULT_DURATION:g})")
+    parser.add_argument("--load-min-rps", type=float, help="Fail the load test below this many requests per second")
+    parser.add_argument("--load-max-p95-ms", type=float, help="Fail the load test above this p95 latency")
+    parser.add_argument("--analyze-image", action="store_true",
+                        help="Break down the built image's layers and compare with the Module 11 reference (optional, unscored check)")
+    parser.add_argument("--compare-references", action="store_true",
+                        help="Build app/ with the Module 04 and 11 reference Dockerfiles too and compare build time, "
+                             "size, layers and cache reuse after a source-only change (optional, unscored check)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Write one JSON event per line to stdout as checks start and finish, instead of the report")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and re-grade the checks affected by each saved change")
+    parser.add_argument("--ci", action="store_true",
+                        help="GitHub Actions mode: write $GITHUB_OUTPUT and $GITHUB_STEP_SUMMARY, "
+                             "skipping Docker checks when no daemon is reachable")
+    parser.add_argument("--verify", action="store_true",
+                        help="Run every module's verify.sh concurrently instead of the graded checks")
+    parser.add_argument("--deadline", type=float, metavar="SECONDS",
+                        help="Grade within this many seconds: static checks run first, and checks still "
+                             "running when time is up are stopped and reported as timed out")
+    parser.add_argument("--stop-at-pass", action="store_true",
+                        help=f"Stop grading once the pass mark ({PASSING_SCORE}) is certain; the rest is not graded")
+    parser.add_argument("--verify-timeout", type=float, default=verify.VERIFY_TIMEOUT,
+                        help=f"Seconds each verify.sh may run (default: {verify.VERIFY_TIMEOUT})")
     args = parser.parse_args()
+    if args.stream and (args.batch or args.watch or args.profile or args.profile_out or args.command):
+        parser.error("--stream cannot be combined with serve, --batch, --watch or --profile")
+    if args.ci and (args.batch or args.watch or args.stream or args.command):
+        parser.error("--ci cannot be combined with serve, --batch, --watch or --stream")
+    if args.verify and (args.batch or args.watch or args.stream or args.ci or args.command):
+        parser.error("--verify cannot be combined with serve, --batch, --watch, --stream or --ci")
+    if args.deadline is not None and args.deadline <= 0:
+        parser.error("--deadline must be a positive number of seconds")
+    try:
+        admission.configure(args.admission_dir, admission.parse_limits(args.host_limit))
+    except ValueError as e:
+        parser.error(f"--host-limit: {e}")
+    cache_dir = None if args.no_cache else args.cache_dir
+    options = {
+        "build_cache": args.build_cache,
+        "max_context_bytes": int(args.max_context_mb * 1024 * 1024) if args.max_context_mb else None,
+        "analyze_image": args.analyze_image,
+        "compare_references": args.compare_references,
+        "load_test": args.load_test,
+        "load_concurrency": args.load_concurrency,
+        "load_duration": args.load_duration,
+        "load_min_rps": args.load_min_rps,
+        "load_max_p95_ms": args.load_max_p95_ms,
+        "results_store": args.results_store,
+        "cohort": args.cohort,
+        "deadline": args.deadline,
+        "stop_at_pass": args.stop_at_pass,
+    }
 
-    results, earned, total = run_checks(module_filter=args.module)
+    if args.command == "query":
+        if not args.results_store or not os.path.isdir(args.results_store):
+            parser.error("query needs --results-store DIR (an existing store)")
+        summary = aggregate_results(load_results(ResultStore(args.results_store), args.cohort or None,
+                                                 latest=args.latest))
+        if args.json:
+            print(json.dumps(summary, indent=2))
+        else:
+            print_header()
+            format_results(summary, sys.stdout)
+            print()
+        return
+
+    if args.command in ("submit", "worker", "status"):
+        if not args.queue:
+            parser.error(f"{args.command} needs --queue PATH")
+        queue = open_queue(args.queue, lease_seconds=args.lease_seconds, max_attempts=args.max_attempts)
+        try:
+            if args.command == "submit":
+                try:
+                    roots = discover_submissions(args.batch) if args.batch else [os.path.abspath(args.root)]
+                except OSError as e:
+                    parser.error(f"cannot read --batch {args.batch}: {e}")
+                for root in roots:
+                    print(f"{queue.submit(root, args.module)}\t{root}")
+            elif args.command == "worker":
+                limits = dict(RESOURCE_LIMITS, build=args.max_builds, docker=args.max_docker_checks)
+                work_queue(queue, workers=args.workers, jobs=args.jobs, cache_dir=cache_dir, options=options,
+                           limits=limits, exit_when_empty=args.exit_when_empty)
+            elif args.json:
+                for record in queue.finished():
+                    print(json.dumps(record))
+            else:
+                print("  " + ", ".join(f"{state}: {n}" for state, n in queue.counts().items()))
+        finally:
+            queue.close()
+        return
+
+    if args.command == "serve":
+        serve(port=args.port, socket_path=args.socket, workers=args.workers, queue_size=args.queue_size,
+              jobs=args.jobs, cache_dir=cache_dir, options=options)
+        return
+
+    if args.verify:
+        failed = verify_scripts(module_filter=args.module, jobs=args.jobs, root_dir=args.root,
+                                timeout=args.verify_timeout)
+        if failed is None or failed:
+            sys.exit(1)
+        return
+
+    if args.batch:
+        try:
+            submissions = discover_submissions(args.batch)
+        except OSError as e:
+            parser.error(f"cannot read --batch {args.batch}: {e}")
+        grade = functools.partial(grade_submission, module_filter=args.module, jobs=args.jobs, cache_dir=cache_dir, options=options)
+        if run_batch(submissions, grade, workers=args.workers):
+            sys.exit(1)
+        return
+
+    profiler = timing.Profiler() if args.profile_out else None
+    options["profiler"] = profiler
+    grade = stream_checks if args.stream else ci_checks if args.ci else run_checks
+    start = time.perf_counter_ns()
+    if profiler is not None:
+        with profiler:
+            outcome = grade(module_filter=args.module, jobs=args.jobs, root_dir=args.root,
+                            cache_dir=cache_dir, options=options)
+    else:
+        outcome = grade(module_filter=args.module, jobs=args.jobs, root_dir=args.root,
+                        cache_dir=cache_dir, options=options)
+    elapsed_ns = time.perf_counter_ns() - start
+    if outcome is None:
+        sys.exit(1)
+    results, earned, total = outcome
+    record_results(args.root, results, options)
+
+    if args.profile or profiler is not None:
+        print_profile(results, elapsed_ns)
+    if profiler is not None:
+        profiler.dump(args.profile_out)
+        print(f"  cProfile data written to {args.profile_out} (inspect with python -m pstats)")
 
     if args.json:
-        output = {
-            "total_points": total,
-            "earned_points": earned,
-            "passing_score": 70,
-            "passed": earned >= 70,
-            "checks": results,
-        }
-        json_path = os.path.join(ROOT_DIR, "results.json")
+        output = summarize(results, elapsed_ns)
+        json_path = os.path.join(args.root, "results.json")
         with open(json_path, "w") as f:
             json.dump(output, f, indent=2)
-        print(f"  Results written to {json_path}")
+        print(f"  Results written to {json_path}", file=sys.stderr if args.stream else sys.stdout)
+
+    if args.watch:
+        watch(results, module_filter=args.module, jobs=args.jobs, root_dir=args.root,
+              cache_dir=cache_dir, options=options)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,50 @@
+"""Duration samples recorded by several graders at once."""
+
+import os
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+
+from grader import admission
+
+
+def record_many(directory, worker, count):
+    log = admission.Admission(directory)
+    for i in range(count):
+        log.record("build", worker * 1000 + i)
+
+
+@unittest.skipIf(admission.fcntl is None, "needs fcntl")
+class RecordTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="grader-test-")
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def test_keeps_only_recent_samples(self):
+        log = admission.Admission(self.dir)
+        for i in range(admission.RECENT_DURATIONS * 10):
+            log.record("build", i)
+        total = admission.RECENT_DURATIONS * 10
+        self.assertEqual(log.recent("build"), [float(i) for i in range(total - admission.RECENT_DURATIONS, total)])
+        self.assertLessEqual(os.path.getsize(log._durations_path("build")), admission.RECENT_DURATIONS * 64)
+
+    def test_concurrent_trims_lose_no_recent_samples(self):
+        count = admission.RECENT_DURATIONS * 4
+        workers = [multiprocessing.Process(target=record_many, args=(self.dir, w, count)) for w in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            self.assertEqual(worker.exitcode, 0)
+        samples = admission.Admission(self.dir).recent("build")
+        self.assertEqual(len(samples), admission.RECENT_DURATIONS)
+        # Each worker's own samples stay in order, and the very last one survives
+        for w in range(4):
+            mine = [s for s in samples if w * 1000 <= s < (w + 1) * 1000]
+            self.assertEqual(mine, sorted(mine))
+        self.assertEqual(os.listdir(self.dir), [os.path.basename(admission.Admission(self.dir)._durations_path("build"))])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+"""What keys, stores and evicts an entry in the check result cache."""
+
+import os
+import shutil
+import itertools
+import tempfile
+import unittest
+from unittest import mock
+
+from grader import cache
+from grader.cache import ResultCache
+from grader.context import GradeContext
+
+DOCKERFILE_CHECK = {"name": "FROM node base image", "needs": ("dockerfile",)}
+CONTEXT_CHECK = {"name": "Build context size", "needs": ("context",), "options": ("max_context_bytes",)}
+BUILD_CHECK = {"name": "Image builds successfully", "needs": ("build", "context", "docker"), "cache": "pass"}
+DOCKER_CHECK = {"name": "Image tagged correctly", "needs": ("docker",)}
+PASSED = (True, "ok", {"n": 1})
+
+
+class CacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="grader-test-")
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.root = os.path.join(self.dir, "checkout")
+        os.makedirs(os.path.join(self.root, "app"))
+        self.write("app/Dockerfile", "FROM node:18-alpine\n")
+        self.cache = ResultCache(os.path.join(self.dir, "cache"))
+        self.addCleanup(self.cache.close)
+
+    def write(self, rel, text):
+        with open(os.path.join(self.root, rel), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def key(self, check, options=None):
+        # A fresh context per key, as every grade gets one
+        ctx = GradeContext(self.root, options)
+        try:
+            return self.cache.key(check, ctx)
+        finally:
+            ctx.close()
+
+
+class KeyTest(CacheTestCase):
+    def test_same_inputs_same_key(self):
+        self.assertEqual(self.key(DOCKERFILE_CHECK), self.key(DOCKERFILE_CHECK))
+
+    def test_changing_an_artifact_invalidates(self):
+        before = self.key(DOCKERFILE_CHECK)
+        self.cache.put(before, DOCKERFILE_CHECK, PASSED)
+        self.write("app/Dockerfile", "FROM python:3.12-slim\n")
+        after = self.key(DOCKERFILE_CHECK)
+        self.assertNotEqual(before, after)
+        self.assertIsNone(self.cache.get(after))
+
+    def test_unrelated_file_does_not_invalidate(self):
+        before = self.key(DOCKERFILE_CHECK)
+        self.write("docker-compose.yml", "services: {}\n")
+        self.assertEqual(before, self.key(DOCKERFILE_CHECK))
+
+    def test_changing_an_option_the_check_reads_invalidates(self):
+        small = self.key(CONTEXT_CHECK, {"max_context_bytes": 1024})
+        self.assertNotEqual(small, self.key(CONTEXT_CHECK, {"max_context_bytes": 2048}))
+        self.assertNotEqual(small, self.key(CONTEXT_CHECK))
+        # Options a check does not list leave its key alone
+        self.assertEqual(self.key(DOCKERFILE_CHECK), self.key(DOCKERFILE_CHECK, {"max_context_bytes": 1024}))
+
+    def test_changing_the_grader_source_invalidates(self):
+        before = self.key(DOCKERFILE_CHECK)
+        with mock.patch.object(cache, "grader_fingerprint", return_value="edited grader"):
+            self.assertNotEqual(before, self.key(DOCKERFILE_CHECK))
+
+    def test_grader_fingerprint_covers_the_source(self):
+        package = os.path.dirname(os.path.abspath(cache.__file__))
+        copy = os.path.join(self.dir, "copy")
+        shutil.copytree(package, os.path.join(copy, "grader"), ignore=shutil.ignore_patterns("__pycache__"))
+        fake_file = os.path.join(copy, "grader", "cache.py")
+
+        def fingerprint():
+            with mock.patch.object(cache, "_fingerprint", None), mock.patch.object(cache, "__file__", fake_file):
+                return cache.grader_fingerprint()
+
+        before = fingerprint()
+        with open(os.path.join(copy, "grader", "dockerfile.py"), "a", encoding="utf-8") as f:
+            f.write("\n# edited\n")
+        self.assertNotEqual(before, fingerprint())
+
+    def test_checks_reading_docker_state_are_not_cached(self):
+        self.assertIsNone(self.key(DOCKER_CHECK))
+
+
+class PolicyTest(CacheTestCase):
+    def test_round_trip(self):
+        key = self.key(DOCKERFILE_CHECK)
+        self.cache.put(key, DOCKERFILE_CHECK, PASSED)
+        self.assertEqual(self.cache.get(key), PASSED)
+
+    def test_failures_are_cached_by_default(self):
+        key = self.key(DOCKERFILE_CHECK)
+        self.cache.put(key, DOCKERFILE_CHECK, (False, "no FROM", {}))
+        self.assertEqual(self.cache.get(key), (False, "no FROM", {}))
+
+    def test_pass_policy_keys_on_content_and_skips_failures(self):
+        key = self.key(BUILD_CHECK)
+        self.assertIsNotNone(key)
+        self.cache.put(key, BUILD_CHECK, (False, "Docker is not running", {}))
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, BUILD_CHECK, PASSED)
+        self.assertEqual(self.cache.get(key), PASSED)
+
+    def test_pass_policy_failure_does_not_overwrite_a_pass(self):
+        key = self.key(BUILD_CHECK)
+        self.cache.put(key, BUILD_CHECK, PASSED)
+        self.cache.put(key, BUILD_CHECK, (False, "build timed out", {}))
+        self.assertEqual(self.cache.get(key), PASSED)
+
+
+class EvictionTest(CacheTestCase):
+    def test_least_recently_used_entries_go_first(self):
+        small = ResultCache(os.path.join(self.dir, "small"), max_entries=2)
+        self.addCleanup(small.close)
+        clock = itertools.count(1000.0)
+        with mock.patch.object(cache.time, "time", lambda: next(clock)):
+            small.put("a", DOCKERFILE_CHECK, PASSED)
+            small.put("b", DOCKERFILE_CHECK, PASSED)
+            small.get("a")  # "b" is now the least recently used
+            small.put("c", DOCKERFILE_CHECK, PASSED)
+        self.assertIsNotNone(small.get("a"))
+        self.assertIsNone(small.get("b"))
+        self.assertIsNotNone(small.get("c"))
+
+
+if __name__ == "__main__":
+    unittest.main()
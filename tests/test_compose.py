@@ -0,0 +1,34 @@
+"""Lookups on the merged compose model."""
+
+import unittest
+
+from grader.compose import load
+
+COMPOSE = """
+services:
+  app:
+    build: .
+    ports:
+      - 3000:3000
+      - 3000:3000/udp
+      - target: 3000
+        published: 3000
+  proxy:
+    image: nginx
+    ports:
+      - "3000:3000"
+"""
+
+
+class ServicesPublishingTest(unittest.TestCase):
+    def test_each_service_listed_once(self):
+        model = load(["docker-compose.yml"], {"docker-compose.yml": COMPOSE})
+        self.assertEqual(model.services_publishing("3000:3000"), ["app", "proxy"])
+
+    def test_unpublished_mapping(self):
+        model = load(["docker-compose.yml"], {"docker-compose.yml": COMPOSE})
+        self.assertEqual(model.services_publishing("8080:80"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
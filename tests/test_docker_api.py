@@ -0,0 +1,185 @@
+"""DockerInventory against a fake daemon on a Unix socket, and its docker CLI fallback."""
+
+import os
+import json
+import shutil
+import socket
+import tempfile
+import unittest
+import threading
+import socketserver
+from unittest import mock
+from http.server import BaseHTTPRequestHandler
+
+from grader import admission
+from grader.docker_api import DockerClient, DockerInventory, DockerUnavailable
+
+IMAGES = [
+    {"RepoTags": ["getting-started:latest", "getting-started:v1"]},
+    {"RepoTags": None},
+    {"RepoTags": ["node:18-alpine"]},
+]
+VOLUMES = {"Volumes": [{"Name": "todo-db"}, {"Name": "scratch"}]}
+IMAGE = {"Size": 181000000, "RootFS": {"Layers": ["sha256:a", "sha256:b", "sha256:c"]}}
+
+
+class FakeDaemon(BaseHTTPRequestHandler):
+    """Answers the few Engine API endpoints the inventory uses."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        if self.path == "/_ping":
+            self._send(200, b"OK", "text/plain")
+        elif self.path == "/images/json":
+            self._json(200, IMAGES)
+        elif self.path == "/volumes":
+            self._json(200, self.server.volumes)
+        elif self.path == "/images/getting-started%3Av1/json":
+            self._json(200, IMAGE)
+        else:
+            self._json(404, {"message": f"no such path: {self.path}"})
+
+    def _json(self, status, body):
+        self._send(status, json.dumps(body).encode("utf-8"), "application/json")
+
+    def _send(self, status, payload, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path):
+        super().__init__(path, FakeDaemon)
+        self.requests = []
+        self.volumes = VOLUMES
+
+
+FAKE_CLI = """#!/bin/sh
+echo "$@" >> "$(dirname "$0")/calls.log"
+case "$1 $2" in
+  "images --format") printf 'getting-started:latest\\nnode:18-alpine\\n' ;;
+  "volume ls") echo todo-db ;;
+  "image inspect") echo "181000000 3" ;;
+  *) echo "unexpected: $*" >&2; exit 1 ;;
+esac
+"""
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "needs Unix domain sockets")
+class SocketInventoryTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="grader-test-")
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, "docker.sock")
+        self.server = DaemonServer(self.path)
+        thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def inventory(self, **kwargs):
+        inventory = DockerInventory(DockerClient(self.path, timeout=5), **kwargs)
+        self.addCleanup(inventory.close)
+        return inventory
+
+    def test_lists_images_and_volumes(self):
+        inventory = self.inventory()
+        self.assertEqual(inventory.image_tags(), ["getting-started:latest", "getting-started:v1", "node:18-alpine"])
+        self.assertEqual(inventory.volume_names(), ["todo-db", "scratch"])
+
+    def test_listings_are_fetched_once_per_grade(self):
+        inventory = self.inventory()
+        for _ in range(3):
+            inventory.image_tags()
+            inventory.volume_names()
+        self.assertEqual(self.server.requests, ["/images/json", "/volumes"])
+
+    def test_ttl_refetches_stale_listings(self):
+        inventory = self.inventory(ttl=0)
+        inventory.volume_names()
+        self.server.volumes = {"Volumes": [{"Name": "todo-db"}]}
+        self.assertEqual(inventory.volume_names(), ["todo-db"])
+        self.assertEqual(self.server.requests, ["/volumes", "/volumes"])
+
+    def test_image_summary(self):
+        self.assertEqual(self.inventory().image_summary("getting-started:v1"), (181000000, 3))
+
+    def test_error_status_raises_with_daemon_message(self):
+        with self.assertRaisesRegex(DockerUnavailable, "404.*no such path"):
+            self.inventory().image_summary("missing:latest")
+
+    def test_ping(self):
+        client = DockerClient(self.path, timeout=5)
+        self.addCleanup(client.close)
+        self.assertTrue(client.ping())
+
+    def test_uses_socket_from_docker_host(self):
+        with mock.patch.dict(os.environ, {"DOCKER_HOST": f"unix://{self.path}"}):
+            inventory = DockerInventory()
+        self.addCleanup(inventory.close)
+        self.assertIsNotNone(inventory.client)
+        self.assertIn("node:18-alpine", inventory.image_tags())
+
+    def test_unreachable_daemon_failure_is_memoized(self):
+        inventory = DockerInventory(DockerClient(os.path.join(self.dir, "gone.sock"), timeout=5))
+        for _ in range(2):
+            with self.assertRaisesRegex(DockerUnavailable, "cannot reach Docker"):
+                inventory.image_tags()
+        self.assertEqual(self.server.requests, [])
+
+
+class CLIFallbackTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="grader-test-")
+        self.addCleanup(shutil.rmtree, self.dir)
+        bin_dir = os.path.join(self.dir, "bin")
+        os.makedirs(bin_dir)
+        docker = os.path.join(bin_dir, "docker")
+        with open(docker, "w", encoding="utf-8") as f:
+            f.write(FAKE_CLI)
+        os.chmod(docker, 0o755)
+        self.calls = os.path.join(bin_dir, "calls.log")
+        environ = mock.patch.dict(os.environ, {
+            # Not a unix:// host, so there is no socket to talk to
+            "DOCKER_HOST": "npipe:////./pipe/docker_engine",
+            "PATH": bin_dir + os.pathsep + os.environ.get("PATH", ""),
+            admission.DIR_ENV: os.path.join(self.dir, "admission"),
+        })
+        environ.start()
+        self.addCleanup(environ.stop)
+
+    def cli_calls(self):
+        with open(self.calls, encoding="utf-8") as f:
+            return f.read().splitlines()
+
+    def test_falls_back_to_the_cli_without_a_socket(self):
+        inventory = DockerInventory()
+        self.assertIsNone(inventory.client)
+        self.assertEqual(inventory.image_tags(), ["getting-started:latest", "node:18-alpine"])
+        self.assertEqual(inventory.image_tags(), ["getting-started:latest", "node:18-alpine"])
+        self.assertEqual(inventory.volume_names(), ["todo-db"])
+        self.assertEqual(inventory.image_summary("getting-started:latest"), (181000000, 3))
+        self.assertEqual(self.cli_calls(), [
+            "images --format {{.Repository}}:{{.Tag}}",
+            "volume ls --format {{.Name}}",
+            "image inspect --format {{.Size}} {{len .RootFS.Layers}} getting-started:latest",
+        ])
+
+    def test_cli_failure_raises_docker_unavailable(self):
+        with mock.patch.dict(os.environ, {"PATH": os.path.join(self.dir, "empty")}):
+            with self.assertRaisesRegex(DockerUnavailable, "docker images failed"):
+                DockerInventory().image_tags()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+"""The Dockerfile parser behind every Dockerfile check."""
+
+import textwrap
+import unittest
+
+from grader.dockerfile import Instruction, final_stage, parse, stage_count, stage_names
+
+
+def parse_text(text):
+    return parse(textwrap.dedent(text).lstrip("\n"))
+
+
+class InstructionTest(unittest.TestCase):
+    def test_keywords_stages_and_lines(self):
+        self.assertEqual(parse_text("""
+            FROM node:18-alpine AS deps
+            # a comment
+            workdir /app
+
+            FROM node:18-alpine
+            COPY --from=deps /app /app
+        """), [
+            Instruction(0, "FROM", "node:18-alpine AS deps", 1),
+            Instruction(0, "WORKDIR", "/app", 3),
+            Instruction(1, "FROM", "node:18-alpine", 5),
+            Instruction(1, "COPY", "--from=deps /app /app", 6),
+        ])
+
+    def test_instruction_before_first_from(self):
+        self.assertEqual(parse("ARG VERSION=18\nFROM node:${VERSION}\n")[0], Instruction(-1, "ARG", "VERSION=18", 1))
+
+    def test_flags_and_operands(self):
+        copy = parse("COPY --chown=node:node --link package.json ./\n")[0]
+        self.assertEqual(copy.flags(), {"chown": "node:node", "link": ""})
+        self.assertEqual(copy.operands(), "package.json ./")
+
+    def test_stage_helpers(self):
+        instructions = parse("FROM node AS build\nRUN make\nFROM alpine\nCOPY --from=build /out /\n")
+        self.assertEqual(stage_count(instructions), 2)
+        self.assertEqual(stage_names(instructions), {0: "build"})
+        self.assertEqual([i.instruction for i in final_stage(instructions)], ["FROM", "COPY"])
+
+
+class ContinuationTest(unittest.TestCase):
+    def test_continued_lines_are_joined(self):
+        self.assertEqual(parse_text("""
+            RUN apk add --no-cache \\
+                python3 \\
+                make
+            CMD ["node"]
+        """), [Instruction(-1, "RUN", "apk add --no-cache python3 make", 1), Instruction(-1, "CMD", '["node"]', 4)])
+
+    def test_comments_and_blank_lines_inside_a_continuation_are_dropped(self):
+        self.assertEqual(parse("RUN npm install \\\n# not part of it\n\n    && npm test\n"),
+                         [Instruction(-1, "RUN", "npm install && npm test", 1)])
+
+    def test_trailing_lone_escape_is_ignored(self):
+        self.assertEqual(parse("FROM node\n\\\n"), [Instruction(0, "FROM", "node", 1)])
+        self.assertEqual(parse("FROM node\n\\\n# comment\n\n"), [Instruction(0, "FROM", "node", 1)])
+
+    def test_lone_escape_continues_into_the_next_instruction(self):
+        self.assertEqual(parse("FROM node\n\\\nRUN true\n")[1], Instruction(0, "RUN", "true", 2))
+
+    def test_continuation_at_end_of_file(self):
+        self.assertEqual(parse("FROM node\nRUN true \\\n"), [Instruction(0, "FROM", "node", 1),
+                                                              Instruction(0, "RUN", "true", 2)])
+
+
+class DirectiveTest(unittest.TestCase):
+    def test_directives_are_not_instructions(self):
+        self.assertEqual(parse_text("""
+            # syntax=docker/dockerfile:1
+            # check=skip=JSONArgsRecommended
+            FROM node
+        """), [Instruction(0, "FROM", "node", 3)])
+
+    def test_escape_directive_changes_the_continuation_character(self):
+        self.assertEqual(parse_text("""
+            # escape=`
+            FROM mcr.microsoft.com/windows/servercore
+            COPY testfile.txt c:\\
+            RUN dir `
+                c:\\
+        """)[1:], [Instruction(0, "COPY", "testfile.txt c:\\", 3), Instruction(0, "RUN", "dir c:\\", 4)])
+
+    def test_directives_only_count_at_the_top(self):
+        # After the first instruction or comment, "# escape=`" is an ordinary comment
+        instructions = parse("# a comment\n# escape=`\nRUN echo `\nRUN echo \\\n  done\n")
+        self.assertEqual(instructions, [Instruction(-1, "RUN", "echo `", 3), Instruction(-1, "RUN", "echo done", 4)])
+
+
+class HeredocTest(unittest.TestCase):
+    def test_run_heredoc_body_is_part_of_the_arguments(self):
+        self.assertEqual(parse_text("""
+            RUN <<EOF
+            npm install
+            npm test
+            EOF
+            CMD ["node"]
+        """), [Instruction(-1, "RUN", "<<EOF\nnpm install\nnpm test", 1), Instruction(-1, "CMD", '["node"]', 5)])
+
+    def test_dash_strips_leading_tabs_and_quotes_are_allowed(self):
+        instructions = parse('RUN <<-"SCRIPT"\n\techo hi\n\tSCRIPT\nEXPOSE 3000\n')
+        self.assertEqual(instructions, [Instruction(-1, "RUN", '<<-"SCRIPT"\necho hi', 1),
+                                        Instruction(-1, "EXPOSE", "3000", 4)])
+
+    def test_several_heredocs_on_one_copy(self):
+        # File names as heredoc words, as in the Dockerfile reference's example
+        instructions = parse("COPY <<robots.txt <<humans.txt /dest/\nA\nrobots.txt\nB\nhumans.txt\nUSER node\n")
+        self.assertEqual(instructions[0].arguments, "<<robots.txt <<humans.txt /dest/\nA\nB")
+        self.assertEqual(instructions[1], Instruction(-1, "USER", "node", 6))
+
+    def test_heredoc_syntax_on_other_instructions_is_left_alone(self):
+        self.assertEqual(parse("LABEL note=<<EOF\nEXPOSE 80\n"),
+                         [Instruction(-1, "LABEL", "note=<<EOF", 1), Instruction(-1, "EXPOSE", "80", 2)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+"""Scheduling in the needs/provides check executor."""
+
+import os
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from grader import executor
+from grader.deadline import Deadline
+from grader.executor import CheckExecutor
+
+
+def fake_check(name, seconds=0.0, passed=True, needs=(), provides=(), action=None):
+    return {"name": name, "seconds": seconds, "passed": passed, "needs": needs, "provides": provides,
+            "action": action}
+
+
+class Recorder:
+    """``call`` for the executor: sleeps, runs the check's action and logs what ran."""
+
+    def __init__(self):
+        self.started = []
+        self.finished = []
+        self._lock = threading.Lock()
+
+    def __call__(self, check):
+        with self._lock:
+            self.started.append(check["name"])
+        time.sleep(check["seconds"])
+        passed = check["action"]() if check["action"] else check["passed"]
+        with self._lock:
+            self.finished.append(check["name"])
+        return {"name": check["name"], "passed": passed}
+
+
+def skip(check, provider):
+    return {"name": check["name"], "passed": False, "skipped_for": provider["name"]}
+
+
+class ExecutorTestCase(unittest.TestCase):
+    def run_checks(self, checks, jobs=4, **kwargs):
+        call = Recorder()
+        results = list(CheckExecutor(jobs=jobs).run(checks, call, **kwargs))
+        return results, call
+
+
+class ProviderTest(ExecutorTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="grader-test-")
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.artifact = os.path.join(self.dir, "image")
+
+    def build(self):
+        with open(self.artifact, "w"):
+            pass
+        return True
+
+    def test_consumer_runs_after_its_provider_made_the_artifact(self):
+        # Listed first and cheaper, yet it must wait for the slow provider
+        consumer = fake_check("load test", needs=("image",), action=lambda: os.path.exists(self.artifact))
+        provider = fake_check("build", seconds=0.2, provides=("image",), action=self.build)
+        for jobs in (1, 4):
+            with self.subTest(jobs=jobs):
+                if os.path.exists(self.artifact):
+                    os.unlink(self.artifact)
+                results, call = self.run_checks([consumer, provider], jobs=jobs, deadline=Deadline())
+                self.assertEqual([r["passed"] for _, r in results], [True, True])
+                self.assertLess(call.finished.index("build"), call.started.index("load test"))
+
+    def test_failed_provider_skips_its_consumers(self):
+        provider = fake_check("build", seconds=0.05, passed=False, provides=("image",))
+        consumers = [fake_check("load test", needs=("image",)), fake_check("layers", needs=("docker", "image"))]
+        unrelated = fake_check("Dockerfile exists")
+        for jobs in (1, 4):
+            with self.subTest(jobs=jobs):
+                results, call = self.run_checks([provider, *consumers, unrelated], jobs=jobs, skip=skip)
+                self.assertEqual(sorted(call.started), ["Dockerfile exists", "build"])
+                self.assertEqual([r.get("skipped_for") for _, r in results], [None, "build", "build", None])
+
+    def test_consumers_run_without_skip(self):
+        provider = fake_check("build", passed=False, provides=("image",))
+        _, call = self.run_checks([provider, fake_check("load test", needs=("image",))])
+        self.assertIn("load test", call.started)
+
+
+class OrderTest(ExecutorTestCase):
+    def test_results_come_back_in_registry_order(self):
+        # Later checks finish first
+        checks = [fake_check(f"check {n}", seconds=0.05 * (4 - n)) for n in range(5)]
+        results, call = self.run_checks(checks, jobs=5)
+        self.assertEqual([check["name"] for check, _ in results], [c["name"] for c in checks])
+        self.assertEqual([r["name"] for _, r in results], [c["name"] for c in checks])
+        self.assertEqual(call.finished[0], "check 4")
+
+    def test_cheap_checks_are_submitted_first(self):
+        checks = [
+            fake_check("tagged", needs=("docker",)),
+            fake_check("load test", needs=("image",)),
+            fake_check("build", provides=("image",)),
+            fake_check("Dockerfile exists", needs=("dockerfile",)),
+        ]
+        self.assertEqual([c["name"] for c in executor._order_for_submission(checks)],
+                         ["Dockerfile exists", "build", "tagged", "load test"])
+
+    def test_resource_limits_are_respected(self):
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def build():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.pop()
+            return True
+
+        checks = [fake_check(f"build {n}", needs=("build",), action=build) for n in range(4)]
+        self.run_checks(checks, jobs=4)
+        self.assertEqual(max(peak), 1)
+
+
+class DeadlineTest(ExecutorTestCase):
+    def test_unfinished_checks_are_yielded_as_none_after_the_grace_period(self):
+        slow = fake_check("slow build", seconds=1.0, needs=("build",))
+        queued = fake_check("second build", needs=("build",))
+        quick = fake_check("Dockerfile exists")
+        deadline = Deadline(0.1)
+        self.addCleanup(deadline.close)
+        start = time.monotonic()
+        with mock.patch.object(executor, "GRACE_SECONDS", 0.1):
+            results, call = self.run_checks([quick, slow, queued], deadline=deadline)
+        self.assertLess(time.monotonic() - start, 0.9)
+        self.assertEqual([r is None for _, r in results], [False, True, True])
+        self.assertNotIn("second build", call.started)
+
+    def test_checks_finishing_within_the_grace_period_are_kept(self):
+        wind_down = fake_check("wind down", seconds=0.2)
+        deadline = Deadline(0.05)
+        self.addCleanup(deadline.close)
+        results, _ = self.run_checks([wind_down], deadline=deadline)
+        self.assertEqual(results[0][1], {"name": "wind down", "passed": True})
+
+
+if __name__ == "__main__":
+    unittest.main()
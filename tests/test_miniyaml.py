@@ -0,0 +1,178 @@
+"""The YAML subset grader.miniyaml claims to read."""
+
+import textwrap
+import unittest
+
+from grader.miniyaml import Tagged, YAMLError, loads
+
+
+def load(text):
+    return loads(textwrap.dedent(text))
+
+
+class ScalarTest(unittest.TestCase):
+    def test_core_schema_resolution(self):
+        self.assertEqual(load("""
+            a: null
+            b: ~
+            c: true
+            d: False
+            e: 42
+            f: -1.5
+            g: 3000:3000
+            h: mysql:8.0
+        """), {"a": None, "b": None, "c": True, "d": False, "e": 42, "f": -1.5,
+               "g": "3000:3000", "h": "mysql:8.0"})
+
+    def test_quoted_scalars_and_comments(self):
+        self.assertEqual(load("""
+            single: 'it''s # not a comment'
+            double: "tab\\there \\u00e9"
+            plain: value # a comment
+            hash: a#b
+        """), {"single": "it's # not a comment", "double": "tab\there é", "plain": "value", "hash": "a#b"})
+
+    def test_empty_document(self):
+        self.assertIsNone(loads(""))
+        self.assertIsNone(loads("# only a comment\n"))
+
+    def test_only_first_document(self):
+        self.assertEqual(loads("a: 1\n---\nb: 2\n"), {"a": 1})
+
+
+class BlockCollectionTest(unittest.TestCase):
+    def test_nested_mappings_and_sequences(self):
+        self.assertEqual(load("""
+            services:
+              app:
+                ports:
+                  - 3000:3000
+                environment:
+                  - MYSQL_HOST=mysql
+        """), {"services": {"app": {"ports": ["3000:3000"], "environment": ["MYSQL_HOST=mysql"]}}})
+
+    def test_sequence_at_parent_indentation(self):
+        self.assertEqual(load("""
+            volumes:
+            - todo-db:/var/lib/mysql
+            - ./src:/app/src
+            image: mysql
+        """), {"volumes": ["todo-db:/var/lib/mysql", "./src:/app/src"], "image": "mysql"})
+
+    def test_mapping_items_in_sequence(self):
+        self.assertEqual(load("""
+            ports:
+              - target: 3000
+                published: 3000
+              - target: 9229
+        """), {"ports": [{"target": 3000, "published": 3000}, {"target": 9229}]})
+
+
+class FlowCollectionTest(unittest.TestCase):
+    def test_flow_sequence_and_mapping(self):
+        self.assertEqual(load("""
+            command: [npm, run, "dev"]
+            build: {context: ., dockerfile: Dockerfile}
+            empty: []
+            none: {}
+        """), {"command": ["npm", "run", "dev"], "build": {"context": ".", "dockerfile": "Dockerfile"},
+               "empty": [], "none": {}})
+
+    def test_nested_flow_collections(self):
+        self.assertEqual(load("healthcheck: {test: [CMD, curl, -f], retries: 3}\n"),
+                         {"healthcheck": {"test": ["CMD", "curl", "-f"], "retries": 3}})
+
+    def test_flow_collection_over_several_lines(self):
+        self.assertEqual(load("""
+            command: [
+              "node",
+              "src/index.js",
+            ]
+            next: 1
+        """), {"command": ["node", "src/index.js"], "next": 1})
+
+    def test_unclosed_flow_collection_is_an_error(self):
+        with self.assertRaises(YAMLError):
+            load("command: [npm, run\n")
+
+
+class BlockScalarTest(unittest.TestCase):
+    def test_literal_keeps_newlines(self):
+        self.assertEqual(load("""
+            script: |
+              npm install
+              npm test
+            after: 1
+        """), {"script": "npm install\nnpm test\n", "after": 1})
+
+    def test_folded_joins_lines(self):
+        self.assertEqual(load("""
+            description: >
+              one
+              two
+
+              three
+        """), {"description": "one two\nthree\n"})
+
+    def test_chomping_indicators(self):
+        text = "strip: |-\n  a\n\nkeep: |+\n  b\n\nclip: |\n  c\n\n"
+        self.assertEqual(loads(text), {"strip": "a", "keep": "b\n\n", "clip": "c\n"})
+
+    def test_indentation_indicator(self):
+        self.assertEqual(loads("code: |2\n    indented\n  less\n"), {"code": "  indented\nless\n"})
+
+
+class AnchorTest(unittest.TestCase):
+    def test_alias_repeats_the_anchored_value(self):
+        self.assertEqual(load("""
+            base: &env
+              NODE_ENV: production
+            app:
+              environment: *env
+            port: &port 3000
+            other: *port
+        """), {"base": {"NODE_ENV": "production"}, "app": {"environment": {"NODE_ENV": "production"}},
+               "port": 3000, "other": 3000})
+
+    def test_merge_key(self):
+        self.assertEqual(load("""
+            x-common: &common
+              restart: always
+              image: node:18
+            services:
+              app:
+                <<: *common
+                image: node:20
+        """)["services"]["app"], {"restart": "always", "image": "node:20"})
+
+    def test_merge_key_with_several_sources(self):
+        # Earlier sources win over later ones; the mapping's own keys win over all
+        self.assertEqual(load("""
+            a: &a {x: 1, y: 1}
+            b: &b {y: 2, z: 2}
+            c:
+              <<: [*a, *b]
+              z: 3
+        """)["c"], {"x": 1, "y": 1, "z": 3})
+
+    def test_undefined_alias_is_an_error(self):
+        with self.assertRaisesRegex(YAMLError, "line 1"):
+            loads("a: *missing\n")
+
+
+class TagTest(unittest.TestCase):
+    def test_standard_tags_convert(self):
+        self.assertEqual(load("""
+            port: !!str 3000
+            count: !!int "3"
+        """), {"port": "3000", "count": 3})
+
+    def test_application_tags_are_kept(self):
+        self.assertEqual(load("""
+            ports: !reset []
+            image: !override mysql:8.0
+        """), {"ports": Tagged("!reset", []), "image": Tagged("!override", "mysql:8.0")})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+"""Pinned results of the rules.json checks on the workshop's own checkouts.
+
+The starter is this repository's app/ and docker-compose.yml as shipped;
+the complete solution overlays the files from the modules' solutions/
+directories. A rules.json edit that changes any of these results changes
+scoring, and should change this file with it.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import run
+from grader.context import GradeContext
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOLUTION_FILES = {
+    os.path.join("app", "Dockerfile"): os.path.join("11-image-building-best-practices", "solutions", "Dockerfile.multistage"),
+    os.path.join("app", ".dockerignore"): os.path.join("11-image-building-best-practices", "solutions", ".dockerignore"),
+    os.path.join("app", "src", "static", "index.html"): os.path.join("05-update-application", "solutions", "index.html"),
+    "docker-compose.yml": os.path.join("10-use-docker-compose", "solutions", "docker-compose.yml"),
+}
+
+# (name, module, points): the rules and where their points go
+RULES = [
+    ("Dockerfile exists", 4, 5),
+    ("FROM node base image", 4, 3),
+    ("WORKDIR set to /app", 4, 2),
+    ("COPY package.json first", 4, 3),
+    ("RUN npm/yarn install", 4, 3),
+    ("COPY source code", 4, 2),
+    ("EXPOSE 3000", 4, 2),
+    ("CMD defined", 4, 3),
+    ("Source code modified", 5, 5),
+    ("Empty state text changed", 5, 5),
+    ("Dev workflow configured", 8, 5),
+    ("Multi-stage Dockerfile", 11, 3),
+    (".dockerignore exists", 11, 1),
+]
+
+STARTER = {
+    "Dockerfile exists": (False, "Dockerfile exists but appears to be the starter template. Complete the TODO items."),
+    "FROM node base image": (True, "Dockerfile uses node base image"),
+    "WORKDIR set to /app": (True, "WORKDIR set to /app"),
+    "COPY package.json first": (False, "Dockerfile should COPY package.json before COPY . ."),
+    "RUN npm/yarn install": (False, "Dockerfile should RUN npm install (or yarn install)"),
+    "COPY source code": (False, "Dockerfile should COPY source code into the image"),
+    "EXPOSE 3000": (False, "Dockerfile should EXPOSE 3000"),
+    "CMD defined": (False, "Dockerfile should have a CMD instruction to start the app"),
+    "Source code modified": (False, "Modify the empty state text in app/src/static/index.html (Module 05)"),
+    "Empty state text changed": (False, "Change the text inside the empty-state paragraph"),
+    "Dev workflow configured": (True, "Development script with nodemon is configured"),
+    "Multi-stage Dockerfile": (False, "Use multiple FROM statements for a multi-stage build (Module 11)"),
+    ".dockerignore exists": (False, "Create app/.dockerignore to exclude unnecessary files from build context"),
+}
+
+SOLUTION = {
+    "Dockerfile exists": (True, "Dockerfile found in app/"),
+    "FROM node base image": (True, "Dockerfile uses node base image"),
+    "WORKDIR set to /app": (True, "WORKDIR set to /app"),
+    "COPY package.json first": (True, "package.json is copied before source code (good for layer caching)"),
+    "RUN npm/yarn install": (True, "Dependencies are installed with npm/yarn install"),
+    "COPY source code": (True, "Source code is copied into the image"),
+    "EXPOSE 3000": (True, "Port 3000 is exposed"),
+    "CMD defined": (True, "CMD instruction is defined"),
+    "Source code modified": (True, "Source code has been modified from the original"),
+    "Empty state text changed": (True, "Empty state text has been updated"),
+    "Dev workflow configured": (True, "Development script with nodemon is configured"),
+    "Multi-stage Dockerfile": (True, "Multi-stage build detected (2 stages)"),
+    ".dockerignore exists": (True, ".dockerignore found with node_modules excluded"),
+}
+
+
+class CheckoutTestCase(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="grader-test-")
+        self.addCleanup(shutil.rmtree, self.root)
+        shutil.copytree(os.path.join(REPO, "app"), os.path.join(self.root, "app"),
+                        ignore=shutil.ignore_patterns("node_modules"))
+        shutil.copy(os.path.join(REPO, "docker-compose.yml"), self.root)
+
+    def solve(self, files=SOLUTION_FILES):
+        for target, source in files.items():
+            shutil.copy(os.path.join(REPO, source), os.path.join(self.root, target))
+
+    def write_dockerfile(self, text):
+        with open(os.path.join(self.root, "app", "Dockerfile"), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def grade(self):
+        ctx = GradeContext(self.root)
+        try:
+            return {c["name"]: run.run_check(c, ctx)[:2] for c in run.RULES.checks}
+        finally:
+            ctx.close()
+
+
+class RuleSetTest(unittest.TestCase):
+    def test_rules_and_points(self):
+        self.assertEqual([(c["name"], c["module"], c["points"]) for c in run.RULES.checks], RULES)
+
+    def test_rules_are_merged_into_the_registry(self):
+        names = [c["name"] for c in run.CHECKS]
+        for name, _, _ in RULES:
+            self.assertEqual(names.count(name), 1, name)
+        self.assertEqual(sum(c["points"] for c in run.CHECKS), 100)
+        # Each module's checks stay together in the registry
+        modules = [c["module"] for c in run.CHECKS]
+        self.assertEqual(modules, sorted(modules))
+
+
+class CheckoutTest(CheckoutTestCase):
+    def test_starter(self):
+        self.assertEqual(self.grade(), STARTER)
+
+    def test_complete_solution(self):
+        self.solve()
+        self.assertEqual(self.grade(), SOLUTION)
+
+    def test_module_04_reference_is_single_stage(self):
+        self.solve()
+        self.solve({os.path.join("app", "Dockerfile"): os.path.join("04-containerize-application", "solutions", "Dockerfile")})
+        results = self.grade()
+        self.assertEqual(results["Multi-stage Dockerfile"][0], False)
+        self.assertEqual({name for name, (passed, _) in results.items() if not passed}, {"Multi-stage Dockerfile"})
+
+
+class StarterDetectionTest(CheckoutTestCase):
+    def test_todo_comment_without_copy_is_the_starter(self):
+        self.write_dockerfile("# TODO: finish me\nFROM node:18-alpine\nWORKDIR /app\nRUN npm install\n")
+        self.assertEqual(self.grade()["Dockerfile exists"][0], False)
+
+    def test_leftover_todo_with_copy_counts_as_written(self):
+        self.write_dockerfile("# TODO: tidy up\nFROM node:18-alpine\nCOPY . .\n")
+        self.assertEqual(self.grade()["Dockerfile exists"], (True, "Dockerfile found in app/"))
+
+    def test_leftover_todo_in_a_multistage_build_counts_as_written(self):
+        self.write_dockerfile("# TODO: tidy up\nFROM node:18-alpine AS deps\nFROM node:18-alpine\n")
+        self.assertEqual(self.grade()["Dockerfile exists"][0], True)
+
+    def test_missing_dockerfile(self):
+        os.unlink(os.path.join(self.root, "app", "Dockerfile"))
+        self.assertEqual(self.grade()["Dockerfile exists"], (False, "No Dockerfile found in app/ directory"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+"""Request validation in the resident grading service's HTTP front end."""
+
+import json
+import socket
+import threading
+import unittest
+
+from grader.server import GradeService, MAX_REQUEST_BYTES, make_server
+
+
+class GradeEndpointTest(unittest.TestCase):
+    def setUp(self):
+        self.service = GradeService(lambda root, module: {"root": root, "module": module}, workers=1)
+        self.addCleanup(self.service.close)
+        self.server = make_server(self.service, port=0)
+        thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def post(self, headers, body=b""):
+        """Send a raw POST /grade and return (status, JSON body, rest of the stream)."""
+        with socket.create_connection(self.server.server_address, timeout=5) as sock:
+            head = "".join(f"{name}: {value}\r\n" for name, value in headers)
+            sock.sendall(f"POST /grade HTTP/1.1\r\nHost: localhost\r\n{head}\r\n".encode("latin-1") + body)
+            reply = sock.makefile("rb")
+            status = int(reply.readline().split()[1])
+            length = 0
+            while True:
+                line = reply.readline().strip()
+                if not line:
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            payload = json.loads(reply.read(length))
+            # A rejected request's unread body must not be parsed as a second request
+            rest = reply.read() if status != 200 else b""
+            return status, payload, rest
+
+    def test_grades_a_valid_request(self):
+        body = json.dumps({"root": "/tmp/checkout", "module": 5}).encode()
+        status, payload, _ = self.post([("Content-Length", len(body))], body)
+        self.assertEqual(status, 200)
+        self.assertEqual(payload, {"root": "/tmp/checkout", "module": 5})
+
+    def test_missing_content_length_is_411(self):
+        status, payload, rest = self.post([])
+        self.assertEqual(status, 411)
+        self.assertIn("Content-Length", payload["error"])
+        self.assertEqual(rest, b"")
+
+    def test_invalid_content_length_is_400(self):
+        for value in ("abc", "-1", "+12", " 1_2", "²"):
+            with self.subTest(value=value):
+                status, payload, rest = self.post([("Content-Length", value)], b'{"root": "/x"}')
+                self.assertEqual(status, 400)
+                self.assertIn("invalid Content-Length", payload["error"])
+                self.assertEqual(rest, b"")
+
+    def test_oversized_body_is_413(self):
+        status, _, rest = self.post([("Content-Length", MAX_REQUEST_BYTES + 1)], b"{}")
+        self.assertEqual(status, 413)
+        self.assertEqual(rest, b"")
+
+
+if __name__ == "__main__":
+    unittest.main()